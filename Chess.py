@@ -1,15 +1,22 @@
 '''
 ----------------------------------------------------------------------------------
 Chess.py - a module to be added to a Jasper program
-Last edited: 12 March 2020
+Last edited: 17 October 2026
 Creator: Joe Bruckner
 
 Implements a chess API and supports a Chess engine to play against
-a brave human player. Classes include a chessmatch which has a board
-and players, chess players, a generic chess piece class which is
-inherited by all different types of chess pieces (ie. pawn, rook, etc.).
-A chess engine class (in work) inherits chess player and makes any random,
-legal move
+a brave human player. Classes include a chessmatch which keeps the
+position in bitboards with an undo stack and players, chess players,
+a generic chess piece class which is inherited by all different types
+of chess pieces (ie. pawn, rook, etc.). The chess engine inherits chess
+player and searches for its moves: iterative deepening alpha-beta with
+quiescence and a transposition table, within a time and node budget,
+optionally on several processes and pondering on the player's time.
+A Polyglot opening book and Syzygy tablebases are used when present,
+and games are saved to a PGN file as they are played so an unfinished
+one can be resumed. Run as a script for perft, self-play, search
+scaling and tablebase checks (python Chess.py [selfplay|scaling|tablebase]
+--help)
 ----------------------------------------------------------------------------------
 '''
 
@@ -17,12 +24,24 @@ legal move
 from __future__ import with_statement
 from __future__ import absolute_import
 import re
-import copy
+import sys
+import math
+import array
+import mmap
+import struct
 import signal
+import threading
 import os
 import random
-from client.mic import Mic
-from client import jasperpath
+import time
+# Jasper imports every module just to ask isValid, so argparse, multiprocessing and pickle are only imported where
+# they are used, and the lookup tables are only built when the first match is set up (see loadTables)
+
+try:
+	unicode
+except NameError:
+	# Python 3 strings are already unicode
+	unicode = str
 
 # Standard module stuff
 WORDS = ["CHESS", "GAME", "PLAY"]
@@ -31,6 +50,162 @@ WORDS = ["CHESS", "GAME", "PLAY"]
 SIZE = 8
 FEN_STARTING = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
 
+# Bitboards hold one bit per square, square index = rank * SIZE + file so a1 is bit 0 and h8 is bit 63
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+COLORS = ("WHITE", "BLACK")
+COLOR_INDEX = {"WHITE": 0, "BLACK": 1}
+ALL_SQUARES = 0xFFFFFFFFFFFFFFFF
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+LIGHT_SQUARES = 0x55AA55AA55AA55AA
+
+ROOK_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+BISHOP_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+KNIGHT_OFFSETS = ((1, 2), (2, 1), (1, -2), (2, -1), (-1, 2), (-2, 1), (-1, -2), (-2, -1))
+KING_OFFSETS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+PAWN_CAPTURE_OFFSETS = (((1, 1), (1, -1)), ((-1, 1), (-1, -1)))
+
+# Moves are packed into one integer: bits 0-5 from square, 6-11 to square, 12-14 the type promoted to (0 for none)
+# and a bit each for captures, en passant and castling
+MOVE_CAPTURE = 1 << 15
+MOVE_EN_PASSANT = 1 << 16
+MOVE_CASTLE = 1 << 17
+MAX_MOVES = 256
+MAX_PLY = 64
+# moves the undo stack has room for before it has to grow, a long game plus a deep search
+UNDO_PLIES = 1024
+
+# Algebraic notation: square names by index, and piece, disambiguation, capture, target and promotion of a move
+SQUARE_NAMES = tuple(chr(ord('a') + square % SIZE) + str(square // SIZE + 1) for square in range(SIZE * SIZE))
+SQUARE_COORDINATES = tuple((square // SIZE, square % SIZE) for square in range(SIZE * SIZE))
+SAN_PATTERN = re.compile(r"^([NBRQK])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=?([NBRQ]))?$")
+
+# Castling rights as a bit mask, and the rights each square keeps when a piece leaves or lands on it
+CASTLE_SHORT = (1, 4)
+CASTLE_LONG = (2, 8)
+CASTLE_MASKS = [15] * (SIZE * SIZE)
+CASTLE_MASKS[4], CASTLE_MASKS[7], CASTLE_MASKS[0] = 12, 14, 13
+CASTLE_MASKS[60], CASTLE_MASKS[63], CASTLE_MASKS[56] = 3, 11, 7
+# where the king and rooks (piece codes color * 6 + type) stand while they can still castle
+CASTLE_PIECES = ((4, 5), (7, 3), (0, 3), (60, 11), (63, 9), (56, 9))
+
+# Zobrist hashing and the transposition table, seeded so hashes are the same from run to run
+ZOBRIST_SEED = 20200312
+TABLE_MEGABYTES = 16
+# the attack tables take a while to build on a Pi, so they are pickled next to this file the first time
+TABLE_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tables.pickle")
+# bump whenever buildAttackTables changes what it builds, so an older pickle is built again instead of loaded
+TABLE_CACHE_VERSION = 1
+# Polyglot opening book, used when there is one next to this file
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+BOOK_ENTRY = struct.Struct(">QHHI")
+# FEN piece letters by piece code (color * 6 + type) and back, castling letters with their rights, and the packed
+# binary position format (see ChessMatch.packPosition)
+FEN_LETTERS = "PNBRQKpnbrqk"
+FEN_CODES = dict((letter, code) for code, letter in enumerate(FEN_LETTERS))
+FEN_CASTLING = (("K", CASTLE_SHORT[0]), ("Q", CASTLE_LONG[0]), ("k", CASTLE_SHORT[1]), ("q", CASTLE_LONG[1]))
+POSITION_FORMAT = struct.Struct(">Q16sBBBH")
+NO_SQUARE = 255
+# games are saved as they are played, to the SD card, so writes are synced in batches rather than after every move
+GAME_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "games.pgn")
+PGN_SYNC_MOVES = 8
+PGN_SYNC_SECONDS = 30.0
+PGN_LINE = 79
+PGN_RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+# the Result header is padded out to fit the longest result, so it can be filled in once the game is over
+PGN_RESULT_TAG = '[Result "%s"]'
+PGN_RESULT_WIDTH = len(PGN_RESULT_TAG % "1/2-1/2")
+PGN_HEADER = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+PGN_TOKEN = re.compile(r"\{[^}]*\}?|;.*|\(|\)|\$\d+|\d+\.+|[^\s{}();.]+")
+# per turn profiling of games played through handle(), off unless this environment variable is set: "turns" appends a
+# JSON record per turn to PROFILE_PATH, "games" also dumps a cProfile of each whole game next to it
+PROFILE_VARIABLE = "CHESS_PROFILE"
+PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "turns.jsonl")
+# Syzygy endgame tablebases, used when there is a directory of them next to this file. Files are mapped as they are
+# first needed and at most TABLEBASE_FILES are kept open, least recently used closed first
+TABLEBASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "syzygy")
+TABLEBASE_PIECES = 5
+TABLEBASE_FILES = 32
+TABLEBASE_CACHE = 1 << 16
+# endgames that only need the smallest table files (KQvK, KRvK), played out from the tables alone to check the probing
+# against a local set of them, with the result each must end in
+TABLEBASE_POSITIONS = (
+	("KQvK", "8/8/8/4k3/8/8/8/4K2Q w - - 0 1", "1-0"),
+	("KRvK", "8/8/8/4k3/8/8/8/R3K3 w - - 0 1", "1-0"),
+	("KRvK, loser to move", "4k3/8/8/8/8/8/8/R3K3 b - - 0 1", "1-0"),
+	("KvKR, rook hangs", "8/8/8/8/3k4/8/1r6/K7 w - - 0 1", "1/2-1/2"),
+)
+BOUND_EXACT, BOUND_LOWER, BOUND_UPPER = 1, 2, 3
+
+# Search, scores are in centipawns and mates are counted down from MATE by the number of plies to get there
+PIECE_VALUES = (100, 320, 330, 500, 900, 0)
+MATE = 30000
+MATE_BOUND = MATE - MAX_PLY
+INFINITE = 32000
+# a tablebase win is worth less than any mate the search finds itself, and wins closer to the root more
+TABLEBASE_WIN = 20000
+SEARCH_SECONDS = 5.0
+HISTORY_LIMIT = 1 << 20
+# the king is worth more than everything else in an exchange, he can only take last
+EXCHANGE_VALUES = (100, 320, 330, 500, 900, 20000)
+# most a position can improve by beyond the captured piece, captures that cannot lift the score to alpha even with it
+# are not searched
+DELTA_MARGIN = 200
+# processes searching together when the engine plays through handle(), one per core
+SEARCH_WORKERS = os.cpu_count() or 1
+
+# Perft positions with their known leaf counts for depth 1, 2, 3..., the standard test positions followed by positions
+# built around en passant, castling and promotion edge cases
+PERFT_POSITIONS = (
+	("start position", FEN_STARTING, (20, 400, 8902, 197281, 4865609)),
+	("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", (48, 2039, 97862, 4085603)),
+	("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", (14, 191, 2812, 43238, 674624)),
+	("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", (6, 264, 9467, 422333)),
+	("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", (44, 1486, 62379, 2103487)),
+	("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", (46, 2079, 89890, 3894594)),
+	("illegal en passant 1", "3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1", (18, 92, 1670, 10138)),
+	("illegal en passant 2", "8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1", (13, 102, 1266, 10276)),
+	("en passant gives check", "8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1", (15, 126, 1928, 13931)),
+	("short castle gives check", "5k2/8/8/8/8/8/8/4K2R w K - 0 1", (15, 66, 1198, 6399)),
+	("long castle gives check", "3k4/8/8/8/8/8/8/R3K3 w Q - 0 1", (16, 71, 1286, 7418)),
+	("castling rights", "r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1", (26, 1141, 27826, 1274206)),
+	("castling prevented", "r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1", (44, 1494, 50509, 1720476)),
+	("promote out of check", "2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1", (11, 133, 1442, 19174)),
+	("discovered check", "8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1", (29, 165, 5160, 31961)),
+	("promote to give check", "4k3/1P6/8/8/8/8/K7/8 w - - 0 1", (9, 40, 472, 2661)),
+	("underpromote to check", "8/P1k5/K7/8/8/8/8/8 w - - 0 1", (6, 27, 273, 1329)),
+	("self stalemate", "K1k5/8/P7/8/8/8/8/8 w - - 0 1", (2, 6, 13, 63)),
+	("stalemate and checkmate", "8/k1P5/8/1K6/8/8/8/8 w - - 0 1", (10, 25, 268, 926)),
+	("double check", "8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1", (37, 183, 6559, 23527)),
+)
+PERFT_NODES = 200000
+# positions the batch functions are checked on, reached by random moves from the perft positions
+BATCH_POSITIONS = 3000
+BATCH_SEED = 5
+# the incremental evaluation is checked this many plies deep in each perft position, computing it afresh is slow
+EVALUATION_CHECK_DEPTH = 2
+
+# Self-play, engine against engine from a set of openings, each opening played twice with the colors swapped
+SELF_PLAY_OPENINGS = (
+	"e4 e5 Nf3 Nc6 Bb5 a6",
+	"e4 c5 Nf3 d6 d4 cxd4 Nxd4 Nf6 Nc3",
+	"e4 e6 d4 d5 Nc3 Nf6",
+	"e4 c6 d4 d5 e5 Bf5",
+	"d4 d5 c4 e6 Nc3 Nf6",
+	"d4 Nf6 c4 g6 Nc3 Bg7 e4 d6",
+	"c4 e5 Nc3 Nf6 g3",
+	"Nf3 d5 g3 Nf6 Bg2",
+)
+SELF_PLAY_MEGABYTES = 4
+SELF_PLAY_MOVE_SECONDS = 0.1
+# games still going after this many plies are called drawn
+SELF_PLAY_PLIES = 300
+# when the game counts as being in the opening, and the phase (see PHASE_WEIGHTS) below which it is an endgame
+OPENING_PLIES = 20
+ENDGAME_PHASE = 6
+GAME_PHASES = ("opening", "middlegame", "endgame")
+
+
 def handle(text, mic, profile):
 	"""
         Responds to user-input, typically speech text, by playing brilliant chess moves.
@@ -43,34 +218,87 @@ def handle(text, mic, profile):
     """
 
 	match = ChessMatch()
-	mic.say("Very well, best of luck to you sir")
-
-	while True:
+	match.black.workers = SEARCH_WORKERS
+	if os.path.exists(BOOK_PATH):
+		match.black.book = OpeningBook(BOOK_PATH)
+	if os.path.isdir(TABLEBASE_PATH):
 		try:
-			with WatchdogTimer(300):
-				# Player shall be white and move first
-				for i in range(10):
-					player_move = unicode(mic.activeListen(), "utf-8")
-					assert isinstance(player_move, unicode)
-					assert player_move is not None
-					match_status = match.nextMove(player_move)
-					if "Illegal Move" in match_status:
-						mic.say(match_status + ", try again kind sir")
-					else:
-						break
-					if i == 9:
-						mic.say("Exiting game for my own sanity, too many bad moves")
-				
-				if match_status is "Checkmate":
-					mic.say(match_status)
+			match.black.tablebase = Tablebase(TABLEBASE_PATH)
+		except ImportError:
+			print("Syzygy tablebases need the python-chess package, playing without them")
+	match.black.ponder = True
+	profiler = None
+	listen = mic.activeListen
+	if os.environ.get(PROFILE_VARIABLE):
+		profiler = TurnProfiler(PROFILE_PATH, os.environ[PROFILE_VARIABLE] == "games")
+		profiler.start()
+		listen = profiler.timer("activeListen", mic.activeListen)
+	try:
+		# an unfinished game in the game file is picked up where it was left, otherwise a new one is started in it
+		if match.openGameFile(GAME_FILE):
+			mic.say("Picking up our game where we left off")
+		else:
+			mic.say("Very well, best of luck to you sir")
+
+		while True:
+			# a resumed game can have been left with Jasper to move
+			if match.move == match.white.color:
+				# Jasper's last move may have ended the game, no need to ask for a move then
+				result = match.gameResult()
+				if result != "*":
+					mic.say("Draw" if result == "1/2-1/2" else "Checkmate")
 					break
-				# Jasper shall be black and move next
-				match_status = match.nextMove(None)
-				mic.say(match_status)
 
-		except WatchdogTimer:
-			print()
+				if profiler is not None:
+					profiler.startTurn()
+				# the engine thinks on the player's time while they make up their mind
+				match.black.startPondering()
+				try:
+					with WatchdogTimer(300):
+						# Player shall be white and move first
+						for i in range(10):
+							player_move = unicode(listen(), "utf-8")
+							assert isinstance(player_move, unicode)
+							assert player_move is not None
+							match_status = match.nextMove(player_move)
+							if "Illegal Move" in match_status:
+								mic.say(match_status + ", try again kind sir")
+							else:
+								break
+						else:
+							mic.say("Exiting game for my own sanity, too many bad moves")
+							if profiler is not None:
+								profiler.endTurn(match, match.white.color, "too many illegal moves")
+							break
+
+				except WatchdogTimer:
+					print()
+					continue
 
+				if profiler is not None:
+					profiler.endTurn(match, match.white.color, match_status)
+				if match_status in ("Checkmate", "Draw"):
+					mic.say(match_status)
+					break
+			# Jasper shall be black and move next, the engine keeps to its own time budget so it answers in time
+			# without needing the watchdog
+			if profiler is not None:
+				profiler.startTurn()
+			match_status = match.nextMove(None)
+			if profiler is not None:
+				profiler.endTurn(match, match.black.color, match_status)
+			mic.say(match_status)
+			if match_status in ("Checkmate", "Draw"):
+				break
+	finally:
+		# the game file, search pool and pondering are closed, the wrapped methods put back and the game's profile
+		# dumped even if the game ends in an exception
+		try:
+			match.finishGame()
+			match.black.close()
+		finally:
+			if profiler is not None:
+				profiler.stop()
 	mic.say("Good game, well played")
 
 def isValid(text):
@@ -83,6 +311,940 @@ def isValid(text):
 	return any(word in text.upper() for word in WORDS)
 
 
+def squareIndex(rank, file):
+	"""
+	Converts a (rank, file) coordinate into the bit index used by the bitboards
+	:param rank: rank (0-7 int) of the square
+	:param file: file (0-7 int) of the square
+	:return: square index (0-63 int)
+	"""
+	return rank * SIZE + file
+
+
+def iterBits(bitboard):
+	"""
+	Walks through the set bits of a bitboard, lowest square first
+	:param bitboard: 64 bit integer
+	:return: generator of square indices
+	"""
+	while bitboard:
+		low_bit = bitboard & -bitboard
+		yield low_bit.bit_length() - 1
+		bitboard ^= low_bit
+
+
+def bitboardToCoordinates(bitboard, coordinates=None):
+	"""
+	Converts a bitboard into the (rank, file) tuples the piece API has always handed out
+	:param bitboard: 64 bit integer
+	:param coordinates: list to refill instead of making a new one
+	:return: list of (rank, file) tuples
+	"""
+	if coordinates is None:
+		coordinates = []
+	else:
+		del coordinates[:]
+	for square in iterBits(bitboard):
+		coordinates.append(SQUARE_COORDINATES[square])
+	return coordinates
+
+
+def stepAttacks(square, offsets):
+	"""
+	Squares reached by a single step of each offset, used for knights, kings and pawn captures
+	:param square: square index the piece stands on
+	:param offsets: (rank, file) steps the piece can make
+	:return: bitboard of the reachable squares
+	"""
+	attacks = 0
+	for rank_step, file_step in offsets:
+		rank = (square >> 3) + rank_step
+		file = (square & 7) + file_step
+		if 0 <= rank < SIZE and 0 <= file < SIZE:
+			attacks |= 1 << squareIndex(rank, file)
+	return attacks
+
+
+def rayAttacks(square, occupied, directions):
+	"""
+	Squares reached by sliding along each direction until the edge of the board or the first occupied square, which
+	is included so captures (and own pieces, for protection) show up
+	:param square: square index the piece stands on
+	:param occupied: bitboard of every piece on the board
+	:param directions: (rank, file) steps the piece slides along
+	:return: bitboard of the reachable squares
+	"""
+	attacks = 0
+	for rank_step, file_step in directions:
+		rank = (square >> 3) + rank_step
+		file = (square & 7) + file_step
+		while 0 <= rank < SIZE and 0 <= file < SIZE:
+			bit = 1 << squareIndex(rank, file)
+			attacks |= bit
+			if occupied & bit:
+				break
+			rank += rank_step
+			file += file_step
+	return attacks
+
+
+# Magic numbers for the sliding piece lookups, found offline by random search so that multiplying the relevant
+# blockers of a square by its magic and keeping the top bits gives a collision free index into that square's table
+ROOK_MAGICS = (
+	0x9480048020400010, 0x0040100020004008, 0x0200084022001480, 0x02000410200A0040,
+	0x9100100800030004, 0x4080020004008001, 0x0480088002000100, 0x82000A0080204409,
+	0x4004802040088003, 0xE840400020005000, 0x4002802000100080, 0x040A00100A002242,
+	0x0084800800040080, 0x0CC8808002004400, 0x0004000408018210, 0x2A0200004C008112,
+	0x008006400A200140, 0x5000404010002000, 0x1050808010002006, 0x0100808008001006,
+	0x2680808004000800, 0x8001080104104020, 0x0040040088104102, 0x0A02220000804124,
+	0x38C0009180022040, 0x0040500040002008, 0x0010080020002400, 0x0802001200230840,
+	0x0100080100050011, 0x08A20022000810E4, 0x0460088400310210, 0x800000820018510C,
+	0x8080002001400040, 0x4010002000400044, 0x0002224082001200, 0xA008081001002102,
+	0x4108002004040040, 0x0524800400800200, 0x0040021084000108, 0x0000004082002401,
+	0x0400400080208000, 0x0020062250004000, 0x2100401082020020, 0x048020400A020010,
+	0x0000040008008080, 0x0802001004020009, 0x8010880110040002, 0x000200805102000C,
+	0x0000400480002480, 0x22C0008020004880, 0x0210200010088080, 0x8000680180100280,
+	0x0100800800040080, 0x4240020004008080, 0x0019004200444100, 0x80800300846C0200,
+	0x104B034020328001, 0x0201060040221086, 0x0209E2804012002A, 0x0001002004100209,
+	0x000A002008041002, 0x0001000802040001, 0x4400024091100804, 0x8000040033014182,
+)
+BISHOP_MAGICS = (
+	0x0011343002820010, 0x5002020841010010, 0x8110294200200A00, 0x8008204C40001080,
+	0x0404042010002080, 0x41420E0621004400, 0x000A06100A480004, 0x0002028044108408,
+	0x0088949002880702, 0x1128047004304880, 0x0800900400404820, 0x6900080A00280004,
+	0x0020141045080058, 0x0020108220200200, 0x0120040128084400, 0x1000420101019000,
+	0x0042000810011229, 0x1084000204880A00, 0x60100082041110A0, 0x0006000422020081,
+	0x1002100401200020, 0x2180200410080800, 0x0014003120B80404, 0xB004804042180140,
+	0x021010400A60010A, 0xC121200404081220, 0x40008200100C0010, 0x2002040042010A00,
+	0x0001080501004001, 0x0010008007008080, 0x1402140000A40100, 0x0005004002022890,
+	0x10D0021000214440, 0x000A080232210A21, 0x0201004120080801, 0xB420A00800490104,
+	0x0921010104040040, 0x0010100020044402, 0x2A10490050011402, 0x400222A100120440,
+	0x2002411008204003, 0x0002091082010808, 0x95420022110A0800, 0x0488094010401200,
+	0x0002400102100900, 0x0061010512020300, 0x4004C10825000205, 0x0408312400200888,
+	0x0111011002222004, 0x0020A2081A089104, 0x4001003084101180, 0x0000448042020002,
+	0x0040014008288400, 0x108210201800C81C, 0x8042040112020400, 0x12100401084A0020,
+	0x0002010120822000, 0x2020002088081940, 0x0C02040041044104, 0x0480018480421206,
+	0x0002880204050408, 0x1081402005013200, 0x3004608404080260, 0x8224103030470440,
+)
+
+# the 781 keys of the Polyglot book format, from its specification. Book positions are looked up by a hash made from
+# these rather than our own Zobrist keys, 64 per piece (black pawn, white pawn, black knight... by square), then
+# castling rights, en passant files and white to move
+POLYGLOT_RANDOM = (
+	0x9D39247E33776D41, 0x2AF7398005AAA5C7, 0x44DB015024623547, 0x9C15F73E62A76AE2,
+	0x75834465489C0C89, 0x3290AC3A203001BF, 0x0FBBAD1F61042279, 0xE83A908FF2FB60CA,
+	0x0D7E765D58755C10, 0x1A083822CEAFE02D, 0x9605D5F0E25EC3B0, 0xD021FF5CD13A2ED5,
+	0x40BDF15D4A672E32, 0x011355146FD56395, 0x5DB4832046F3D9E5, 0x239F8B2D7FF719CC,
+	0x05D1A1AE85B49AA1, 0x679F848F6E8FC971, 0x7449BBFF801FED0B, 0x7D11CDB1C3B7ADF0,
+	0x82C7709E781EB7CC, 0xF3218F1C9510786C, 0x331478F3AF51BBE6, 0x4BB38DE5E7219443,
+	0xAA649C6EBCFD50FC, 0x8DBD98A352AFD40B, 0x87D2074B81D79217, 0x19F3C751D3E92AE1,
+	0xB4AB30F062B19ABF, 0x7B0500AC42047AC4, 0xC9452CA81A09D85D, 0x24AA6C514DA27500,
+	0x4C9F34427501B447, 0x14A68FD73C910841, 0xA71B9B83461CBD93, 0x03488B95B0F1850F,
+	0x637B2B34FF93C040, 0x09D1BC9A3DD90A94, 0x3575668334A1DD3B, 0x735E2B97A4C45A23,
+	0x18727070F1BD400B, 0x1FCBACD259BF02E7, 0xD310A7C2CE9B6555, 0xBF983FE0FE5D8244,
+	0x9F74D14F7454A824, 0x51EBDC4AB9BA3035, 0x5C82C505DB9AB0FA, 0xFCF7FE8A3430B241,
+	0x3253A729B9BA3DDE, 0x8C74C368081B3075, 0xB9BC6C87167C33E7, 0x7EF48F2B83024E20,
+	0x11D505D4C351BD7F, 0x6568FCA92C76A243, 0x4DE0B0F40F32A7B8, 0x96D693460CC37E5D,
+	0x42E240CB63689F2F, 0x6D2BDCDAE2919661, 0x42880B0236E4D951, 0x5F0F4A5898171BB6,
+	0x39F890F579F92F88, 0x93C5B5F47356388B, 0x63DC359D8D231B78, 0xEC16CA8AEA98AD76,
+	0x5355F900C2A82DC7, 0x07FB9F855A997142, 0x5093417AA8A7ED5E, 0x7BCBC38DA25A7F3C,
+	0x19FC8A768CF4B6D4, 0x637A7780DECFC0D9, 0x8249A47AEE0E41F7, 0x79AD695501E7D1E8,
+	0x14ACBAF4777D5776, 0xF145B6BECCDEA195, 0xDABF2AC8201752FC, 0x24C3C94DF9C8D3F6,
+	0xBB6E2924F03912EA, 0x0CE26C0B95C980D9, 0xA49CD132BFBF7CC4, 0xE99D662AF4243939,
+	0x27E6AD7891165C3F, 0x8535F040B9744FF1, 0x54B3F4FA5F40D873, 0x72B12C32127FED2B,
+	0xEE954D3C7B411F47, 0x9A85AC909A24EAA1, 0x70AC4CD9F04F21F5, 0xF9B89D3E99A075C2,
+	0x87B3E2B2B5C907B1, 0xA366E5B8C54F48B8, 0xAE4A9346CC3F7CF2, 0x1920C04D47267BBD,
+	0x87BF02C6B49E2AE9, 0x092237AC237F3859, 0xFF07F64EF8ED14D0, 0x8DE8DCA9F03CC54E,
+	0x9C1633264DB49C89, 0xB3F22C3D0B0B38ED, 0x390E5FB44D01144B, 0x5BFEA5B4712768E9,
+	0x1E1032911FA78984, 0x9A74ACB964E78CB3, 0x4F80F7A035DAFB04, 0x6304D09A0B3738C4,
+	0x2171E64683023A08, 0x5B9B63EB9CEFF80C, 0x506AACF489889342, 0x1881AFC9A3A701D6,
+	0x6503080440750644, 0xDFD395339CDBF4A7, 0xEF927DBCF00C20F2, 0x7B32F7D1E03680EC,
+	0xB9FD7620E7316243, 0x05A7E8A57DB91B77, 0xB5889C6E15630A75, 0x4A750A09CE9573F7,
+	0xCF464CEC899A2F8A, 0xF538639CE705B824, 0x3C79A0FF5580EF7F, 0xEDE6C87F8477609D,
+	0x799E81F05BC93F31, 0x86536B8CF3428A8C, 0x97D7374C60087B73, 0xA246637CFF328532,
+	0x043FCAE60CC0EBA0, 0x920E449535DD359E, 0x70EB093B15B290CC, 0x73A1921916591CBD,
+	0x56436C9FE1A1AA8D, 0xEFAC4B70633B8F81, 0xBB215798D45DF7AF, 0x45F20042F24F1768,
+	0x930F80F4E8EB7462, 0xFF6712FFCFD75EA1, 0xAE623FD67468AA70, 0xDD2C5BC84BC8D8FC,
+	0x7EED120D54CF2DD9, 0x22FE545401165F1C, 0xC91800E98FB99929, 0x808BD68E6AC10365,
+	0xDEC468145B7605F6, 0x1BEDE3A3AEF53302, 0x43539603D6C55602, 0xAA969B5C691CCB7A,
+	0xA87832D392EFEE56, 0x65942C7B3C7E11AE, 0xDED2D633CAD004F6, 0x21F08570F420E565,
+	0xB415938D7DA94E3C, 0x91B859E59ECB6350, 0x10CFF333E0ED804A, 0x28AED140BE0BB7DD,
+	0xC5CC1D89724FA456, 0x5648F680F11A2741, 0x2D255069F0B7DAB3, 0x9BC5A38EF729ABD4,
+	0xEF2F054308F6A2BC, 0xAF2042F5CC5C2858, 0x480412BAB7F5BE2A, 0xAEF3AF4A563DFE43,
+	0x19AFE59AE451497F, 0x52593803DFF1E840, 0xF4F076E65F2CE6F0, 0x11379625747D5AF3,
+	0xBCE5D2248682C115, 0x9DA4243DE836994F, 0x066F70B33FE09017, 0x4DC4DE189B671A1C,
+	0x51039AB7712457C3, 0xC07A3F80C31FB4B4, 0xB46EE9C5E64A6E7C, 0xB3819A42ABE61C87,
+	0x21A007933A522A20, 0x2DF16F761598AA4F, 0x763C4A1371B368FD, 0xF793C46702E086A0,
+	0xD7288E012AEB8D31, 0xDE336A2A4BC1C44B, 0x0BF692B38D079F23, 0x2C604A7A177326B3,
+	0x4850E73E03EB6064, 0xCFC447F1E53C8E1B, 0xB05CA3F564268D99, 0x9AE182C8BC9474E8,
+	0xA4FC4BD4FC5558CA, 0xE755178D58FC4E76, 0x69B97DB1A4C03DFE, 0xF9B5B7C4ACC67C96,
+	0xFC6A82D64B8655FB, 0x9C684CB6C4D24417, 0x8EC97D2917456ED0, 0x6703DF9D2924E97E,
+	0xC547F57E42A7444E, 0x78E37644E7CAD29E, 0xFE9A44E9362F05FA, 0x08BD35CC38336615,
+	0x9315E5EB3A129ACE, 0x94061B871E04DF75, 0xDF1D9F9D784BA010, 0x3BBA57B68871B59D,
+	0xD2B7ADEEDED1F73F, 0xF7A255D83BC373F8, 0xD7F4F2448C0CEB81, 0xD95BE88CD210FFA7,
+	0x336F52F8FF4728E7, 0xA74049DAC312AC71, 0xA2F61BB6E437FDB5, 0x4F2A5CB07F6A35B3,
+	0x87D380BDA5BF7859, 0x16B9F7E06C453A21, 0x7BA2484C8A0FD54E, 0xF3A678CAD9A2E38C,
+	0x39B0BF7DDE437BA2, 0xFCAF55C1BF8A4424, 0x18FCF680573FA594, 0x4C0563B89F495AC3,
+	0x40E087931A00930D, 0x8CFFA9412EB642C1, 0x68CA39053261169F, 0x7A1EE967D27579E2,
+	0x9D1D60E5076F5B6F, 0x3810E399B6F65BA2, 0x32095B6D4AB5F9B1, 0x35CAB62109DD038A,
+	0xA90B24499FCFAFB1, 0x77A225A07CC2C6BD, 0x513E5E634C70E331, 0x4361C0CA3F692F12,
+	0xD941ACA44B20A45B, 0x528F7C8602C5807B, 0x52AB92BEB9613989, 0x9D1DFA2EFC557F73,
+	0x722FF175F572C348, 0x1D1260A51107FE97, 0x7A249A57EC0C9BA2, 0x04208FE9E8F7F2D6,
+	0x5A110C6058B920A0, 0x0CD9A497658A5698, 0x56FD23C8F9715A4C, 0x284C847B9D887AAE,
+	0x04FEABFBBDB619CB, 0x742E1E651C60BA83, 0x9A9632E65904AD3C, 0x881B82A13B51B9E2,
+	0x506E6744CD974924, 0xB0183DB56FFC6A79, 0x0ED9B915C66ED37E, 0x5E11E86D5873D484,
+	0xF678647E3519AC6E, 0x1B85D488D0F20CC5, 0xDAB9FE6525D89021, 0x0D151D86ADB73615,
+	0xA865A54EDCC0F019, 0x93C42566AEF98FFB, 0x99E7AFEABE000731, 0x48CBFF086DDF285A,
+	0x7F9B6AF1EBF78BAF, 0x58627E1A149BBA21, 0x2CD16E2ABD791E33, 0xD363EFF5F0977996,
+	0x0CE2A38C344A6EED, 0x1A804AADB9CFA741, 0x907F30421D78C5DE, 0x501F65EDB3034D07,
+	0x37624AE5A48FA6E9, 0x957BAF61700CFF4E, 0x3A6C27934E31188A, 0xD49503536ABCA345,
+	0x088E049589C432E0, 0xF943AEE7FEBF21B8, 0x6C3B8E3E336139D3, 0x364F6FFA464EE52E,
+	0xD60F6DCEDC314222, 0x56963B0DCA418FC0, 0x16F50EDF91E513AF, 0xEF1955914B609F93,
+	0x565601C0364E3228, 0xECB53939887E8175, 0xBAC7A9A18531294B, 0xB344C470397BBA52,
+	0x65D34954DAF3CEBD, 0xB4B81B3FA97511E2, 0xB422061193D6F6A7, 0x071582401C38434D,
+	0x7A13F18BBEDC4FF5, 0xBC4097B116C524D2, 0x59B97885E2F2EA28, 0x99170A5DC3115544,
+	0x6F423357E7C6A9F9, 0x325928EE6E6F8794, 0xD0E4366228B03343, 0x565C31F7DE89EA27,
+	0x30F5611484119414, 0xD873DB391292ED4F, 0x7BD94E1D8E17DEBC, 0xC7D9F16864A76E94,
+	0x947AE053EE56E63C, 0xC8C93882F9475F5F, 0x3A9BF55BA91F81CA, 0xD9A11FBB3D9808E4,
+	0x0FD22063EDC29FCA, 0xB3F256D8ACA0B0B9, 0xB03031A8B4516E84, 0x35DD37D5871448AF,
+	0xE9F6082B05542E4E, 0xEBFAFA33D7254B59, 0x9255ABB50D532280, 0xB9AB4CE57F2D34F3,
+	0x693501D628297551, 0xC62C58F97DD949BF, 0xCD454F8F19C5126A, 0xBBE83F4ECC2BDECB,
+	0xDC842B7E2819E230, 0xBA89142E007503B8, 0xA3BC941D0A5061CB, 0xE9F6760E32CD8021,
+	0x09C7E552BC76492F, 0x852F54934DA55CC9, 0x8107FCCF064FCF56, 0x098954D51FFF6580,
+	0x23B70EDB1955C4BF, 0xC330DE426430F69D, 0x4715ED43E8A45C0A, 0xA8D7E4DAB780A08D,
+	0x0572B974F03CE0BB, 0xB57D2E985E1419C7, 0xE8D9ECBE2CF3D73F, 0x2FE4B17170E59750,
+	0x11317BA87905E790, 0x7FBF21EC8A1F45EC, 0x1725CABFCB045B00, 0x964E915CD5E2B207,
+	0x3E2B8BCBF016D66D, 0xBE7444E39328A0AC, 0xF85B2B4FBCDE44B7, 0x49353FEA39BA63B1,
+	0x1DD01AAFCD53486A, 0x1FCA8A92FD719F85, 0xFC7C95D827357AFA, 0x18A6A990C8B35EBD,
+	0xCCCB7005C6B9C28D, 0x3BDBB92C43B17F26, 0xAA70B5B4F89695A2, 0xE94C39A54A98307F,
+	0xB7A0B174CFF6F36E, 0xD4DBA84729AF48AD, 0x2E18BC1AD9704A68, 0x2DE0966DAF2F8B1C,
+	0xB9C11D5B1E43A07E, 0x64972D68DEE33360, 0x94628D38D0C20584, 0xDBC0D2B6AB90A559,
+	0xD2733C4335C6A72F, 0x7E75D99D94A70F4D, 0x6CED1983376FA72B, 0x97FCAACBF030BC24,
+	0x7B77497B32503B12, 0x8547EDDFB81CCB94, 0x79999CDFF70902CB, 0xCFFE1939438E9B24,
+	0x829626E3892D95D7, 0x92FAE24291F2B3F1, 0x63E22C147B9C3403, 0xC678B6D860284A1C,
+	0x5873888850659AE7, 0x0981DCD296A8736D, 0x9F65789A6509A440, 0x9FF38FED72E9052F,
+	0xE479EE5B9930578C, 0xE7F28ECD2D49EECD, 0x56C074A581EA17FE, 0x5544F7D774B14AEF,
+	0x7B3F0195FC6F290F, 0x12153635B2C0CF57, 0x7F5126DBBA5E0CA7, 0x7A76956C3EAFB413,
+	0x3D5774A11D31AB39, 0x8A1B083821F40CB4, 0x7B4A38E32537DF62, 0x950113646D1D6E03,
+	0x4DA8979A0041E8A9, 0x3BC36E078F7515D7, 0x5D0A12F27AD310D1, 0x7F9D1A2E1EBE1327,
+	0xDA3A361B1C5157B1, 0xDCDD7D20903D0C25, 0x36833336D068F707, 0xCE68341F79893389,
+	0xAB9090168DD05F34, 0x43954B3252DC25E5, 0xB438C2B67F98E5E9, 0x10DCD78E3851A492,
+	0xDBC27AB5447822BF, 0x9B3CDB65F82CA382, 0xB67B7896167B4C84, 0xBFCED1B0048EAC50,
+	0xA9119B60369FFEBD, 0x1FFF7AC80904BF45, 0xAC12FB171817EEE7, 0xAF08DA9177DDA93D,
+	0x1B0CAB936E65C744, 0xB559EB1D04E5E932, 0xC37B45B3F8D6F2BA, 0xC3A9DC228CAAC9E9,
+	0xF3B8B6675A6507FF, 0x9FC477DE4ED681DA, 0x67378D8ECCEF96CB, 0x6DD856D94D259236,
+	0xA319CE15B0B4DB31, 0x073973751F12DD5E, 0x8A8E849EB32781A5, 0xE1925C71285279F5,
+	0x74C04BF1790C0EFE, 0x4DDA48153C94938A, 0x9D266D6A1CC0542C, 0x7440FB816508C4FE,
+	0x13328503DF48229F, 0xD6BF7BAEE43CAC40, 0x4838D65F6EF6748F, 0x1E152328F3318DEA,
+	0x8F8419A348F296BF, 0x72C8834A5957B511, 0xD7A023A73260B45C, 0x94EBC8ABCFB56DAE,
+	0x9FC10D0F989993E0, 0xDE68A2355B93CAE6, 0xA44CFE79AE538BBE, 0x9D1D84FCCE371425,
+	0x51D2B1AB2DDFB636, 0x2FD7E4B9E72CD38C, 0x65CA5B96B7552210, 0xDD69A0D8AB3B546D,
+	0x604D51B25FBF70E2, 0x73AA8A564FB7AC9E, 0x1A8C1E992B941148, 0xAAC40A2703D9BEA0,
+	0x764DBEAE7FA4F3A6, 0x1E99B96E70A9BE8B, 0x2C5E9DEB57EF4743, 0x3A938FEE32D29981,
+	0x26E6DB8FFDF5ADFE, 0x469356C504EC9F9D, 0xC8763C5B08D1908C, 0x3F6C6AF859D80055,
+	0x7F7CC39420A3A545, 0x9BFB227EBDF4C5CE, 0x89039D79D6FC5C5C, 0x8FE88B57305E2AB6,
+	0xA09E8C8C35AB96DE, 0xFA7E393983325753, 0xD6B6D0ECC617C699, 0xDFEA21EA9E7557E3,
+	0xB67C1FA481680AF8, 0xCA1E3785A9E724E5, 0x1CFC8BED0D681639, 0xD18D8549D140CAEA,
+	0x4ED0FE7E9DC91335, 0xE4DBF0634473F5D2, 0x1761F93A44D5AEFE, 0x53898E4C3910DA55,
+	0x734DE8181F6EC39A, 0x2680B122BAA28D97, 0x298AF231C85BAFAB, 0x7983EED3740847D5,
+	0x66C1A2A1A60CD889, 0x9E17E49642A3E4C1, 0xEDB454E7BADC0805, 0x50B704CAB602C329,
+	0x4CC317FB9CDDD023, 0x66B4835D9EAFEA22, 0x219B97E26FFC81BD, 0x261E4E4C0A333A9D,
+	0x1FE2CCA76517DB90, 0xD7504DFA8816EDBB, 0xB9571FA04DC089C8, 0x1DDC0325259B27DE,
+	0xCF3F4688801EB9AA, 0xF4F5D05C10CAB243, 0x38B6525C21A42B0E, 0x36F60E2BA4FA6800,
+	0xEB3593803173E0CE, 0x9C4CD6257C5A3603, 0xAF0C317D32ADAA8A, 0x258E5A80C7204C4B,
+	0x8B889D624D44885D, 0xF4D14597E660F855, 0xD4347F66EC8941C3, 0xE699ED85B0DFB40D,
+	0x2472F6207C2D0484, 0xC2A1E7B5B459AEB5, 0xAB4F6451CC1D45EC, 0x63767572AE3D6174,
+	0xA59E0BD101731A28, 0x116D0016CB948F09, 0x2CF9C8CA052F6E9F, 0x0B090A7560A968E3,
+	0xABEEDDB2DDE06FF1, 0x58EFC10B06A2068D, 0xC6E57A78FBD986E0, 0x2EAB8CA63CE802D7,
+	0x14A195640116F336, 0x7C0828DD624EC390, 0xD74BBE77E6116AC7, 0x804456AF10F5FB53,
+	0xEBE9EA2ADF4321C7, 0x03219A39EE587A30, 0x49787FEF17AF9924, 0xA1E9300CD8520548,
+	0x5B45E522E4B1B4EF, 0xB49C3B3995091A36, 0xD4490AD526F14431, 0x12A8F216AF9418C2,
+	0x001F837CC7350524, 0x1877B51E57A764D5, 0xA2853B80F17F58EE, 0x993E1DE72D36D310,
+	0xB3598080CE64A656, 0x252F59CF0D9F04BB, 0xD23C8E176D113600, 0x1BDA0492E7E4586E,
+	0x21E0BD5026C619BF, 0x3B097ADAF088F94E, 0x8D14DEDB30BE846E, 0xF95CFFA23AF5F6F4,
+	0x3871700761B3F743, 0xCA672B91E9E4FA16, 0x64C8E531BFF53B55, 0x241260ED4AD1E87D,
+	0x106C09B972D2E822, 0x7FBA195410E5CA30, 0x7884D9BC6CB569D8, 0x0647DFEDCD894A29,
+	0x63573FF03E224774, 0x4FC8E9560F91B123, 0x1DB956E450275779, 0xB8D91274B9E9D4FB,
+	0xA2EBEE47E2FBFCE1, 0xD9F1F30CCD97FB09, 0xEFED53D75FD64E6B, 0x2E6D02C36017F67F,
+	0xA9AA4D20DB084E9B, 0xB64BE8D8B25396C1, 0x70CB6AF7C2D5BCF0, 0x98F076A4F7A2322E,
+	0xBF84470805E69B5F, 0x94C3251F06F90CF3, 0x3E003E616A6591E9, 0xB925A6CD0421AFF3,
+	0x61BDD1307C66E300, 0xBF8D5108E27E0D48, 0x240AB57A8B888B20, 0xFC87614BAF287E07,
+	0xEF02CDD06FFDB432, 0xA1082C0466DF6C0A, 0x8215E577001332C8, 0xD39BB9C3A48DB6CF,
+	0x2738259634305C14, 0x61CF4F94C97DF93D, 0x1B6BACA2AE4E125B, 0x758F450C88572E0B,
+	0x959F587D507A8359, 0xB063E962E045F54D, 0x60E8ED72C0DFF5D1, 0x7B64978555326F9F,
+	0xFD080D236DA814BA, 0x8C90FD9B083F4558, 0x106F72FE81E2C590, 0x7976033A39F7D952,
+	0xA4EC0132764CA04B, 0x733EA705FAE4FA77, 0xB4D8F77BC3E56167, 0x9E21F4F903B33FD9,
+	0x9D765E419FB69F6D, 0xD30C088BA61EA5EF, 0x5D94337FBFAF7F5B, 0x1A4E4822EB4D7A59,
+	0x6FFE73E81B637FB3, 0xDDF957BC36D8B9CA, 0x64D0E29EEA8838B3, 0x08DD9BDFD96B9F63,
+	0x087E79E5A57D1D13, 0xE328E230E3E2B3FB, 0x1C2559E30F0946BE, 0x720BF5F26F4D2EAA,
+	0xB0774D261CC609DB, 0x443F64EC5A371195, 0x4112CF68649A260E, 0xD813F2FAB7F5C5CA,
+	0x660D3257380841EE, 0x59AC2C7873F910A3, 0xE846963877671A17, 0x93B633ABFA3469F8,
+	0xC0C0F5A60EF4CDCF, 0xCAF21ECD4377B28C, 0x57277707199B8175, 0x506C11B9D90E8B1D,
+	0xD83CC2687A19255F, 0x4A29C6465A314CD1, 0xED2DF21216235097, 0xB5635C95FF7296E2,
+	0x22AF003AB672E811, 0x52E762596BF68235, 0x9AEBA33AC6ECC6B0, 0x944F6DE09134DFB6,
+	0x6C47BEC883A7DE39, 0x6AD047C430A12104, 0xA5B1CFDBA0AB4067, 0x7C45D833AFF07862,
+	0x5092EF950A16DA0B, 0x9338E69C052B8E7B, 0x455A4B4CFE30E3F5, 0x6B02E63195AD0CF8,
+	0x6B17B224BAD6BF27, 0xD1E0CCD25BB9C169, 0xDE0C89A556B9AE70, 0x50065E535A213CF6,
+	0x9C1169FA2777B874, 0x78EDEFD694AF1EED, 0x6DC93D9526A50E68, 0xEE97F453F06791ED,
+	0x32AB0EDB696703D3, 0x3A6853C7E70757A7, 0x31865CED6120F37D, 0x67FEF95D92607890,
+	0x1F2B1D1F15F6DC9C, 0xB69E38A8965C6B65, 0xAA9119FF184CCCF4, 0xF43C732873F24C13,
+	0xFB4A3D794A9A80D2, 0x3550C2321FD6109C, 0x371F77E76BB8417E, 0x6BFA9AAE5EC05779,
+	0xCD04F3FF001A4778, 0xE3273522064480CA, 0x9F91508BFFCFC14A, 0x049A7F41061A9E60,
+	0xFCB6BE43A9F2FE9B, 0x08DE8A1C7797DA9B, 0x8F9887E6078735A1, 0xB5B4071DBFC73A66,
+	0x230E343DFBA08D33, 0x43ED7F5A0FAE657D, 0x3A88A0FBBCB05C63, 0x21874B8B4D2DBC4F,
+	0x1BDEA12E35F6A8C9, 0x53C065C6C8E63528, 0xE34A1D250E7A8D6B, 0xD6B04D3B7651DD7E,
+	0x5E90277E7CB39E2D, 0x2C046F22062DC67D, 0xB10BB459132D0A26, 0x3FA9DDFB67E2F199,
+	0x0E09B88E1914F7AF, 0x10E8B35AF3EEAB37, 0x9EEDECA8E272B933, 0xD4C718BC4AE8AE5F,
+	0x81536D601170FC20, 0x91B534F885818A06, 0xEC8177F83F900978, 0x190E714FADA5156E,
+	0xB592BF39B0364963, 0x89C350C893AE7DC1, 0xAC042E70F8B383F2, 0xB49B52E587A1EE60,
+	0xFB152FE3FF26DA89, 0x3E666E6F69AE2C15, 0x3B544EBE544C19F9, 0xE805A1E290CF2456,
+	0x24B33C9D7ED25117, 0xE74733427B72F0C1, 0x0A804D18B7097475, 0x57E3306D881EDB4F,
+	0x4AE7D6A36EB5DBCB, 0x2D8D5432157064C8, 0xD1E649DE1E7F268B, 0x8A328A1CEDFE552C,
+	0x07A3AEC79624C7DA, 0x84547DDC3E203C94, 0x990A98FD5071D263, 0x1A4FF12616EEFC89,
+	0xF6F7FD1431714200, 0x30C05B1BA332F41C, 0x8D2636B81555A786, 0x46C9FEB55D120902,
+	0xCCEC0A73B49C9921, 0x4E9D2827355FC492, 0x19EBB029435DCB0F, 0x4659D2B743848A2C,
+	0x963EF2C96B33BE31, 0x74F85198B05A2E7D, 0x5A0F544DD2B1FB18, 0x03727073C2E134B1,
+	0xC7F6AA2DE59AEA61, 0x352787BAA0D7C22F, 0x9853EAB63B5E0B35, 0xABBDCDD7ED5C0860,
+	0xCF05DAF5AC8D77B0, 0x49CAD48CEBF4A71E, 0x7A4C10EC2158C4A6, 0xD9E92AA246BF719E,
+	0x13AE978D09FE5557, 0x730499AF921549FF, 0x4E4B705B92903BA4, 0xFF577222C14F0A3A,
+	0x55B6344CF97AAFAE, 0xB862225B055B6960, 0xCAC09AFBDDD2CDB4, 0xDAF8E9829FE96B5F,
+	0xB5FDFC5D3132C498, 0x310CB380DB6F7503, 0xE87FBB46217A360E, 0x2102AE466EBB1148,
+	0xF8549E1A3AA5E00D, 0x07A69AFDCC42261A, 0xC4C118BFE78FEAAE, 0xF9F4892ED96BD438,
+	0x1AF3DBE25D8F45DA, 0xF5B4B0B0D2DEEEB4, 0x962ACEEFA82E1C84, 0x046E3ECAAF453CE9,
+	0xF05D129681949A4C, 0x964781CE734B3C84, 0x9C2ED44081CE5FBD, 0x522E23F3925E319E,
+	0x177E00F9FC32F791, 0x2BC60A63A6F3B3F2, 0x222BBFAE61725606, 0x486289DDCC3D6780,
+	0x7DC7785B8EFDFC80, 0x8AF38731C02BA980, 0x1FAB64EA29A2DDF7, 0xE4D9429322CD065A,
+	0x9DA058C67844F20C, 0x24C0E332B70019B0, 0x233003B5A6CFE6AD, 0xD586BD01C5C217F6,
+	0x5E5637885F29BC2B, 0x7EBA726D8C94094B, 0x0A56A5F0BFE39272, 0xD79476A84EE20D06,
+	0x9E4C1269BAA4BF37, 0x17EFEE45B0DEE640, 0x1D95B0A5FCF90BC6, 0x93CBE0B699C2585D,
+	0x65FA4F227A2B6D79, 0xD5F9E858292504D5, 0xC2B5A03F71471A6F, 0x59300222B4561E00,
+	0xCE2F8642CA0712DC, 0x7CA9723FBB2E8988, 0x2785338347F2BA08, 0xC61BB3A141E50E8C,
+	0x150F361DAB9DEC26, 0x9F6A419D382595F4, 0x64A53DC924FE7AC9, 0x142DE49FFF7A7C3D,
+	0x0C335248857FA9E7, 0x0A9C32D5EAE45305, 0xE6C42178C4BBB92E, 0x71F1CE2490D20B07,
+	0xF1BCC3D275AFE51A, 0xE728E8C83C334074, 0x96FBF83A12884624, 0x81A1549FD6573DA5,
+	0x5FA7867CAF35E149, 0x56986E2EF3ED091B, 0x917F1DD5F8886C61, 0xD20D8C88C8FFE65F,
+	0x31D71DCE64B2C310, 0xF165B587DF898190, 0xA57E6339DD2CF3A0, 0x1EF6E6DBB1961EC9,
+	0x70CC73D90BC26E24, 0xE21A6B35DF0C3AD7, 0x003A93D8B2806962, 0x1C99DED33CB890A1,
+	0xCF3145DE0ADD4289, 0xD0E4427A5514FB72, 0x77C621CC9FB3A483, 0x67A34DAC4356550B,
+	0xF8D626AAAF278509,
+)
+
+
+def slidingMask(square, directions):
+	"""
+	The squares whose occupancy can change a sliding piece's attacks, ie. its rays without the last square on each,
+	since a piece on the edge of the board blocks nothing
+	:param square: square index the piece stands on
+	:param directions: (rank, file) steps the piece slides along
+	:return: bitboard of the relevant blocker squares
+	"""
+	mask = 0
+	for rank_step, file_step in directions:
+		rank = (square >> 3) + rank_step
+		file = (square & 7) + file_step
+		while 0 <= rank + rank_step < SIZE and 0 <= file + file_step < SIZE:
+			mask |= 1 << squareIndex(rank, file)
+			rank += rank_step
+			file += file_step
+	return mask
+
+
+def buildMagicTable(square, directions, magic):
+	"""
+	Fills the lookup table of one square by walking every subset of its blocker mask (carry-rippler trick) and storing
+	the ray attacks at the index the magic hashes that subset to
+	:param square: square index the piece stands on
+	:param directions: (rank, file) steps the piece slides along
+	:param magic: the magic multiplier for this square
+	:return: (mask, shift, table) for the square
+	"""
+	mask = slidingMask(square, directions)
+	shift = SIZE * SIZE - bin(mask).count("1")
+	table = [0] * (1 << (SIZE * SIZE - shift))
+	shared = {}
+
+	blockers = 0
+	while True:
+		attacks = rayAttacks(square, blockers, directions)
+		# lots of blocker sets give the same attacks, so share the integer objects
+		table[((blockers * magic) & ALL_SQUARES) >> shift] = shared.setdefault(attacks, attacks)
+		blockers = (blockers - mask) & mask
+		if blockers == 0:
+			break
+	return mask, shift, table
+
+
+def betweenSquares(square):
+	"""
+	For every other square on the same rank, file or diagonal, the squares strictly in between the two
+	:param square: square index to measure from
+	:return: list of 64 bitboards, 0 for squares that do not line up
+	"""
+	between = [0] * (SIZE * SIZE)
+	for rank_step, file_step in KING_OFFSETS:
+		ray = 0
+		rank = (square >> 3) + rank_step
+		file = (square & 7) + file_step
+		while 0 <= rank < SIZE and 0 <= file < SIZE:
+			between[squareIndex(rank, file)] = ray
+			ray |= 1 << squareIndex(rank, file)
+			rank += rank_step
+			file += file_step
+	return between
+
+
+def buildAttackTables():
+	"""
+	Precomputes the attacks of every piece from every square. Knights, kings and pawns get a plain list indexed by
+	square, rooks and bishops get a magic bitboard table per square
+	:return: (knight, king, pawn attacks, between squares, rook masks, shifts, tables, bishop masks, shifts, tables)
+	"""
+	knight_attacks = [stepAttacks(square, KNIGHT_OFFSETS) for square in range(SIZE * SIZE)]
+	king_attacks = [stepAttacks(square, KING_OFFSETS) for square in range(SIZE * SIZE)]
+	pawn_attacks = [[stepAttacks(square, PAWN_CAPTURE_OFFSETS[side]) for square in range(SIZE * SIZE)]
+					for side in range(2)]
+	between = [betweenSquares(square) for square in range(SIZE * SIZE)]
+
+	rook_masks, rook_shifts, rook_tables = map(list, zip(*[
+		buildMagicTable(square, ROOK_DIRECTIONS, ROOK_MAGICS[square]) for square in range(SIZE * SIZE)]))
+	bishop_masks, bishop_shifts, bishop_tables = map(list, zip(*[
+		buildMagicTable(square, BISHOP_DIRECTIONS, BISHOP_MAGICS[square]) for square in range(SIZE * SIZE)]))
+	return (knight_attacks, king_attacks, pawn_attacks, between, rook_masks, rook_shifts, rook_tables, bishop_masks,
+			bishop_shifts, bishop_tables)
+
+
+def loadTables(cache_path=TABLE_CACHE_PATH):
+	"""
+	Sets up the attack, Zobrist and evaluation tables the first time they are needed rather than at import. The attack
+	tables are read from the pickle at cache_path when it was built by the same TABLE_CACHE_VERSION from the same magics,
+	otherwise they are built and the pickle is (re)written. A missing, damaged, stale or unwritable cache only costs the
+	time to build them
+	:param cache_path: the pickled attack tables, None to always build them
+	"""
+	global TABLES_LOADED, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN
+	global ROOK_MASKS, ROOK_SHIFTS, ROOK_TABLES, BISHOP_MASKS, BISHOP_SHIFTS, BISHOP_TABLES
+
+	if TABLES_LOADED:
+		return
+	import pickle
+
+	key = (TABLE_CACHE_VERSION, ROOK_MAGICS, BISHOP_MAGICS)
+	tables = None
+	if cache_path is not None:
+		try:
+			with open(cache_path, "rb") as cache_file:
+				cached_key, tables = pickle.load(cache_file)
+			if cached_key != key:
+				tables = None
+			else:
+				# the right key on the wrong shape means a damaged file, it has to fail here and not further down
+				assert len(tables) == 10 and len(tables[2]) == 2
+				assert all(len(table) == SIZE * SIZE for table in list(tables[:2]) + tables[2] + list(tables[3:]))
+		except Exception:
+			# no cache yet, or one that cannot be read back, either way it is built again
+			tables = None
+
+	if tables is None:
+		tables = buildAttackTables()
+		if cache_path is not None:
+			# written under another name first so a reader never sees half a file
+			partial_path = "%s.%d" % (cache_path, os.getpid())
+			try:
+				with open(partial_path, "wb") as cache_file:
+					pickle.dump((key, tables), cache_file, pickle.HIGHEST_PROTOCOL)
+				os.replace(partial_path, cache_path)
+			except OSError:
+				# a full disk leaves a half written file behind, do not let those pile up
+				try:
+					os.remove(partial_path)
+				except OSError:
+					pass
+
+	(KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, ROOK_MASKS, ROOK_SHIFTS, ROOK_TABLES, BISHOP_MASKS,
+	 BISHOP_SHIFTS, BISHOP_TABLES) = tables
+	initZobristKeys()
+	initEvaluationTables()
+	TABLES_LOADED = True
+
+
+def tablebaseScore(wdl, ply):
+	"""
+	Search score for a tablebase result. Wins and losses that the fifty move rule turns into draws count as draws
+	:param wdl: win/draw/loss from the point of view of the side to move, 2 win, 1 cursed win, 0 draw, -1 blessed loss,
+		-2 loss
+	:param ply: distance from the root, nearer wins score higher
+	:return: score in centipawns
+	"""
+	if wdl == 2:
+		return TABLEBASE_WIN - ply
+	elif wdl == -2:
+		return -TABLEBASE_WIN + ply
+	return 0
+
+
+def popCount(bitboard):
+	"""
+	Number of set bits in a bitboard
+	:param bitboard: 64 bit integer
+	:return: how many squares are set
+	"""
+	return bin(bitboard).count("1")
+
+
+def scoreToTable(score, ply):
+	"""
+	Mate scores count plies from the root, the table needs them counted from the position being stored
+	:param score: search score
+	:param ply: distance of the position from the root
+	:return: score to store
+	"""
+	if score >= MATE_BOUND:
+		return score + ply
+	elif score <= -MATE_BOUND:
+		return score - ply
+	return score
+
+
+def scoreFromTable(score, ply):
+	"""
+	Turns a stored mate score back into one counted from the root of the current search
+	:param score: stored score
+	:param ply: distance of the position from the root
+	:return: search score
+	"""
+	if score >= MATE_BOUND:
+		return score - ply
+	elif score <= -MATE_BOUND:
+		return score + ply
+	return score
+
+
+def initZobristKeys():
+	"""
+	Draws the random keys that are XORed together into a position's hash: one per piece type, color and square, one
+	per en passant file, one for black to move, and one per combination of castling rights
+	"""
+	global ZOBRIST_PIECES, ZOBRIST_EN_PASSANT, ZOBRIST_SIDE, ZOBRIST_CASTLING
+
+	generator = random.Random(ZOBRIST_SEED)
+	ZOBRIST_PIECES = [[generator.getrandbits(64) for square in range(SIZE * SIZE)] for code in range(12)]
+	ZOBRIST_EN_PASSANT = [generator.getrandbits(64) for file in range(SIZE)]
+	ZOBRIST_SIDE = generator.getrandbits(64)
+
+	rights = [generator.getrandbits(64) for right in range(4)]
+	ZOBRIST_CASTLING = [0] * 16
+	for castling in range(16):
+		for right in range(4):
+			if castling & (1 << right):
+				ZOBRIST_CASTLING[castling] ^= rights[right]
+
+
+# Evaluation, material and piece-square bonuses for the middlegame and the endgame, blended by how much material is
+# left. Tables are written from white's side of the board, rank 8 on top, and mirrored for black
+ENDGAME_VALUES = (120, 300, 320, 520, 920, 0)
+PHASE_WEIGHTS = (0, 1, 1, 2, 4, 0)
+PHASE_TOTAL = 24
+PAWN_TABLE = (
+	0, 0, 0, 0, 0, 0, 0, 0,
+	50, 50, 50, 50, 50, 50, 50, 50,
+	10, 10, 20, 30, 30, 20, 10, 10,
+	5, 5, 10, 25, 25, 10, 5, 5,
+	0, 0, 0, 20, 20, 0, 0, 0,
+	5, -5, -10, 0, 0, -10, -5, 5,
+	5, 10, 10, -20, -20, 10, 10, 5,
+	0, 0, 0, 0, 0, 0, 0, 0)
+PAWN_ENDGAME_TABLE = (
+	0, 0, 0, 0, 0, 0, 0, 0,
+	80, 80, 80, 80, 80, 80, 80, 80,
+	50, 50, 50, 50, 50, 50, 50, 50,
+	30, 30, 30, 30, 30, 30, 30, 30,
+	20, 20, 20, 20, 20, 20, 20, 20,
+	10, 10, 10, 10, 10, 10, 10, 10,
+	0, 0, 0, 0, 0, 0, 0, 0,
+	0, 0, 0, 0, 0, 0, 0, 0)
+KNIGHT_TABLE = (
+	-50, -40, -30, -30, -30, -30, -40, -50,
+	-40, -20, 0, 0, 0, 0, -20, -40,
+	-30, 0, 10, 15, 15, 10, 0, -30,
+	-30, 5, 15, 20, 20, 15, 5, -30,
+	-30, 0, 15, 20, 20, 15, 0, -30,
+	-30, 5, 10, 15, 15, 10, 5, -30,
+	-40, -20, 0, 5, 5, 0, -20, -40,
+	-50, -40, -30, -30, -30, -30, -40, -50)
+BISHOP_TABLE = (
+	-20, -10, -10, -10, -10, -10, -10, -20,
+	-10, 0, 0, 0, 0, 0, 0, -10,
+	-10, 0, 5, 10, 10, 5, 0, -10,
+	-10, 5, 5, 10, 10, 5, 5, -10,
+	-10, 0, 10, 10, 10, 10, 0, -10,
+	-10, 10, 10, 10, 10, 10, 10, -10,
+	-10, 5, 0, 0, 0, 0, 5, -10,
+	-20, -10, -10, -10, -10, -10, -10, -20)
+ROOK_TABLE = (
+	0, 0, 0, 0, 0, 0, 0, 0,
+	5, 10, 10, 10, 10, 10, 10, 5,
+	-5, 0, 0, 0, 0, 0, 0, -5,
+	-5, 0, 0, 0, 0, 0, 0, -5,
+	-5, 0, 0, 0, 0, 0, 0, -5,
+	-5, 0, 0, 0, 0, 0, 0, -5,
+	-5, 0, 0, 0, 0, 0, 0, -5,
+	0, 0, 0, 5, 5, 0, 0, 0)
+QUEEN_TABLE = (
+	-20, -10, -10, -5, -5, -10, -10, -20,
+	-10, 0, 0, 0, 0, 0, 0, -10,
+	-10, 0, 5, 5, 5, 5, 0, -10,
+	-5, 0, 5, 5, 5, 5, 0, -5,
+	0, 0, 5, 5, 5, 5, 0, -5,
+	-10, 5, 5, 5, 5, 5, 0, -10,
+	-10, 0, 5, 0, 0, 0, 0, -10,
+	-20, -10, -10, -5, -5, -10, -10, -20)
+KING_TABLE = (
+	-30, -40, -40, -50, -50, -40, -40, -30,
+	-30, -40, -40, -50, -50, -40, -40, -30,
+	-30, -40, -40, -50, -50, -40, -40, -30,
+	-30, -40, -40, -50, -50, -40, -40, -30,
+	-20, -30, -30, -40, -40, -30, -30, -20,
+	-10, -20, -20, -20, -20, -20, -20, -10,
+	20, 20, 0, 0, 0, 0, 20, 20,
+	20, 30, 10, 0, 0, 10, 30, 20)
+KING_ENDGAME_TABLE = (
+	-50, -40, -30, -20, -20, -30, -40, -50,
+	-30, -20, -10, 0, 0, -10, -20, -30,
+	-30, -10, 20, 30, 30, 20, -10, -30,
+	-30, -10, 30, 40, 40, 30, -10, -30,
+	-30, -10, 30, 40, 40, 30, -10, -30,
+	-30, -10, 20, 30, 30, 20, -10, -30,
+	-30, -30, 0, 0, 0, 0, -30, -30,
+	-50, -30, -30, -30, -30, -30, -30, -50)
+MIDGAME_TABLES = (PAWN_TABLE, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, KING_TABLE)
+ENDGAME_TABLES = (PAWN_ENDGAME_TABLE, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, KING_ENDGAME_TABLE)
+
+
+def initEvaluationTables():
+	"""
+	Folds the piece values into the piece-square tables, one table per piece type and color indexed by square, with
+	black's scores negated so the running totals are always from white's point of view
+	"""
+	global MIDGAME_SCORES, ENDGAME_SCORES
+
+	MIDGAME_SCORES = []
+	ENDGAME_SCORES = []
+	for side in range(2):
+		for kind in range(6):
+			# the tables have rank 8 first, flipping the rank lines a white square up with its row
+			flip = (SIZE - 1) * SIZE if side == 0 else 0
+			sign = 1 if side == 0 else -1
+			MIDGAME_SCORES.append([sign * (PIECE_VALUES[kind] + MIDGAME_TABLES[kind][square ^ flip])
+								   for square in range(SIZE * SIZE)])
+			ENDGAME_SCORES.append([sign * (ENDGAME_VALUES[kind] + ENDGAME_TABLES[kind][square ^ flip])
+								   for square in range(SIZE * SIZE)])
+
+
+def rookAttacks(square, occupied):
+	"""
+	Rook attacks from a square given the board occupancy, a single magic table lookup
+	:param square: square index the rook stands on
+	:param occupied: bitboard of every piece on the board
+	:return: bitboard of the attacked squares
+	"""
+	return ROOK_TABLES[square][((occupied & ROOK_MASKS[square]) * ROOK_MAGICS[square] & ALL_SQUARES) >> ROOK_SHIFTS[square]]
+
+
+def bishopAttacks(square, occupied):
+	"""
+	Bishop attacks from a square given the board occupancy, a single magic table lookup
+	:param square: square index the bishop stands on
+	:param occupied: bitboard of every piece on the board
+	:return: bitboard of the attacked squares
+	"""
+	return BISHOP_TABLES[square][((occupied & BISHOP_MASKS[square]) * BISHOP_MAGICS[square] & ALL_SQUARES) >>
+								 BISHOP_SHIFTS[square]]
+
+
+def attacksFrom(kind, side, square, occupied):
+	"""
+	Attacks of any type of piece from a square
+	:param kind: PAWN, KNIGHT, BISHOP, ROOK, QUEEN or KING
+	:param side: color index (0 white, 1 black), only matters for pawns
+	:param square: square index the piece stands on
+	:param occupied: bitboard of every piece on the board
+	:return: bitboard of the attacked squares
+	"""
+	if kind == PAWN:
+		return PAWN_ATTACKS[side][square]
+	elif kind == KNIGHT:
+		return KNIGHT_ATTACKS[square]
+	elif kind == BISHOP:
+		return bishopAttacks(square, occupied)
+	elif kind == ROOK:
+		return rookAttacks(square, occupied)
+	elif kind == QUEEN:
+		return rookAttacks(square, occupied) | bishopAttacks(square, occupied)
+	else:
+		return KING_ATTACKS[square]
+
+
+TABLES_LOADED = False
+NUMPY_TABLES = None
+
+
+# Batches of positions for analysis and training jobs, as numpy arrays: one row of 12 uint64 bitboards (index color * 6
+# + type) per position, plus the side to move, castling rights and en passant square (NO_SQUARE for none) of each.
+# numpy is only needed, and only imported, once one of these is called
+def numpyTables():
+	"""
+	The lookup tables as numpy arrays, made the first time a batch function needs them. The magic tables of all the
+	squares are laid end to end in one array with an offset per square
+	:return: dict of table name -> array, or (masks, magics, shifts, offsets, attacks) for the sliding pieces
+	"""
+	global NUMPY_TABLES
+	if NUMPY_TABLES is None:
+		import numpy
+
+		loadTables()
+		tables = {
+			"knight": numpy.array(KNIGHT_ATTACKS, dtype=numpy.uint64),
+			"king": numpy.array(KING_ATTACKS, dtype=numpy.uint64),
+			"pawn": numpy.array(PAWN_ATTACKS, dtype=numpy.uint64),
+			"midgame": numpy.array(MIDGAME_SCORES, dtype=numpy.int64),
+			"endgame": numpy.array(ENDGAME_SCORES, dtype=numpy.int64),
+			"phase": numpy.array(PHASE_WEIGHTS * 2, dtype=numpy.int64),
+		}
+		for name, masks, magics, shifts, lookups in (("rook", ROOK_MASKS, ROOK_MAGICS, ROOK_SHIFTS, ROOK_TABLES),
+													 ("bishop", BISHOP_MASKS, BISHOP_MAGICS, BISHOP_SHIFTS, BISHOP_TABLES)):
+			offsets = numpy.cumsum([0] + [len(lookup) for lookup in lookups[:-1]], dtype=numpy.int64)
+			tables[name] = (numpy.array(masks, dtype=numpy.uint64), numpy.array(magics, dtype=numpy.uint64),
+							numpy.array(shifts, dtype=numpy.uint64), offsets,
+							numpy.array([attacks for lookup in lookups for attacks in lookup], dtype=numpy.uint64))
+		NUMPY_TABLES = tables
+	return NUMPY_TABLES
+
+
+def stackPositions(positions):
+	"""
+	Stacks positions into the arrays the batch functions take
+	:param positions: ChessMatch objects, FEN strings or packed positions from packPosition, can be mixed
+	:return: (bitboards shape (N, 12) uint64, side to move, castling rights, en passant squares), the last three shape
+		(N,) int64
+	"""
+	import numpy
+
+	match = None
+	rows = []
+	for position in positions:
+		if not isinstance(position, ChessMatch):
+			if match is None:
+				match = ChessMatch()
+			if isinstance(position, (bytes, bytearray)):
+				match.unpackPosition(position)
+			else:
+				match.setupPosition(position)
+			position = match
+		rows.append((list(position.bitboards), position.side, position.castling,
+					 NO_SQUARE if position.en_passant is None else position.en_passant))
+
+	bitboards = numpy.array([row[0] for row in rows], dtype=numpy.uint64).reshape(len(rows), 12)
+	sides, castling, en_passant = (numpy.array([row[index] for row in rows], dtype=numpy.int64) for index in (1, 2, 3))
+	return bitboards, sides, castling, en_passant
+
+
+def batchSquares(bitboards):
+	"""
+	Unpacks an array of bitboards into the squares they hold, the batch version of iterBits
+	:param bitboards: uint64 array of any shape
+	:return: tuple of index arrays, one per dimension of bitboards followed by the square, a set bit per entry
+	"""
+	import numpy
+
+	bitboards = numpy.ascontiguousarray(bitboards, dtype="<u8")
+	bits = numpy.unpackbits(bitboards.view(numpy.uint8).reshape(bitboards.shape + (8,)), axis=-1, bitorder="little")
+	return numpy.nonzero(bits)
+
+
+def batchSlidingAttacks(tables, squares, occupied):
+	"""
+	Magic bitboard lookups for many sliding pieces at once, see rookAttacks and bishopAttacks
+	:param tables: the rook or bishop entry of numpyTables
+	:param squares: int array of the squares the pieces stand on
+	:param occupied: uint64 array of the occupancy each piece slides through
+	:return: uint64 array of the attacked squares
+	"""
+	import numpy
+
+	masks, magics, shifts, offsets, attacks = tables
+	# numpy multiplies uint64 modulo 2 ** 64, just what the magics need
+	index = ((occupied & masks[squares]) * magics[squares]) >> shifts[squares]
+	return attacks[offsets[squares] + index.astype(numpy.int64)]
+
+
+def batchPieceAttacks(kinds, sides, squares, occupied):
+	"""
+	Attacks of many pieces at once, see attacksFrom
+	:param kinds: int array of PAWN, KNIGHT, BISHOP, ROOK, QUEEN or KING
+	:param sides: int array of color indices (0 white, 1 black)
+	:param squares: int array of the squares the pieces stand on
+	:param occupied: uint64 array of the occupancy each piece slides through
+	:return: uint64 array of the attacked squares
+	"""
+	import numpy
+
+	tables = numpyTables()
+	attacks = numpy.zeros(len(kinds), dtype=numpy.uint64)
+	for kind, table in ((KNIGHT, tables["knight"]), (KING, tables["king"])):
+		chosen = kinds == kind
+		attacks[chosen] = table[squares[chosen]]
+	pawns = kinds == PAWN
+	attacks[pawns] = tables["pawn"][sides[pawns], squares[pawns]]
+	diagonal = (kinds == BISHOP) | (kinds == QUEEN)
+	attacks[diagonal] = batchSlidingAttacks(tables["bishop"], squares[diagonal], occupied[diagonal])
+	straight = (kinds == ROOK) | (kinds == QUEEN)
+	attacks[straight] |= batchSlidingAttacks(tables["rook"], squares[straight], occupied[straight])
+	return attacks
+
+
+def batchAttacks(bitboards):
+	"""
+	Every square attacked by each color in each position, the squares ChessMatch.isSquareAttacked answers True for
+	:param bitboards: array-like of shape (N, 12), see stackPositions
+	:return: uint64 array of shape (N, 2), white's attacks then black's
+	"""
+	import numpy
+
+	bitboards = numpy.asarray(bitboards, dtype=numpy.uint64)
+	occupied = numpy.bitwise_or.reduce(bitboards, axis=1)
+	positions, codes, squares = batchSquares(bitboards)
+	attacks = batchPieceAttacks(codes % 6, codes // 6, squares, occupied[positions])
+
+	maps = numpy.zeros((len(bitboards), 2), dtype=numpy.uint64)
+	numpy.bitwise_or.at(maps, (positions, codes // 6), attacks)
+	return maps
+
+
+def batchMoveCounts(bitboards, sides, castling=None, en_passant=None):
+	"""
+	Number of legal moves for the side to move in each position, counting the same moves as
+	ChessMatch.generateLegalMoves. Every pseudo-legal move of every position is laid out in one array and kept if the
+	king is not attacked once it is made, looking from the king square with the captured piece taken off
+	:param bitboards: array-like of shape (N, 12), see stackPositions
+	:param sides: array-like of shape (N,), color index (0 white, 1 black) to move
+	:param castling: array-like of shape (N,), castling rights bit mask, None for no castling
+	:param en_passant: array-like of shape (N,), en passant square or NO_SQUARE, None for no en passant
+	:return: int64 array of shape (N,)
+	"""
+	import numpy
+
+	tables = numpyTables()
+	one = numpy.uint64(1)
+	bitboards = numpy.asarray(bitboards, dtype=numpy.uint64)
+	sides = numpy.asarray(sides, dtype=numpy.int64)
+	count = len(bitboards)
+	rows = numpy.arange(count)
+	occupied = numpy.bitwise_or.reduce(bitboards, axis=1)
+	colors = numpy.stack((numpy.bitwise_or.reduce(bitboards[:, :6], axis=1),
+						  numpy.bitwise_or.reduce(bitboards[:, 6:], axis=1)), axis=1)
+	own = colors[rows, sides]
+	enemy = colors[rows, 1 - sides]
+	king_squares = numpy.zeros(count, dtype=numpy.int64)
+	king_rows, king_found = batchSquares(bitboards[rows, sides * 6 + KING])
+	king_squares[king_rows] = king_found
+
+	# the pieces of the side to move, and where each of them can go
+	positions, codes, squares = batchSquares(bitboards)
+	moving = codes // 6 == sides[positions]
+	positions, kinds, squares = positions[moving], codes[moving] % 6, squares[moving]
+	side = sides[positions]
+	targets = batchPieceAttacks(kinds, side, squares, occupied[positions]) & ~own[positions]
+
+	# pawns only take diagonally, and push straight ahead onto empty squares
+	pawns = numpy.flatnonzero(kinds == PAWN)
+	pawn_bits = one << squares[pawns].astype(numpy.uint64)
+	empty = ~occupied[positions[pawns]]
+	white = side[pawns] == 0
+	single = numpy.where(white, pawn_bits << numpy.uint64(SIZE), pawn_bits >> numpy.uint64(SIZE)) & empty
+	double = numpy.where(white, (single << numpy.uint64(SIZE)) & numpy.uint64(0xFF << 24),
+						 (single >> numpy.uint64(SIZE)) & numpy.uint64(0xFF << 32)) & empty
+	targets[pawns] = (targets[pawns] & enemy[positions[pawns]]) | single | double
+
+	pieces, to_squares = batchSquares(targets)
+	move_positions = positions[pieces]
+	move_kinds = kinds[pieces]
+	from_squares = squares[pieces]
+	# a normal capture takes the piece on the target square, taking that square off empty squares changes nothing
+	captured_squares = to_squares
+
+	if en_passant is not None:
+		en_passant = numpy.asarray(en_passant, dtype=numpy.int64)
+		passed = numpy.flatnonzero(en_passant != NO_SQUARE)
+		passed_sides = sides[passed]
+		behind = en_passant[passed] + numpy.where(passed_sides == 0, -SIZE, SIZE)
+		behind_pawns = (bitboards[passed, (1 - passed_sides) * 6 + PAWN] >> behind.astype(numpy.uint64)) & one
+		takers = tables["pawn"][1 - passed_sides, en_passant[passed]] & bitboards[passed, passed_sides * 6 + PAWN]
+		takers[behind_pawns == 0] = 0
+		takes, take_squares = batchSquares(takers)
+		move_positions = numpy.concatenate((move_positions, passed[takes]))
+		move_kinds = numpy.concatenate((move_kinds, numpy.full(len(takes), PAWN, dtype=move_kinds.dtype)))
+		from_squares = numpy.concatenate((from_squares, take_squares))
+		to_squares = numpy.concatenate((to_squares, en_passant[passed][takes]))
+		captured_squares = numpy.concatenate((captured_squares, behind[takes]))
+
+	# make every move on the occupancy and look from the king (wherever it ends up) for anything still attacking it
+	side = sides[move_positions]
+	to_bits = one << to_squares.astype(numpy.uint64)
+	kept = ~(one << captured_squares.astype(numpy.uint64))
+	after = (occupied[move_positions] & ~(one << from_squares.astype(numpy.uint64)) & kept) | to_bits
+	king = numpy.where(move_kinds == KING, to_squares, king_squares[move_positions])
+	enemy_pieces = bitboards[move_positions[:, None], ((1 - side) * 6)[:, None] + numpy.arange(6)] & kept[:, None]
+	checkers = (tables["pawn"][side, king] & enemy_pieces[:, PAWN]) | \
+		(tables["knight"][king] & enemy_pieces[:, KNIGHT]) | \
+		(tables["king"][king] & enemy_pieces[:, KING]) | \
+		(batchSlidingAttacks(tables["bishop"], king, after) & (enemy_pieces[:, BISHOP] | enemy_pieces[:, QUEEN])) | \
+		(batchSlidingAttacks(tables["rook"], king, after) & (enemy_pieces[:, ROOK] | enemy_pieces[:, QUEEN]))
+
+	# a pawn reaching the last rank is four moves, one per promotion
+	promotions = (move_kinds == PAWN) & ((to_squares >> 3) == numpy.where(side == 0, SIZE - 1, 0))
+	weights = numpy.where(checkers == 0, numpy.where(promotions, 4, 1), 0)
+	counts = numpy.bincount(move_positions, weights=weights, minlength=count).astype(numpy.int64)
+
+	if castling is not None:
+		castling = numpy.asarray(castling, dtype=numpy.int64)
+		attacked = batchAttacks(bitboards)[rows, 1 - sides]
+		home = numpy.where(sides == 0, 0, (SIZE - 1) * SIZE).astype(numpy.uint64)
+		rooks = bitboards[rows, sides * 6 + ROOK] >> home
+		safe = (((attacked >> king_squares.astype(numpy.uint64)) & one) == 0) & \
+			(king_squares.astype(numpy.uint64) == home + numpy.uint64(4))
+		empty = ~occupied >> home
+		short = (castling & numpy.where(sides == 0, CASTLE_SHORT[0], CASTLE_SHORT[1])) != 0
+		short &= safe & ((empty >> numpy.uint64(5)) & numpy.uint64(3) == 3) & ((rooks >> numpy.uint64(7)) & one == 1) & \
+			((attacked >> home >> numpy.uint64(5)) & numpy.uint64(3) == 0)
+		long = (castling & numpy.where(sides == 0, CASTLE_LONG[0], CASTLE_LONG[1])) != 0
+		long &= safe & ((empty >> one) & numpy.uint64(7) == 7) & (rooks & one == 1) & \
+			((attacked >> home >> numpy.uint64(2)) & numpy.uint64(3) == 0)
+		counts += short.astype(numpy.int64) + long.astype(numpy.int64)
+	return counts
+
+
+def batchEvaluate(bitboards, sides):
+	"""
+	Static evaluation of each position, the same material and piece-square score as ChessMatch.evaluate
+	:param bitboards: array-like of shape (N, 12), see stackPositions
+	:param sides: array-like of shape (N,), color index (0 white, 1 black) to move
+	:return: int64 array of shape (N,), scores in centipawns from the point of view of the side to move
+	"""
+	import numpy
+
+	tables = numpyTables()
+	bitboards = numpy.asarray(bitboards, dtype=numpy.uint64)
+	count = len(bitboards)
+	positions, codes, squares = batchSquares(bitboards)
+	midgame = numpy.bincount(positions, weights=tables["midgame"][codes, squares], minlength=count).astype(numpy.int64)
+	endgame = numpy.bincount(positions, weights=tables["endgame"][codes, squares], minlength=count).astype(numpy.int64)
+	phase = numpy.bincount(positions, weights=tables["phase"][codes], minlength=count).astype(numpy.int64)
+
+	phase = numpy.minimum(phase, PHASE_TOTAL)
+	score = (midgame * phase + endgame * (PHASE_TOTAL - phase)) // PHASE_TOTAL
+	return numpy.where(numpy.asarray(sides) == 0, score, -score)
+
+
 class WatchdogTimer(Exception):
 	"""
 		Ensures that the program does not run on indefinately by throwing an exception after the specified time has passed
@@ -115,383 +1277,2459 @@ class ChessMatch(object):
 		Initializes the chess match with all required variables. Its also calls the funstion to setup the board in the
 		starting position.
 		"""
-		self.game_file = "path_to_file"
-		self.board = [[0 for x in range(SIZE)] for y in range(SIZE)]
+		loadTables()
+
+		# where the game is saved as it is played, see openGameFile
+		self.game_file = None
+		self.recorder = None
+
+		# one bitboard per piece type and color (index color * 6 + type), plus the occupancy masks. The squares list
+		# holds the piece objects so the old board[rank][file] access still works as a view over the bitboards
+		self.bitboards = [0] * 12
+		self.occupancy = [0, 0]
+		self.occupied = 0
+		self.squares = [None] * (SIZE * SIZE)
+		self.board = BoardView(self)
+
+		# the undo stack, one record per move made: the move, the piece moved, the piece captured, and the castling
+		# rights, en passant square (NO_SQUARE for none), half move clock and hash from before it. The record fields
+		# live in arrays allocated up front and ply is the number of moves on the stack, so making a move never
+		# allocates anything
+		self.ply = 0
+		self.undo_moves = array.array('I', bytes(4 * UNDO_PLIES))
+		self.undo_pieces = [None] * UNDO_PLIES
+		self.undo_captured = [None] * UNDO_PLIES
+		self.undo_castling = array.array('B', bytes(UNDO_PLIES))
+		self.undo_en_passant = array.array('B', bytes(UNDO_PLIES))
+		self.undo_half_moves = array.array('I', bytes(4 * UNDO_PLIES))
+		self.undo_hashes = array.array('Q', bytes(8 * UNDO_PLIES))
+
+		# square a pawn can be taken on en passant, right after it moved two squares, castling rights as a bit mask
+		# (see CASTLE_SHORT and CASTLE_LONG), whose turn it is, and the Zobrist hash of all of that
+		self.en_passant = None
+		self.castling = 0
+		self.side = 0
+		self.hash = 0
+
+		# running evaluation terms from white's point of view, kept up to date as pieces go on and off the board
+		self.midgame = 0
+		self.endgame = 0
+		self.phase = 0
+
+		# one move buffer per search ply, reused so move generation does not allocate
+		self.move_lists = [MoveList() for ply in range(MAX_PLY)]
+		self.notation_moves = MoveList()
 
 		self.white = ChessPlayer(self, color="WHITE")
 		self.black = ChessEngine(self, color="BLACK")
 		
 		self.move = "WHITE"
 		self.half_move = 0
-		self.full_move = 0
+		self.full_move = 1
 		
 		self.setupPosition(FEN_STARTING)
 	
 	def setupPosition(self, fen):
 		"""
 		Decodes the Forsyth–Edwards Notation to setup particular position, this is a standard notation used to describe
-		the current position, but has no knowledge of previous moves in the game
+		the current position, but has no knowledge of previous moves in the game. Each character is looked up in a table
+		rather than tested one piece type at a time, and the move counters may be left off
 		:param fen: the FEN string that is decoded to setup a particular position
 		"""
 		assert isinstance(fen, unicode)
+		fields = fen.split()
+		assert len(fields) >= 4, "FEN needs at least the placement, side, castling and en passant fields"
+		rows = fields[0].split("/")
+		assert len(rows) == SIZE
 
-		rank = SIZE - 1
-		file = 0
-
-		# First part of the notation describes which pieces go where
-		for fen_char in fen:
-			assert (0 <= rank < 8) and (0 <= file <= 8)
-
-			if fen_char == '/':
-				rank -= 1
-				file = 0
-			elif fen_char.isdigit():
-				for square in range(int(fen_char,10)):
-					self.board[rank][file] = None
-					file += 1
-			elif fen_char == ' ':
-				break
-			else:
-				if fen_char.isalpha() and fen_char.isupper():
-					piece_color = self.white
-				elif fen_char.isalnum() and fen_char.islower():
-					piece_color = self.black
-				else:
-					assert False
-				
-				if fen_char.upper() == 'R':
-					self.board[rank][file] = Rook(self, piece_color, rank, file)
-				elif fen_char.upper() == 'N':
-					self.board[rank][file] = Knight(self, piece_color, rank, file)
-				elif fen_char.upper() == 'B':
-					self.board[rank][file] = Bishop(self, piece_color, rank, file)
-				elif fen_char.upper() == 'Q':
-					self.board[rank][file] = Queen(self, piece_color, rank, file)
-				elif fen_char.upper() == 'K':
-					self.board[rank][file] = King(self, piece_color, rank, file)
-				elif fen_char.upper() == 'P':
-					self.board[rank][file] = Pawn(self, piece_color, rank, file)
+		# First part of the notation describes which pieces go where, rank 8 first
+		codes = [-1] * (SIZE * SIZE)
+		for row, text in enumerate(rows):
+			square = (SIZE - 1 - row) * SIZE
+			for fen_char in text:
+				code = FEN_CODES.get(fen_char)
+				if code is None:
+					square += int(fen_char, 10)
 				else:
-					assert False
+					codes[square] = code
+					square += 1
+			assert square == (SIZE - row) * SIZE, "rank %d does not add up to 8 squares" % (SIZE - row)
+
+		assert fields[1] in ("w", "b")
+		castling = 0
+		for letter, right in FEN_CASTLING:
+			if letter in fields[2]:
+				castling |= right
+		en_passant = None if fields[3] == "-" else SQUARE_NAMES.index(fields[3])
+
+		# positions from test suites often leave the turn counters off
+		half_move = int(fields[4], 10) if len(fields) > 4 else 0
+		full_move = int(fields[5], 10) if len(fields) > 5 else 1
+		self.placePosition(codes, castling, en_passant, 0 if fields[1] == "w" else 1, half_move, full_move)
+
+	def placePosition(self, codes, castling, en_passant, side, half_move=0, full_move=1):
+		"""
+		Clears the board and sets up a position, with no moves on the undo stack
+		:param codes: piece code (color * 6 + type) per square, -1 for empty
+		:param castling: castling rights mask, see CASTLE_SHORT and CASTLE_LONG
+		:param en_passant: square a pawn just passed over, or None
+		:param side: color index (0 white, 1 black) to move
+		:param half_move: half moves since the last capture or pawn move
+		:param full_move: move number
+		"""
+		for square in iterBits(self.occupied):
+			self.removePiece(square)
+		for square, code in enumerate(codes):
+			if code >= 0:
+				owner = self.white if code < 6 else self.black
+				self.addPiece(PIECE_TYPES[code % 6](self, owner, square), square)
+
+		# a right only stands while the king and that rook are still on their starting squares, whatever the FEN says
+		for square, code in CASTLE_PIECES:
+			if codes[square] != code:
+				castling &= CASTLE_MASKS[square]
+
+		self.ply = 0
+		self.castling = castling
+		self.side = side
+		self.half_move = half_move
+		self.full_move = full_move
+
+		# only kept when a pawn can actually take there, the same as makeMove
+		self.en_passant = None
+		if en_passant is not None and PAWN_ATTACKS[1 - side][en_passant] & self.bitboards[side * 6 + PAWN]:
+			self.en_passant = en_passant
+		self.hash = self.computeHash()
+
+	def to_fen(self):
+		"""
+		Encodes the position in Forsyth–Edwards Notation. The en passant square is only written when a pawn can take
+		there, so positions that play the same also read the same
+		:return: the FEN string
+		"""
+		rows = []
+		for rank in range(SIZE - 1, -1, -1):
+			row = ""
+			empty = 0
+			for square in range(rank * SIZE, (rank + 1) * SIZE):
+				piece = self.squares[square]
+				if piece is None:
+					empty += 1
+					continue
+				if empty:
+					row += str(empty)
+					empty = 0
+				row += FEN_LETTERS[piece.side * 6 + piece.kind]
+			rows.append(row + str(empty) if empty else row)
+
+		castling = "".join(letter for letter, right in FEN_CASTLING if self.castling & right) or "-"
+		en_passant = SQUARE_NAMES[self.en_passant] if self.en_passant is not None else "-"
+		return "%s %s %s %s %d %d" % ("/".join(rows), "wb"[self.side], castling, en_passant, self.half_move,
+									  self.full_move)
+
+	def packPosition(self):
+		"""
+		Packs the position into POSITION_FORMAT, a fixed 29 bytes: the occupancy bitboard, a 4 bit piece code for each
+		occupied square in order (32 pieces at most), then the side to move and castling rights, en passant square and
+		the move counters. Cheap to store by the thousand and to hand between processes
+		:return: the packed bytes
+		"""
+		pieces = 0
+		for index, square in enumerate(iterBits(self.occupied)):
+			piece = self.squares[square]
+			pieces |= (piece.side * 6 + piece.kind) << (4 * index)
+		return POSITION_FORMAT.pack(self.occupied, pieces.to_bytes(16, "little"), self.side << 4 | self.castling,
+									NO_SQUARE if self.en_passant is None else self.en_passant, min(self.half_move, 255),
+									min(self.full_move, 0xFFFF))
+
+	def unpackPosition(self, data):
+		"""
+		Sets up a position from packPosition, with no moves on the undo stack
+		:param data: the packed bytes
+		"""
+		occupied, pieces, flags, en_passant, half_move, full_move = POSITION_FORMAT.unpack(data)
+		pieces = int.from_bytes(pieces, "little")
+		codes = [-1] * (SIZE * SIZE)
+		for index, square in enumerate(iterBits(occupied)):
+			codes[square] = (pieces >> (4 * index)) & 15
+		self.placePosition(codes, flags & 15, None if en_passant == NO_SQUARE else en_passant, flags >> 4, half_move,
+						   full_move)
+
+	def addPiece(self, piece, square):
+		"""
+		Puts a piece on an empty square, setting its bit in the piece, color and total occupancy bitboards
+		:param piece: the chess piece being placed
+		:param square: square index (0-63) to place it on
+		"""
+		assert self.squares[square] is None
+		bit = 1 << square
+		code = piece.side * 6 + piece.kind
+		self.bitboards[code] |= bit
+		self.hash ^= ZOBRIST_PIECES[code][square]
+		self.midgame += MIDGAME_SCORES[code][square]
+		self.endgame += ENDGAME_SCORES[code][square]
+		self.phase += PHASE_WEIGHTS[piece.kind]
+		self.occupancy[piece.side] |= bit
+		self.occupied |= bit
+		self.squares[square] = piece
+		piece.square = square
+
+	def removePiece(self, square):
+		"""
+		Takes whatever piece is on a square off the bitboards
+		:param square: square index (0-63) to clear
+		:return: the piece that was there
+		"""
+		piece = self.squares[square]
+		assert piece is not None
+		bit = 1 << square
+		code = piece.side * 6 + piece.kind
+		self.bitboards[code] ^= bit
+		self.hash ^= ZOBRIST_PIECES[code][square]
+		self.midgame -= MIDGAME_SCORES[code][square]
+		self.endgame -= ENDGAME_SCORES[code][square]
+		self.phase -= PHASE_WEIGHTS[piece.kind]
+		self.occupancy[piece.side] ^= bit
+		self.occupied ^= bit
+		self.squares[square] = None
+		return piece
+
+	def pieces(self, color, kind):
+		"""
+		Bitboard of one type of piece for one player
+		:param color: "WHITE" or "BLACK"
+		:param kind: PAWN, KNIGHT, BISHOP, ROOK, QUEEN or KING
+		:return: the bitboard
+		"""
+		return self.bitboards[COLOR_INDEX[color] * 6 + kind]
+
+	def encodeMove(self, from_square, to_square, promotion=None):
+		"""
+		Packs a move given by its squares into the integer move format, working out its flags from the position
+		:param from_square: square index (0-63) the piece leaves
+		:param to_square: square index (0-63) the piece arrives on
+		:param promotion: type of piece a pawn promotes to, a queen if it reaches the last rank and none is given
+		:return: the packed move
+		"""
+		piece = self.squares[from_square]
+		assert piece is not None
+		flags = MOVE_CAPTURE if self.squares[to_square] is not None else 0
+		if piece.kind == PAWN:
+			if to_square == self.en_passant:
+				flags = MOVE_CAPTURE | MOVE_EN_PASSANT
+			elif (to_square >> 3) in (0, SIZE - 1) and promotion is None:
+				promotion = QUEEN
+		elif piece.kind == KING and abs(to_square - from_square) == 2:
+			flags = MOVE_CASTLE
+		return from_square | (to_square << 6) | ((promotion or 0) << 12) | flags
+
+	def makeMove(self, move):
+		"""
+		Makes a packed move, capturing anything on the target square (or behind it, en passant), hopping the rook over
+		when the king castles and swapping a pawn for its promotion. Castling rights, the en passant square, the move
+		clocks, the side to move and the Zobrist hash are updated and everything needed to take the move back goes on
+		the undo stack
+		:param move: the packed move, see encodeMove
+		:return: the captured piece, or None
+		"""
+		from_square = move & 63
+		to_square = (move >> 6) & 63
+		piece = self.squares[from_square]
+		assert piece is not None
+		side = piece.side
+		castling = self.castling
+		en_passant = self.en_passant
+
+		ply = self.ply
+		if ply == len(self.undo_pieces):
+			self.growUndo()
+		self.undo_moves[ply] = move
+		self.undo_pieces[ply] = piece
+		self.undo_castling[ply] = castling
+		self.undo_en_passant[ply] = NO_SQUARE if en_passant is None else en_passant
+		self.undo_half_moves[ply] = self.half_move
+		self.undo_hashes[ply] = self.hash
+
+		if en_passant is not None:
+			self.hash ^= ZOBRIST_EN_PASSANT[en_passant & 7]
+			self.en_passant = None
+
+		captured_square = to_square
+		if move & MOVE_EN_PASSANT:
+			captured_square = to_square - SIZE if side == 0 else to_square + SIZE
+		captured = None
+		if move & MOVE_CAPTURE:
+			captured = self.removePiece(captured_square)
+		self.undo_captured[ply] = captured
+		self.removePiece(from_square)
+
+		promotion = (move >> 12) & 7
+		if promotion:
+			self.addPiece(PIECE_TYPES[promotion](self, piece.owner, to_square), to_square)
+		else:
+			self.addPiece(piece, to_square)
+			# only remember the en passant square when a pawn could actually take there, so positions that only differ
+			# by an unusable en passant square still hash the same
+			if piece.kind == PAWN and abs(to_square - from_square) == 2 * SIZE:
+				passed = (from_square + to_square) >> 1
+				if PAWN_ATTACKS[side][passed] & self.bitboards[(1 - side) * 6 + PAWN]:
+					self.en_passant = passed
+					self.hash ^= ZOBRIST_EN_PASSANT[passed & 7]
+
+		if move & MOVE_CASTLE:
+			if to_square > from_square:
+				self.addPiece(self.removePiece(from_square + 3), from_square + 1)
+			else:
+				self.addPiece(self.removePiece(from_square - 4), from_square - 1)
+
+		# a king leaving his square, or a rook leaving (or being taken on) its corner loses that castling
+		self.castling = castling & CASTLE_MASKS[from_square] & CASTLE_MASKS[to_square]
+		if self.castling != castling:
+			self.hash ^= ZOBRIST_CASTLING[castling] ^ ZOBRIST_CASTLING[self.castling]
+
+		# the half move clock starts over on captures and pawn moves, the move number goes up after black moves
+		self.half_move = 0 if captured is not None or piece.kind == PAWN else self.half_move + 1
+		self.full_move += side
+		self.side ^= 1
+		self.hash ^= ZOBRIST_SIDE
+
+		self.ply = ply + 1
+		return captured
+
+	def unmakeMove(self):
+		"""
+		Takes back the last move on the undo stack, putting back any captured piece, castled rook, promoted pawn,
+		castling rights, en passant square, move clocks and hash
+		"""
+		assert self.ply > 0
+		ply = self.ply - 1
+		self.ply = ply
+		move = self.undo_moves[ply]
+		from_square = move & 63
+		to_square = (move >> 6) & 63
+
+		self.removePiece(to_square)
+		self.addPiece(self.undo_pieces[ply], from_square)
+		captured = self.undo_captured[ply]
+		if captured is not None:
+			if move & MOVE_EN_PASSANT:
+				self.addPiece(captured, to_square - SIZE if self.side == 1 else to_square + SIZE)
+			else:
+				self.addPiece(captured, to_square)
+		if move & MOVE_CASTLE:
+			if to_square > from_square:
+				self.addPiece(self.removePiece(from_square + 1), from_square + 3)
+			else:
+				self.addPiece(self.removePiece(from_square - 1), from_square - 4)
+
+		self.castling = self.undo_castling[ply]
+		en_passant = self.undo_en_passant[ply]
+		self.en_passant = None if en_passant == NO_SQUARE else en_passant
+		self.half_move = self.undo_half_moves[ply]
+		self.side ^= 1
+		self.full_move -= self.side
+		self.hash = self.undo_hashes[ply]
+
+	def growUndo(self):
+		"""
+		Doubles the room on the undo stack, only ever needed by very long games
+		"""
+		size = len(self.undo_pieces)
+		self.undo_moves.extend(array.array('I', bytes(4 * size)))
+		self.undo_pieces.extend([None] * size)
+		self.undo_captured.extend([None] * size)
+		self.undo_castling.extend(array.array('B', bytes(size)))
+		self.undo_en_passant.extend(array.array('B', bytes(size)))
+		self.undo_half_moves.extend(array.array('I', bytes(4 * size)))
+		self.undo_hashes.extend(array.array('Q', bytes(8 * size)))
+
+	def computeHash(self):
+		"""
+		Works out the Zobrist hash of the position from scratch, makeMove and unmakeMove keep it up to date after that
+		:return: 64 bit hash of the piece placement, side to move, castling rights and en passant square
+		"""
+		hash_key = ZOBRIST_CASTLING[self.castling]
+		for code in range(12):
+			for square in iterBits(self.bitboards[code]):
+				hash_key ^= ZOBRIST_PIECES[code][square]
+		if self.en_passant is not None:
+			hash_key ^= ZOBRIST_EN_PASSANT[self.en_passant & 7]
+		if self.side == 1:
+			hash_key ^= ZOBRIST_SIDE
+		return hash_key
+
+	def polyglotKey(self):
+		"""
+		Hash of the position the way Polyglot opening books key it, worked out from scratch since it is only needed
+		while the game is still in the book
+		:return: 64 bit Polyglot key
+		"""
+		key = 0
+		for code in range(12):
+			side, kind = divmod(code, 6)
+			offset = 64 * (2 * kind + (1 - side))
+			for square in iterBits(self.bitboards[code]):
+				key ^= POLYGLOT_RANDOM[offset + square]
+		for right, castle in enumerate((CASTLE_SHORT[0], CASTLE_LONG[0], CASTLE_SHORT[1], CASTLE_LONG[1])):
+			if self.castling & castle:
+				key ^= POLYGLOT_RANDOM[768 + right]
+		# like ours, the en passant file only counts when a pawn is there to take
+		if self.en_passant is not None:
+			key ^= POLYGLOT_RANDOM[772 + (self.en_passant & 7)]
+		if self.side == 0:
+			key ^= POLYGLOT_RANDOM[780]
+		return key
+
+	@property
+	def move(self):
+		"""
+		Whose turn it is, "WHITE" or "BLACK"
+		"""
+		return COLORS[self.side]
+
+	@move.setter
+	def move(self, color):
+		self.side = COLOR_INDEX[color]
+
+	def evaluate(self):
+		"""
+		Static evaluation of the position: material and piece-square scores, blended from the middlegame to the endgame
+		by the material left. The totals are kept up to date by addPiece and removePiece, so this costs the same no
+		matter how many pieces are on the board
+		:return: score in centipawns from the point of view of the side to move
+		"""
+		phase = min(self.phase, PHASE_TOTAL)
+		score = (self.midgame * phase + self.endgame * (PHASE_TOTAL - phase)) // PHASE_TOTAL
+		return score if self.side == 0 else -score
+
+	def computeEvaluation(self):
+		"""
+		Works out the running evaluation terms from scratch, addPiece and removePiece keep them up to date after that
+		:return: (midgame score, endgame score, phase)
+		"""
+		midgame = endgame = phase = 0
+		for code in range(12):
+			for square in iterBits(self.bitboards[code]):
+				midgame += MIDGAME_SCORES[code][square]
+				endgame += ENDGAME_SCORES[code][square]
+				phase += PHASE_WEIGHTS[code % 6]
+		return midgame, endgame, phase
+
+	def staticExchange(self, move):
+		"""
+		Static exchange evaluation: plays out every capture on the target square, least valuable attacker first, without
+		making any moves. Attackers hidden behind a slider join in once it has taken, and either side may stop taking
+		whenever carrying on would lose material. Pins are not looked at
+		:param move: packed capture or promotion
+		:return: material the mover comes out ahead by in centipawns, negative for a losing capture
+		"""
+		from_square = move & 63
+		to_square = (move >> 6) & 63
+		side = self.squares[from_square].side
+		occupied = self.occupied ^ (1 << from_square)
+		attacker_value = EXCHANGE_VALUES[self.squares[from_square].kind]
+
+		if move & MOVE_EN_PASSANT:
+			gains = [EXCHANGE_VALUES[PAWN]]
+			occupied ^= 1 << (to_square - SIZE if side == 0 else to_square + SIZE)
+		else:
+			victim = self.squares[to_square]
+			gains = [EXCHANGE_VALUES[victim.kind] if victim is not None else 0]
+		promotion = (move >> 12) & 7
+		if promotion:
+			gains[0] += EXCHANGE_VALUES[promotion] - EXCHANGE_VALUES[PAWN]
+			attacker_value = EXCHANGE_VALUES[promotion]
 
-				file += 1
+		bitboards = self.bitboards
+		side ^= 1
+		while True:
+			attackers = self.attackers(to_square, side, occupied) & occupied
+			if not attackers:
+				break
+			for kind in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+				least = attackers & bitboards[side * 6 + kind]
+				if least:
+					break
+			gains.append(attacker_value - gains[-1])
+			occupied ^= least & -least
+			attacker_value = EXCHANGE_VALUES[kind]
+			side ^= 1
+
+		# settle the exchange backwards, each side taking or standing pat, whichever is better for it
+		for index in range(len(gains) - 1, 0, -1):
+			gains[index - 1] = -max(-gains[index - 1], gains[index])
+		return gains[0]
+
+	def attackers(self, square, side, occupied=None):
+		"""
+		Looks outward from a square with the attack pattern of each type of piece, anything of that type sitting on one
+		of those squares attacks the square
+		:param square: square index (0-63) being attacked
+		:param side: color index (0 white, 1 black) of the attackers
+		:param occupied: occupancy to slide through, the current board by default
+		:return: bitboard of the attacking pieces
+		"""
+		if occupied is None:
+			occupied = self.occupied
+		bitboards = self.bitboards
+		base = side * 6
+		diagonal = bitboards[base + BISHOP] | bitboards[base + QUEEN]
+		straight = bitboards[base + ROOK] | bitboards[base + QUEEN]
+		return (PAWN_ATTACKS[1 - side][square] & bitboards[base + PAWN]) | \
+			(KNIGHT_ATTACKS[square] & bitboards[base + KNIGHT]) | \
+			(KING_ATTACKS[square] & bitboards[base + KING]) | \
+			(bishopAttacks(square, occupied) & diagonal if diagonal else 0) | \
+			(rookAttacks(square, occupied) & straight if straight else 0)
+
+	def isSquareAttacked(self, square, side):
+		"""
+		Whether any piece of one color attacks a square, cheapest checks first so it can bail out early
+		:param square: square index (0-63) being attacked
+		:param side: color index (0 white, 1 black) of the attackers
+		:return: True if attacked, False if not
+		"""
+		bitboards = self.bitboards
+		base = side * 6
+		if KNIGHT_ATTACKS[square] & bitboards[base + KNIGHT] or \
+				PAWN_ATTACKS[1 - side][square] & bitboards[base + PAWN] or \
+				KING_ATTACKS[square] & bitboards[base + KING]:
+			return True
+		diagonal = bitboards[base + BISHOP] | bitboards[base + QUEEN]
+		if diagonal and bishopAttacks(square, self.occupied) & diagonal:
+			return True
+		straight = bitboards[base + ROOK] | bitboards[base + QUEEN]
+		return bool(straight and rookAttacks(square, self.occupied) & straight)
+
+	def pinnedPieces(self, side):
+		"""
+		Finds the pieces of one color that are pinned to their own king, by looking for enemy sliders lined up with the
+		king that have exactly one of that color's pieces in the way
+		:param side: color index (0 white, 1 black) of the king
+		:return: dict of pinned square -> bitboard of the squares it can still move to, the pin line and the pinner
+		"""
+		bitboards = self.bitboards
+		king_square = bitboards[side * 6 + KING].bit_length() - 1
+		base = (1 - side) * 6
+		snipers = (rookAttacks(king_square, 0) & (bitboards[base + ROOK] | bitboards[base + QUEEN])) | \
+			(bishopAttacks(king_square, 0) & (bitboards[base + BISHOP] | bitboards[base + QUEEN]))
+
+		pins = {}
+		for sniper in iterBits(snipers):
+			blockers = BETWEEN[king_square][sniper] & self.occupied
+			if blockers and not blockers & (blockers - 1) and blockers & self.occupancy[side]:
+				pins[blockers.bit_length() - 1] = BETWEEN[king_square][sniper] | (1 << sniper)
+		return pins
+
+	def generateLegalMoves(self, side, move_list, noisy=True, quiet=True):
+		"""
+		Generates only the legal moves for one color. Checkers and pinned pieces are worked out up front so nothing has
+		to be made and unmade to see whether it leaves the king in check: in double check only the king may move, in
+		single check everything else has to take or block the checker, and pinned pieces stay on their pin line
+		:param side: color index (0 white, 1 black) of the player moving
+		:param move_list: the MoveList the packed moves are written into, whatever it held is overwritten
+		:param noisy: whether to generate captures and promotions
+		:param quiet: whether to generate every other move
+		:return: the move list
+		"""
+		buffer = move_list.moves
+		count = 0
+		bitboards = self.bitboards
+		base = side * 6
+		own = self.occupancy[side]
+		enemy = self.occupancy[1 - side]
+		occupied = self.occupied
+		king_bit = bitboards[base + KING]
+		king_square = king_bit.bit_length() - 1
+		assert king_bit != 0
+		checkers = self.attackers(king_square, 1 - side)
+
+		# the squares this call may move to, so search can ask for captures first and only generate the rest later
+		stage = (enemy if noisy else 0) | (~occupied & ALL_SQUARES if quiet else 0)
+
+		# the king may step anywhere not attacked, looking through his current square so he cannot back away along the
+		# line of a slider that checks him
+		without_king = occupied ^ king_bit
+		for to_square in iterBits(KING_ATTACKS[king_square] & stage):
+			if not self.attackers(to_square, 1 - side, without_king):
+				buffer[count] = king_square | (to_square << 6) | (MOVE_CAPTURE if (enemy >> to_square) & 1 else 0)
+				count += 1
+
+		if checkers & (checkers - 1):
+			move_list.count = count
+			return move_list
+		if checkers:
+			targets = BETWEEN[king_square][checkers.bit_length() - 1] | checkers
+		else:
+			targets = ALL_SQUARES
+			if quiet:
+				count = self.generateCastling(side, buffer, count)
+
+		pins = self.pinnedPieces(side)
+
+		forward = SIZE if side == 0 else -SIZE
+		start_rank = 1 if side == 0 else SIZE - 2
+		last_rank = SIZE - 1 if side == 0 else 0
+		promoting = (0xFF << (last_rank * SIZE) if noisy else 0) | (~(0xFF << (last_rank * SIZE)) if quiet else 0)
+		for from_square in iterBits(bitboards[base + PAWN]):
+			captures = PAWN_ATTACKS[side][from_square] & enemy if noisy else 0
+			pushes = 0
+			ahead = from_square + forward
+			if not (occupied >> ahead) & 1:
+				pushes = 1 << ahead
+				if from_square >> 3 == start_rank and not (occupied >> (ahead + forward)) & 1:
+					pushes |= 1 << (ahead + forward)
+				pushes &= promoting
+			allowed = targets & pins.get(from_square, ALL_SQUARES)
+			for to_square in iterBits((captures | pushes) & allowed):
+				move = from_square | (to_square << 6) | (MOVE_CAPTURE if (captures >> to_square) & 1 else 0)
+				if to_square >> 3 == last_rank:
+					for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+						buffer[count] = move | (promotion << 12)
+						count += 1
+				else:
+					buffer[count] = move
+					count += 1
+
+		# en passant takes a piece off a square the capturing pawn does not land on, which can uncover a check along
+		# the rank, so it is tested by lifting both pawns off the board and looking from the king again
+		if self.en_passant is not None and noisy:
+			captured_square = self.en_passant - forward
+			captured = self.squares[captured_square]
+			if captured is not None and captured.side != side and captured.kind == PAWN:
+				for from_square in iterBits(PAWN_ATTACKS[1 - side][self.en_passant] & bitboards[base + PAWN]):
+					after = (occupied ^ (1 << from_square) ^ (1 << captured_square)) | (1 << self.en_passant)
+					if not self.attackers(king_square, 1 - side, after) & ~(1 << captured_square):
+						buffer[count] = from_square | (self.en_passant << 6) | MOVE_CAPTURE | MOVE_EN_PASSANT
+						count += 1
+
+		for kind in (KNIGHT, BISHOP, ROOK, QUEEN):
+			for from_square in iterBits(bitboards[base + kind]):
+				destinations = attacksFrom(kind, side, from_square, occupied) & stage & targets
+				if from_square in pins:
+					destinations &= pins[from_square]
+				for to_square in iterBits(destinations):
+					buffer[count] = from_square | (to_square << 6) | (MOVE_CAPTURE if (enemy >> to_square) & 1 else 0)
+					count += 1
+
+		move_list.count = count
+		return move_list
+
+	def generateCastling(self, side, buffer, count):
+		"""
+		Adds the castling moves of one color to a move buffer. The squares between king and rook have to be empty, and
+		the king can neither start on, pass over, nor land on an attacked square
+		:param side: color index (0 white, 1 black) of the player moving, who must not be in check
+		:param buffer: the move array to write into
+		:param count: how many moves the buffer already holds
+		:return: the new number of moves in the buffer
+		"""
+		home = 0 if side == 0 else (SIZE - 1) * SIZE
+		rooks = self.bitboards[side * 6 + ROOK]
+		if not (self.bitboards[side * 6 + KING] >> (home + 4)) & 1:
+			return count
+
+		if self.castling & CASTLE_SHORT[side] and not (self.occupied >> (home + 5)) & 3 and (rooks >> (home + 7)) & 1 and \
+				not self.isSquareAttacked(home + 5, 1 - side) and not self.isSquareAttacked(home + 6, 1 - side):
+			buffer[count] = (home + 4) | ((home + 6) << 6) | MOVE_CASTLE
+			count += 1
+		if self.castling & CASTLE_LONG[side] and not (self.occupied >> (home + 1)) & 7 and (rooks >> home) & 1 and \
+				not self.isSquareAttacked(home + 3, 1 - side) and not self.isSquareAttacked(home + 2, 1 - side):
+			buffer[count] = (home + 4) | ((home + 2) << 6) | MOVE_CASTLE
+			count += 1
+		return count
+
+	def givesCheck(self, move):
+		"""
+		Whether a move checks the other king, worked out from the attack tables rather than by making it: either the
+		moved piece attacks the king from its new square or it uncovers one of its own sliders. Castling and en passant
+		move two pieces, so those rare moves are still made and unmade
+		:param move: the packed move
+		:return: True if the move gives check
+		"""
+		from_square = move & 63
+		to_square = (move >> 6) & 63
+		piece = self.squares[from_square]
+		side = piece.side
+		enemy_king = self.bitboards[(1 - side) * 6 + KING].bit_length() - 1
+
+		if move & (MOVE_CASTLE | MOVE_EN_PASSANT):
+			self.makeMove(move)
+			check = self.isSquareAttacked(enemy_king, side)
+			self.unmakeMove()
+			return check
+
+		kind = (move >> 12) & 7 or piece.kind
+		after = (self.occupied & ~(1 << from_square)) | (1 << to_square)
+		if (attacksFrom(kind, side, to_square, after) >> enemy_king) & 1:
+			return True
+
+		base = side * 6
+		straight = (self.bitboards[base + ROOK] | self.bitboards[base + QUEEN]) & ~(1 << from_square)
+		diagonal = (self.bitboards[base + BISHOP] | self.bitboards[base + QUEEN]) & ~(1 << from_square)
+		return bool((straight and rookAttacks(enemy_king, after) & straight) or
+					(diagonal and bishopAttacks(enemy_king, after) & diagonal))
+
+	def moveNotation(self, move, legal_moves=None):
+		"""
+		Standard algebraic notation for a packed move, only worked out when a move is said to or matched against the
+		player
+		:param move: the packed move
+		:param legal_moves: the mover's legal moves if already generated, used to tell apart pieces of the same type
+		:return: the notation string
+		"""
+		if legal_moves is None:
+			legal_moves = self.generateLegalMoves(self.squares[move & 63].side, self.notation_moves)
+
+		to_square = (move >> 6) & 63
+		kind = self.squares[move & 63].kind
+		rivals = [other & 63 for other in legal_moves
+				  if (other >> 6) & 63 == to_square and other & 63 != move & 63 and self.squares[other & 63].kind == kind]
+		return self.formatNotation(move, rivals, self.givesCheck(move))
+
+	def formatNotation(self, move, rivals, gives_check):
+		"""
+		Writes out standard algebraic notation for a packed move
+		:param move: the packed move
+		:param rivals: from squares of other pieces of the same type that can legally go to the same square
+		:param gives_check: whether or not the move puts the other player in check
+		:return: the notation string
+		"""
+		from_square = move & 63
+		to_square = (move >> 6) & 63
+		piece = self.squares[from_square]
+		target = SQUARE_NAMES[to_square]
+
+		if move & MOVE_CASTLE:
+			notation = "O-O" if to_square > from_square else "O-O-O"
+		elif piece.kind == PAWN:
+			# special notation for the pawns, since we say "e4" not "Pe4"
+			notation = SQUARE_NAMES[from_square][0] + "x" + target if move & MOVE_CAPTURE else target
+			if (move >> 12) & 7:
+				notation += "=" + PIECE_LETTERS[(move >> 12) & 7]
+		else:
+			# if another piece of the same type can go to the same square use the file letter, if one is also on the
+			# same file use the rank number, and with more than 2 pieces possibly both, ie. Ra8, R1a8 or Ra1a8
+			notation = PIECE_LETTERS[piece.kind]
+			if rivals:
+				if all((rival & 7) != (from_square & 7) for rival in rivals):
+					notation += SQUARE_NAMES[from_square][0]
+				elif all((rival >> 3) != (from_square >> 3) for rival in rivals):
+					notation += SQUARE_NAMES[from_square][1]
+				else:
+					notation += SQUARE_NAMES[from_square]
+			if move & MOVE_CAPTURE:
+				notation += "x"
+			notation += target
+
+		if gives_check:
+			notation += "+"
+		return notation
+
+	def parseNotation(self, notation, legal_moves):
+		"""
+		Decodes a move in algebraic notation (piece, optional disambiguation, capture, target square and promotion) and
+		looks it up directly in the legal moves, rather than writing out notation for every legal move and comparing
+		strings. Check marks are optional and the capture mark is not enforced, castling can be given as O-O or as the
+		king's move
+		:param notation: the move as said by the player
+		:param legal_moves: the legal moves of the player making it
+		:return: the packed move, or None if it is not legal or does not pick out exactly one move
+		"""
+		text = notation.strip().replace(" ", "").rstrip("+#!?")
+		if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+			for move in legal_moves:
+				if move & MOVE_CASTLE and ((move >> 6) & 63 > (move & 63)) == (len(text) == 3):
+					return move
+			return None
+
+		decoded = SAN_PATTERN.match(text)
+		if decoded is None:
+			return None
+		letter, from_file, from_rank, capture, target, promotion = decoded.groups()
+
+		kind = PIECE_LETTERS.index(letter) if letter else PAWN
+		to_square = SQUARE_NAMES.index(target)
+		if kind == PAWN and from_file is None:
+			from_file = target[0]
+		promotion = PIECE_LETTERS.index(promotion) if promotion else 0
+
+		found = None
+		for move in legal_moves:
+			from_square = move & 63
+			if (move >> 6) & 63 != to_square or self.squares[from_square].kind != kind:
+				continue
+			if (from_file is not None and SQUARE_NAMES[from_square][0] != from_file) or \
+					(from_rank is not None and SQUARE_NAMES[from_square][1] != from_rank):
+				continue
+			if (move >> 12) & 7 not in (promotion, QUEEN if not promotion else promotion):
+				continue
+			if found is not None:
+				return None
+			found = move
+		return found
+
+	def coordinate_to_notation(self, target_piece, target_location, gives_check, promotion=None):
+		"""
+		Decodes the move into algebraic notation, for callers still working with piece objects and coordinates
+		:param target_piece: the piece thats being moved
+		:param target_location: the location to where the piece is moving in (rank, file) relative to bottom left corner
+		:param gives_check: whether or not the move puts the other play in check
+		:param promotion: the type of piece a pawn promotes to, if it does
+		:return: returns a string corresponding to the algebraic notation for the input
+		"""
+		assert isinstance(target_piece, ChessPiece)
+		assert isinstance(target_location, tuple)
+		assert isinstance(gives_check, bool)
+
+		move = self.encodeMove(target_piece.square, squareIndex(target_location[0], target_location[1]), promotion)
+		to_square = (move >> 6) & 63
+		rivals = [other & 63 for other in self.generateLegalMoves(target_piece.side, self.notation_moves)
+				  if (other >> 6) & 63 == to_square and other & 63 != target_piece.square and
+				  self.squares[other & 63].kind == target_piece.kind]
+		return self.formatNotation(move, rivals, gives_check)
+
+	def perft(self, depth, ply=0):
+		"""
+		Counts the leaf nodes of the legal move tree to a fixed depth, the standard check of a move generator against
+		known counts. The last ply is counted straight off the move list without making the moves
+		:param depth: plies to go down
+		:param ply: distance from the root, picks the move buffer
+		:return: number of leaf nodes
+		"""
+		if depth == 0:
+			return 1
+		moves = self.generateLegalMoves(self.side, self.move_lists[ply])
+		if depth == 1:
+			return moves.count
+
+		nodes = 0
+		for move in moves:
+			self.makeMove(move)
+			nodes += self.perft(depth - 1, ply + 1)
+			self.unmakeMove()
+		return nodes
+
+	def checkEvaluation(self, depth, ply=0):
+		"""
+		Walks the legal move tree to a fixed depth like perft, comparing the running evaluation terms with
+		computeEvaluation after every move made and every move taken back
+		:param depth: plies to go down
+		:param ply: distance from the root, picks the move buffer
+		:return: number of positions where the running terms were wrong
+		"""
+		mismatches = 0
+		if (self.midgame, self.endgame, self.phase) != self.computeEvaluation():
+			mismatches += 1
+		if depth == 0:
+			return mismatches
+
+		for move in self.generateLegalMoves(self.side, self.move_lists[ply]):
+			self.makeMove(move)
+			mismatches += self.checkEvaluation(depth - 1, ply + 1)
+			self.unmakeMove()
+			if (self.midgame, self.endgame, self.phase) != self.computeEvaluation():
+				mismatches += 1
+		return mismatches
+
+	def divide(self, depth):
+		"""
+		Perft split up by root move, to narrow down which move a wrong count comes from
+		:param depth: plies to go down, the root move included
+		:return: list of (packed root move, leaf nodes under it)
+		"""
+		assert depth >= 1
+		counts = []
+		for move in list(self.generateLegalMoves(self.side, self.move_lists[0])):
+			self.makeMove(move)
+			counts.append((move, self.perft(depth - 1, 1)))
+			self.unmakeMove()
+		return counts
+
+	def playMove(self, move, legal_moves=None):
+		"""
+		Plays a move in the game, as opposed to the search making and unmaking moves, so it is also written to the game
+		file if one is open
+		:param move: the packed move
+		:param legal_moves: the mover's legal moves if already generated
+		:return: the notation of the move
+		"""
+		notation = self.moveNotation(move, legal_moves)
+		self.makeMove(move)
+		if self.recorder is not None:
+			self.recorder.writeMove(notation)
+		return notation
+
+	def replay(self, moves, fen=FEN_STARTING):
+		"""
+		Plays through a game's moves one at a time, ie. from readPgn
+		:param moves: the moves in algebraic notation
+		:param fen: the position the game started from
+		:return: generator of the packed moves, the match is left in the position after each one as it is handed out
+		"""
+		self.setupPosition(unicode(fen))
+		for notation in moves:
+			move = self.parseNotation(notation, self.generateLegalMoves(self.side, self.notation_moves))
+			if move is None:
+				raise ValueError("illegal move in game: %s" % notation)
+			self.makeMove(move)
+			yield move
+
+	def openGameFile(self, path):
+		"""
+		Starts saving the game to a PGN file. If the last game in the file was never finished, ie. the process died or
+		was stopped in the middle of it, that game is played back onto the board and carries on where it left off,
+		otherwise a new game is started at the end of the file
+		:param path: the PGN file, created if it does not exist
+		:return: True if an unfinished game was resumed
+		"""
+		# only the last game matters, so the file is read from its last Event header on
+		last_game = None
+		data = b""
+		game_start = None
+		if os.path.exists(path):
+			with open(path, "rb") as pgn_file:
+				game_start = findLastLine(pgn_file, b"[Event ")
+				if game_start is not None:
+					pgn_file.seek(game_start)
+					data = pgn_file.read()
+			for last_game in parsePgn(data.decode("utf-8", errors="replace").splitlines(True)):
+				pass
+
+		# a game ended by finishGame has a result, even if only "*", one that was cut off has none
+		resumed = last_game is not None and last_game[2] is None
+		if resumed:
+			headers, moves, result = last_game
+			fields = headers.get("FEN", FEN_STARTING).split()
+			played = []
+			try:
+				for move in self.replay(moves, " ".join(fields)):
+					played.append(moves[len(played)])
+			except ValueError:
+				# a move cut off half written by a crash, the game goes on from the one before it
+				pass
+
+			# the moves are cut off after the headers and written again, which drops anything half written
+			headers_end = game_start
+			result_tag = None
+			for line in data.splitlines(True):
+				if PGN_HEADER.match(line.decode("utf-8", errors="replace")) is None:
+					break
+				if line.startswith((PGN_RESULT_TAG % "*").encode("utf-8")) and \
+						len(line.rstrip(b"\r\n")) >= PGN_RESULT_WIDTH:
+					result_tag = headers_end
+				headers_end += len(line)
+			with open(path, "r+b") as pgn_file:
+				pgn_file.truncate(headers_end)
+
+			self.recorder = PgnWriter(path)
+			self.recorder.resumeGame(int(fields[5], 10) if len(fields) > 5 else 1, 0 if fields[1] == "w" else 1,
+									 result_tag)
+			for notation in played:
+				self.recorder.writeMove(notation)
+			self.recorder.sync()
+		else:
+			self.recorder = PgnWriter(path)
+			self.recorder.startGame(self.to_fen())
+		self.game_file = path
+		return resumed
+
+	def gameResult(self):
+		"""
+		The result of the game in the position on the board
+		:return: "1-0" or "0-1" for checkmate, "1/2-1/2" for stalemate or a draw by rule (see drawReason), otherwise
+			"*"
+		"""
+		if self.generateLegalMoves(self.side, self.notation_moves):
+			return "1/2-1/2" if self.drawReason() is not None else "*"
+		king = self.bitboards[self.side * 6 + KING].bit_length() - 1
+		if not self.isSquareAttacked(king, 1 - self.side):
+			return "1/2-1/2"
+		return "0-1" if self.side == 0 else "1-0"
+
+	def drawReason(self):
+		"""
+		Whether the game is drawn by one of the rules that do not depend on the legal moves, checkmate and stalemate
+		are left to the caller. The fifty move rule and threefold repetition are applied as soon as they happen rather
+		than waiting for a player to claim them
+		:return: "fifty moves", "repetition", "insufficient material" or None
+		"""
+		if self.half_move >= 100:
+			return "fifty moves"
+		if self.repetitions() >= 2:
+			return "repetition"
+		if self.insufficientMaterial():
+			return "insufficient material"
+		return None
+
+	def repetitions(self):
+		"""
+		How many times the position on the board has been on it before. A capture or pawn move can never be taken
+		back, so only the positions since the last one (half_move of them) can repeat this one, and only every other
+		one of those has the same side to move. That makes this a short look back up the hashes on the undo stack
+		:return: number of earlier occurrences
+		"""
+		hashes = self.undo_hashes
+		hash_key = self.hash
+		count = 0
+		for ply in range(self.ply - 2, max(self.ply - self.half_move, 0) - 1, -2):
+			if hashes[ply] == hash_key:
+				count += 1
+		return count
+
+	def insufficientMaterial(self):
+		"""
+		Whether neither side could ever checkmate: kings alone, with one knight or bishop, or with only bishops that
+		all stand on squares of the same color
+		:return: True if the position is a dead draw
+		"""
+		bitboards = self.bitboards
+		if bitboards[PAWN] | bitboards[ROOK] | bitboards[QUEEN] | bitboards[6 + PAWN] | bitboards[6 + ROOK] | \
+				bitboards[6 + QUEEN]:
+			return False
+		knights = bitboards[KNIGHT] | bitboards[6 + KNIGHT]
+		bishops = bitboards[BISHOP] | bitboards[6 + BISHOP]
+		minors = knights | bishops
+		if not minors & (minors - 1):
+			return True
+		return not knights and (not bishops & LIGHT_SQUARES or not bishops & ~LIGHT_SQUARES)
+
+	def finishGame(self, result=None):
+		"""
+		Writes the result to the game file and closes it
+		:param result: the result, worked out from the position if not given
+		"""
+		if self.recorder is not None:
+			self.recorder.finishGame(result or self.gameResult())
+			self.recorder.close()
+			self.recorder = None
+
+	def nextMove(self, move):
+		"""
+		Decides who it is that actually makes the next move
+		:param move: the move being played (if legal), or attempting to be played
+		:return: string containing the result of the move (ie. legal, illegal, checkmate, etc.)
+		"""
+		assert (self.move == self.white.color) or (self.move == self.black.color)
+		# making the move hands the turn over, so an illegal move leaves it with the same player
+		if self.move == self.white.color:
+			assert move is not None
+			result = self.white.makeMove(move)
+		else:
+			assert move is None
+			result = self.black.generateMove()
+		#assert isinstance(result, str)
+		return result
+
+
+class BoardView(object):
+	"""
+		The old 8x8 list of lists interface to a match, board[rank][file] is still a chess piece or None, but the
+		bitboards underneath are what actually hold the position
+	"""
+	__slots__ = ("match",)
+
+	def __init__(self, match):
+		self.match = match
+
+	def __getitem__(self, rank):
+		assert 0 <= rank < SIZE
+		return RankView(self.match, rank)
+
+	def __iter__(self):
+		for rank in range(SIZE):
+			yield RankView(self.match, rank)
+
+	def __len__(self):
+		return SIZE
+
+
+class RankView(object):
+	"""
+		A single rank of the board view, reads come from the squares list and writes go through the bitboards
+	"""
+	__slots__ = ("match", "rank")
+
+	def __init__(self, match, rank):
+		self.match = match
+		self.rank = rank
+
+	def __getitem__(self, file):
+		assert 0 <= file < SIZE
+		return self.match.squares[squareIndex(self.rank, file)]
+
+	def __setitem__(self, file, piece):
+		assert 0 <= file < SIZE
+		square = squareIndex(self.rank, file)
+		if self.match.squares[square] is not None:
+			self.match.removePiece(square)
+		if piece is not None:
+			self.match.addPiece(piece, square)
+
+	def __iter__(self):
+		for file in range(SIZE):
+			yield self.match.squares[squareIndex(self.rank, file)]
+
+	def __len__(self):
+		return SIZE
+
+
+class MoveList(object):
+	"""
+		Fixed size, array backed buffer of packed moves. Move generation writes into one of these instead of building a
+		new list, so a buffer per search ply is all the allocation it ever needs
+	"""
+	__slots__ = ("moves", "count")
+
+	def __init__(self, capacity=MAX_MOVES):
+		self.moves = array.array('I', [0] * capacity)
+		self.count = 0
+
+	def __getitem__(self, index):
+		if not 0 <= index < self.count:
+			raise IndexError(index)
+		return self.moves[index]
+
+	def __iter__(self):
+		moves = self.moves
+		for index in range(self.count):
+			yield moves[index]
+
+	def __len__(self):
+		return self.count
+
+
+class ChessPlayer(object):
+	__slots__ = ("parent", "color", "side", "availble_moves")
+
+	def __init__(self, parent, color):
+		"""
+		Initialization for chessplayer class, castling rights belong to the match's position (see castle_short and
+		castle_long) so joining a match leaves them as they are
+		:param parent: the chess match the chess player is playing in
+		:param color: usually white or black
+		"""
+		assert isinstance(parent, ChessMatch)
+		assert isinstance(color, unicode)
+
+		self.color = color
+		self.side = COLOR_INDEX[color]
+		self.parent = parent
+
+		self.availble_moves = MoveList()
+
+	def get_availble_moves(self):
+		"""
+		Fills the availble_moves buffer with every legal move as packed integers, notation is left until a move is
+		actually said or matched (see ChessMatch.moveNotation)
+		"""
+		self.parent.generateLegalMoves(COLOR_INDEX[self.color], self.availble_moves)
+
+	@property
+	def castle_short(self):
+		"""
+		Whether kingside castling is still allowed, kept in the match's castling rights
+		"""
+		return bool(self.parent.castling & CASTLE_SHORT[self.side])
+
+	@castle_short.setter
+	def castle_short(self, allowed):
+		self.setCastling(CASTLE_SHORT[self.side], allowed)
+
+	@property
+	def castle_long(self):
+		"""
+		Whether queenside castling is still allowed, kept in the match's castling rights
+		"""
+		return bool(self.parent.castling & CASTLE_LONG[self.side])
+
+	@castle_long.setter
+	def castle_long(self, allowed):
+		self.setCastling(CASTLE_LONG[self.side], allowed)
+
+	def setCastling(self, right, allowed):
+		"""
+		Gives or takes away one castling right in the match, keeping its hash up to date
+		:param right: the right's bit, see CASTLE_SHORT and CASTLE_LONG
+		:param allowed: whether the right is kept
+		"""
+		match = self.parent
+		castling = match.castling | right if allowed else match.castling & ~right
+		match.hash ^= ZOBRIST_CASTLING[match.castling] ^ ZOBRIST_CASTLING[castling]
+		match.castling = castling
+
+	@property
+	def inCheck(self):
+		"""
+		Evaluates whether the player is in check or not
+		:return: True if in check, false if not
+		"""
+		side = COLOR_INDEX[self.color]
+		kings_position = self.parent.bitboards[side * 6 + KING]
+		assert kings_position != 0
+
+		return self.parent.isSquareAttacked(kings_position.bit_length() - 1, 1 - side)
+
+	def makeMove(self, move_input):
+		"""
+		Specifies the move for a player to make, also checks if the move results in check or checkmate, and whether it
+		is a legal mobve or not
+		:param move_input: a string of algebraic notation. If its not algebratic notation or not a legal move, the 
+			function will handle it, no assertion as to the validity of the string shoule be made
+		:return: a string describing the outcome of the move
+		"""
+		assert isinstance(move_input, str)
+
+		self.get_availble_moves()
+		
+		if not self.availble_moves and self.inCheck:
+			return "Checkmate"
+		elif not self.availble_moves or self.parent.drawReason() is not None:
+			return "Draw"
+		else:
+			move = self.parent.parseNotation(move_input, self.availble_moves)
+			if move is None:
+				return "Illegal Move: " + move_input
+
+			self.parent.playMove(move, self.availble_moves)
+			return move_input
+
+
+class OpeningBook(object):
+	"""
+		Polyglot opening book. The file is memory mapped rather than read in, and since its 16 byte entries are sorted
+		by position key, a position's moves are found by binary search touching only a few pages of it
+	"""
+	def __init__(self, path):
+		"""
+		Opens and maps the book
+		:param path: path to the Polyglot .bin file
+		"""
+		self.path = path
+		self.random = random.Random()
+		with open(path, "rb") as book_file:
+			self.size = os.fstat(book_file.fileno()).st_size // BOOK_ENTRY.size
+			self.data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+
+	def __len__(self):
+		return self.size
+
+	def close(self):
+		"""
+		Unmaps the book
+		"""
+		if self.size:
+			self.data.close()
+		self.size = 0
+
+	def entries(self, key):
+		"""
+		Every book entry for a position
+		:param key: Polyglot key of the position, see ChessMatch.polyglotKey
+		:return: list of (Polyglot move, weight)
+		"""
+		low, high = 0, self.size
+		while low < high:
+			middle = (low + high) >> 1
+			if BOOK_ENTRY.unpack_from(self.data, middle * BOOK_ENTRY.size)[0] < key:
+				low = middle + 1
+			else:
+				high = middle
+
+		found = []
+		for index in range(low, self.size):
+			entry_key, move, weight, learn = BOOK_ENTRY.unpack_from(self.data, index * BOOK_ENTRY.size)
+			if entry_key != key:
+				break
+			found.append((move, weight))
+		return found
+
+	def moves(self, match, legal_moves):
+		"""
+		The book moves for the position on the board, translated to packed moves
+		:param match: the chess match
+		:param legal_moves: legal moves of the side to move, book moves that are not among them are dropped
+		:return: list of (packed move, weight)
+		"""
+		found = []
+		for book_move, weight in self.entries(match.polyglotKey()):
+			from_square = (book_move >> 6) & 63
+			to_square = book_move & 63
+			promotion = (book_move >> 12) & 7
+			# Polyglot writes castling as the king taking his own rook
+			piece = match.squares[from_square]
+			if piece is not None and piece.kind == KING and abs(to_square - from_square) in (3, 4):
+				to_square = from_square + 2 if to_square > from_square else from_square - 2
+			for move in legal_moves:
+				if move & 63 == from_square and (move >> 6) & 63 == to_square and (move >> 12) & 7 == promotion:
+					found.append((move, weight))
+					break
+		return found
+
+	def choose(self, match, legal_moves):
+		"""
+		Picks one of the position's book moves at random, each as likely as its weight says
+		:param match: the chess match
+		:param legal_moves: legal moves of the side to move
+		:return: the packed move, or None if the position is not in the book
+		"""
+		found = [(move, weight) for move, weight in self.moves(match, legal_moves) if weight > 0]
+		if not found:
+			return None
+		pick = self.random.randrange(sum(weight for move, weight in found))
+		for move, weight in found:
+			pick -= weight
+			if pick < 0:
+				return move
+
+
+class PgnWriter(object):
+	"""
+		Appends a game to a PGN file move by move as it is played. Writes go through the file buffer and are only synced
+		to the card every few moves or seconds, and at the end of the game, so a crash loses at most the last batch. The
+		Result header cannot be known up front, it is written as "*" with room to spare and overwritten in place when
+		the game is finished
+	"""
+	def __init__(self, path, sync_moves=PGN_SYNC_MOVES, sync_seconds=PGN_SYNC_SECONDS):
+		"""
+		Opens the file for appending
+		:param path: the PGN file
+		:param sync_moves: moves written between syncs
+		:param sync_seconds: longest time between syncs
+		"""
+		self.path = path
+		self.file = open(path, "a", encoding="utf-8")
+		self.result_tag = None
+		self.sync_moves = sync_moves
+		self.sync_seconds = sync_seconds
+		self.unsynced = 0
+		self.synced_at = time.monotonic()
+		self.full_move = 1
+		self.side = 0
+		self.line = 0
+		self.first = True
+
+	def startGame(self, fen=FEN_STARTING, white="Player", black="Jasper"):
+		"""
+		Writes the headers of a new game
+		:param fen: the position the game starts from
+		:param white: name of the white player
+		:param black: name of the black player
+		"""
+		headers = [("Event", "Casual game"), ("Site", "Jasper"), ("Date", time.strftime("%Y.%m.%d")), ("Round", "-"),
+				   ("White", white), ("Black", black)]
+		text = "".join('[%s "%s"]\n' % header for header in headers)
+		self.file.flush()
+		self.result_tag = os.fstat(self.file.fileno()).st_size + len(text.encode("utf-8"))
+		text += (PGN_RESULT_TAG % "*").ljust(PGN_RESULT_WIDTH) + "\n"
+		if fen != FEN_STARTING:
+			text += '[SetUp "1"]\n[FEN "%s"]\n' % fen
+		self.file.write(text + "\n")
+		fields = fen.split()
+		self.full_move = int(fields[5], 10) if len(fields) > 5 else 1
+		self.side = 0 if fields[1] == "w" else 1
+		self.first = True
+		self.line = 0
+		self.sync()
+
+	def resumeGame(self, full_move, side, result_tag=None):
+		"""
+		Carries on writing a game whose headers are already at the end of the file, the moves start on a line of their
+		own after a blank one
+		:param full_move: number of the next move
+		:param side: color index (0 white, 1 black) of the next player to move
+		:param result_tag: byte offset of the game's padded Result header, None if it has no room for the result
+		"""
+		self.full_move = full_move
+		self.side = side
+		self.first = True
+		self.file.write("\n")
+		self.line = 0
+		self.result_tag = result_tag
+
+	def writeMove(self, notation):
+		"""
+		Adds a move, with its move number in front of white's moves (and of black's first move if black starts)
+		:param notation: the move in algebraic notation
+		"""
+		if self.side == 0:
+			text = "%d. %s" % (self.full_move, notation)
+		elif self.first:
+			text = "%d... %s" % (self.full_move, notation)
+		else:
+			text = notation
+		self.writeToken(text)
+
+		self.first = False
+		if self.side == 1:
+			self.full_move += 1
+		self.side ^= 1
+
+		self.unsynced += 1
+		if self.unsynced >= self.sync_moves or time.monotonic() - self.synced_at >= self.sync_seconds:
+			self.sync()
+
+	def writeToken(self, text):
+		"""
+		Writes movetext, starting a new line instead of going past PGN_LINE characters
+		:param text: the text to add
+		"""
+		if self.line and self.line + 1 + len(text) > PGN_LINE:
+			self.file.write("\n")
+			self.line = 0
+		if self.line:
+			text = " " + text
+		self.file.write(text)
+		self.line += len(text)
+
+	def finishGame(self, result):
+		"""
+		Ends the game with its result and syncs it
+		:param result: "1-0", "0-1", "1/2-1/2" or "*"
+		"""
+		assert result in PGN_RESULTS
+		self.writeToken(result)
+		self.file.write("\n\n")
+		self.line = 0
+		self.sync()
+
+		if self.result_tag is not None and result != "*":
+			with open(self.path, "r+b") as pgn_file:
+				pgn_file.seek(self.result_tag)
+				pgn_file.write((PGN_RESULT_TAG % result).ljust(PGN_RESULT_WIDTH).encode("utf-8"))
+				pgn_file.flush()
+				os.fsync(pgn_file.fileno())
+			self.result_tag = None
+
+	def sync(self):
+		"""
+		Pushes everything written so far out to the card
+		"""
+		self.file.flush()
+		os.fsync(self.file.fileno())
+		self.unsynced = 0
+		self.synced_at = time.monotonic()
+
+	def close(self):
+		"""
+		Syncs and closes the file
+		"""
+		if not self.file.closed:
+			self.sync()
+			self.file.close()
+
+
+def findLastLine(pgn_file, prefix):
+	"""
+	Finds the last line of a file that starts with prefix, reading a growing piece of the end of the file at a time so
+	a long archive is not read through to get at its last game
+	:param pgn_file: file open for reading in binary
+	:param prefix: bytes the line starts with
+	:return: byte offset of the line, or None if there is none
+	"""
+	end = pgn_file.seek(0, os.SEEK_END)
+	length = 4096
+	while True:
+		start = max(end - length, 0)
+		pgn_file.seek(start)
+		data = pgn_file.read(end - start)
+		found = data.rfind(b"\n" + prefix)
+		if found >= 0:
+			return start + found + 1
+		if start == 0:
+			return 0 if data.startswith(prefix) else None
+		length *= 2
+
+
+def readPgn(path):
+	"""
+	Reads the games in a PGN file one at a time, a line at a time, so archives of any size can be gone through
+	:param path: the PGN file
+	:return: generator of (headers dict, list of moves in algebraic notation, result or None if the moves stop without
+		one)
+	"""
+	with open(path, encoding="utf-8", errors="replace") as pgn_file:
+		for game in parsePgn(pgn_file):
+			yield game
+
+
+def parsePgn(lines):
+	"""
+	Splits PGN text up into games. Comments, variations, numeric annotations and move numbers are skipped over, so only
+	the moves of the main line are kept
+	:param lines: iterable of lines, ie. an open file
+	:return: generator of (headers dict, list of moves in algebraic notation, result or None if the moves stop without
+		one)
+	"""
+	headers = {}
+	moves = []
+	result = None
+	in_movetext = False
+	in_comment = False
+	variations = 0
+	for line in lines:
+		if in_comment:
+			end = line.find("}")
+			if end < 0:
+				continue
+			line = line[end + 1:]
+			in_comment = False
+
+		header = PGN_HEADER.match(line)
+		if header is not None and not variations:
+			if in_movetext:
+				yield headers, moves, result
+				headers, moves, result, in_movetext = {}, [], None, False
+			headers[header.group(1)] = header.group(2)
+			continue
+
+		for token in PGN_TOKEN.findall(line):
+			in_movetext = True
+			if token[0] == "{":
+				in_comment = not token.endswith("}")
+			elif token == "(":
+				variations += 1
+			elif token == ")":
+				variations = max(variations - 1, 0)
+			elif variations or token[0] in ";$" or token[0].isdigit() and token.rstrip(".").isdigit():
+				continue
+			elif token in PGN_RESULTS:
+				result = token
+			else:
+				moves.append(token)
+
+	if in_movetext or headers:
+		yield headers, moves, result
+
+
+class Tablebase(object):
+	"""
+		Syzygy endgame tablebases, probed through the python-chess package, which is only needed (and only imported)
+		when tablebases are used. It maps table files as they are first probed and keeps at most a set number of them
+		open, closing the least recently used. Win/draw/loss results are cached by our Zobrist hash, since the search
+		keeps coming back to the same positions
+	"""
+	def __init__(self, directory, max_pieces=TABLEBASE_PIECES, max_files=TABLEBASE_FILES):
+		"""
+		Finds the tables in a directory, nothing is opened until it is probed
+		:param directory: directory holding the .rtbw (win/draw/loss) and .rtbz (distance to zeroing) files
+		:param max_pieces: most pieces, kings included, to probe positions with
+		:param max_files: most table files to keep mapped at once
+		"""
+		import chess
+		import chess.syzygy
+
+		self.chess = chess
+		self.directory = directory
+		self.tables = chess.syzygy.Tablebase(max_fds=max_files)
+		self.tables.add_directory(directory)
+		self.board = chess.Board()
+		self.cache = {}
+
+		# table files are named after their pieces, ie. KQvK.rtbw
+		names = [os.path.splitext(name)[0] for name in os.listdir(directory) if name.endswith(".rtbw")]
+		self.pieces = min(max_pieces, max(len(name) - 1 for name in names)) if names else 0
+
+	def close(self):
+		"""
+		Closes every mapped table file
+		"""
+		self.tables.close()
+		self.cache = {}
+
+	def setBoard(self, match):
+		"""
+		Copies the position on the board over to the python-chess board the tables are probed with
+		:param match: the chess match
+		:return: the python-chess board, or None if it cannot be probed (castling rights, or too many pieces)
+		"""
+		if match.castling or popCount(match.occupied) > self.pieces:
+			return None
+		board = self.board
+		board.clear()
+		for code in range(12):
+			piece = self.chess.Piece(code % 6 + 1, code < 6)
+			for square in iterBits(match.bitboards[code]):
+				board.set_piece_at(square, piece)
+		board.turn = match.side == 0
+		board.ep_square = match.en_passant
+		return board
+
+	def probeWdl(self, match):
+		"""
+		Win/draw/loss of the position on the board
+		:param match: the chess match
+		:return: 2 win, 1 cursed win, 0 draw, -1 blessed loss, -2 loss for the side to move, or None if not known
+		"""
+		wdl = self.cache.get(match.hash)
+		if wdl is None:
+			board = self.setBoard(match)
+			if board is None:
+				return None
+			try:
+				wdl = self.tables.probe_wdl(board)
+			except KeyError:
+				# no table for this material
+				return None
+			if len(self.cache) >= TABLEBASE_CACHE:
+				self.cache.clear()
+			self.cache[match.hash] = wdl
+		return wdl
+
+	def probeDtz(self, match):
+		"""
+		Distance to zeroing of the position on the board, the number of plies to the next capture or pawn move that
+		keeps the best result
+		:param match: the chess match
+		:return: plies, positive when winning and negative when losing, or None if not known
+		"""
+		board = self.setBoard(match)
+		if board is None:
+			return None
+		try:
+			return self.tables.probe_dtz(board)
+		except KeyError:
+			return None
+
+	def bestMove(self, match, legal_moves):
+		"""
+		Picks a move at the root straight from the tables: keep the best result, and when winning take the shortest
+		distance to zeroing, when losing hold out for as long as possible. Capture or pawn move or not only breaks ties.
+		A win or loss further off than the fifty move counter leaves room for is taken as the draw it will be
+		:param match: the chess match
+		:param legal_moves: legal moves of the side to move
+		:return: (packed move, score) or None if the position is not in the tables
+		"""
+		if match.castling or popCount(match.occupied) > self.pieces:
+			return None
+
+		best = None
+		best_rank = None
+		for move in legal_moves:
+			zeroing = bool(move & MOVE_CAPTURE) or match.squares[move & 63].kind == PAWN
+			match.makeMove(move)
+			wdl = self.probeWdl(match)
+			dtz = self.probeDtz(match)
+			match.unmakeMove()
+			if wdl is None or dtz is None:
+				return None
+
+			# the tables answer for the other player after the move, and count as if the fifty move counter were zero
+			result = -wdl
+			if abs(result) == 2 and not zeroing and match.half_move + 1 + abs(dtz) > 100:
+				result //= 2
+			if result > 0:
+				rank = (result, -abs(dtz), zeroing)
+			elif result < 0:
+				rank = (result, abs(dtz), not zeroing)
+			else:
+				rank = (0, 0, False)
+			if best_rank is None or rank > best_rank:
+				best = move
+				best_rank = rank
+		return best, tablebaseScore(best_rank[0], 1)
+
+
+class TranspositionTable(object):
+	"""
+		Fixed size table of search results keyed by Zobrist hash. Entries live in two preallocated arrays, a 64 bit key
+		and 64 bits of packed data, so the memory it takes is set once by the cap it is given and never grows. The key
+		is stored XORed with the data, so when several processes share the table an entry torn by two writers at once
+		no longer matches its key and is simply missed
+	"""
+	ENTRY_BYTES = 16
+
+	def __init__(self, megabytes=TABLE_MEGABYTES, shared=False, buffer=None):
+		"""
+		Allocates the table, the largest power of two number of entries that fits in the memory cap
+		:param megabytes: memory cap for the table
+		:param shared: put the table in shared memory so search processes can use it together
+		:param buffer: the shared memory of an existing table to attach to, its size must match megabytes
+		"""
+		assert megabytes > 0
+		entries = 1
+		while entries * 2 * self.ENTRY_BYTES <= megabytes * 1024 * 1024:
+			entries *= 2
+
+		self.mask = entries - 1
+		self.buffer = buffer
+		if shared and buffer is None:
+			import multiprocessing
+			self.buffer = multiprocessing.RawArray('B', entries * self.ENTRY_BYTES)
+		if self.buffer is not None:
+			assert len(self.buffer) == entries * self.ENTRY_BYTES
+			view = memoryview(self.buffer).cast('B')
+			self.keys = view[:8 * entries].cast('Q')
+			self.data = view[8 * entries:].cast('Q')
+		else:
+			# repeating a one entry array allocates the table once, with no zeroed bytes object to copy from
+			self.keys = array.array('Q', [0]) * entries
+			self.data = array.array('Q', [0]) * entries
+		self.age = 0
+
+	def __len__(self):
+		return self.mask + 1
+
+	def newSearch(self):
+		"""
+		Ages the table, entries left from earlier searches are the first to be replaced
+		"""
+		self.age = (self.age + 1) & 63
+
+	def clear(self):
+		"""
+		Empties every entry, for a new game
+		"""
+		for index in range(self.mask + 1):
+			self.keys[index] = 0
+			self.data[index] = 0
+		self.age = 0
+
+	def probe(self, key):
+		"""
+		Looks up a position
+		:param key: Zobrist hash of the position
+		:return: (move, score, depth, bound) or None if the position is not in the table
+		"""
+		index = key & self.mask
+		data = self.data[index]
+		if self.keys[index] ^ data != key:
+			return None
+		return (data & 0x3FFFF, ((data >> 18) & 0xFFFF) - 32768, (data >> 34) & 0xFF, (data >> 42) & 3)
+
+	def store(self, key, move, score, depth, bound):
+		"""
+		Saves a search result. The slot is taken over if it is empty, holds the same position, was left by an older
+		search or was searched less deeply, otherwise the deeper result already there is kept
+		:param key: Zobrist hash of the position
+		:param move: best packed move found, 0 if none
+		:param score: score of the position, within a 16 bit signed range
+		:param depth: depth the position was searched to
+		:param bound: BOUND_EXACT, BOUND_LOWER or BOUND_UPPER
+		"""
+		index = key & self.mask
+		stored = self.data[index]
+		same = self.keys[index] ^ stored == key
+		if stored and not same and (stored >> 44) == self.age and depth < (stored >> 34) & 0xFF:
+			return
+		if not move and same:
+			move = stored & 0x3FFFF
+
+		data = move | ((score + 32768) << 18) | (min(depth, 255) << 34) | (bound << 42) | (self.age << 44)
+		self.keys[index] = key ^ data
+		self.data[index] = data
+
+
+# the helper engines of a search process, set up once when the pool starts it
+SEARCH_WORKER = None
+
+
+def initSearchWorker(buffer, megabytes, stop_event, tablebase_directory=None):
+	"""
+	Sets up a helper process of the parallel search with a match of its own and an engine for each color, both using
+	the shared transposition table (or a table of their own when the root moves are being split)
+	:param buffer: shared memory of the transposition table, None for a private table
+	:param megabytes: memory cap of the transposition table
+	:param stop_event: set by the main process when the helpers should stop
+	:param tablebase_directory: Syzygy tablebases to probe, None for none
+	"""
+	global SEARCH_WORKER
+
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	table = TranspositionTable(megabytes, buffer=buffer)
+	tablebase = Tablebase(tablebase_directory) if tablebase_directory is not None else None
+	match = ChessMatch()
+	engines = (ChessEngine(match, "WHITE", table=table), ChessEngine(match, "BLACK", table=table))
+	for engine in engines:
+		engine.stop_event = stop_event
+		engine.tablebase = tablebase
+	SEARCH_WORKER = engines
+
+
+def runSearchWorker(task):
+	"""
+	Searches one position in a helper process
+	:param task: (position from packPosition, time limit, node limit, max depth, start depth, root moves or None,
+		age of the main transposition table)
+	:return: ((move, score) of every completed iteration, depth of the last one, nodes searched)
+	"""
+	position, time_limit, node_limit, max_depth, start_depth, root_moves, age = task
+	match = SEARCH_WORKER[0].parent
+	match.unpackPosition(position)
+	engine = SEARCH_WORKER[match.side]
+	# the search ages the table once more, leaving it at the same age as the main process
+	engine.table.age = age
+	engine.search(time_limit, node_limit, max_depth, start_depth, root_moves)
+	return engine.iterations, engine.completed_depth, engine.nodes
+
+
+class ChessEngine(ChessPlayer):
+	# no __slots__ here, there are only ever one or two engines so their search state is simpler kept in a __dict__
+	def __init__(self, parent, color, table_megabytes=TABLE_MEGABYTES, time_limit=SEARCH_SECONDS, node_limit=None,
+				 workers=1, split_root=False, table=None):
+		"""
+		Initialization for the chess engine, a chess player with a transposition table to remember positions by
+		:param parent: the chess match the engine is playing in
+		:param color: usually black
+		:param table_megabytes: memory cap of the transposition table
+		:param time_limit: seconds the engine may think about a move
+		:param node_limit: most positions the engine may look at for a move, None for no limit
+		:param workers: processes to search with, see parallelSearch
+		:param split_root: share the root moves out between the processes instead of sharing the table
+		:param table: transposition table to use, otherwise one is allocated by the first search (see
+			transpositionTable) so an engine that never searches costs no table memory
+		"""
+		super().__init__(parent, color)
+		self.table_megabytes = table_megabytes
+		self.table = table
+		self.time_limit = time_limit
+		self.node_limit = node_limit
+
+		# search bookkeeping, reset by every search
+		self.nodes = 0
+		self.deadline = None
+		self.stopped = False
+		self.completed_depth = 0
+		self.root_moves = None
+		self.root_move = 0
+		self.iterations = []
+
+		# parallel search, the process pool is started on the first search that needs it
+		self.workers = workers
+		self.split_root = split_root
+		self.pool = None
+		self.pool_workers = 0
+		self.stop_event = None
+		self.search_report = None
+
+		# opening book, searched only once the game has left it, and endgame tablebases for when few pieces are left
+		self.book = None
+		self.tablebase = None
+
+		# pondering, searching in a background thread on a copy of the match while the other player thinks
+		self.ponder = False
+		self.ponder_engines = None
+		self.ponder_thread = None
+		self.ponder_key = None
+
+		# move ordering: a capture and a quiet move buffer per ply, two killer moves per ply, and a history score per
+		# color and (from, to) pair for quiet moves that caused cutoffs
+		self.capture_lists = [MoveList() for ply in range(MAX_PLY)]
+		self.quiet_lists = [MoveList() for ply in range(MAX_PLY)]
+		self.killers = [[0, 0] for ply in range(MAX_PLY)]
+		self.history_scores = [[0] * 4096, [0] * 4096]
+
+	def generateMove(self):
+		"""
+		Uses the power of the machine to determine what should be played in a particular position, searching within
+		the engine's time and node budget, then plays that move
+		:return: the notation of the move played, or the result of the game if there is no move to play
+		"""
+		pondered = self.stopPondering()
+		self.get_availble_moves()
+		if not self.availble_moves:
+			return "Checkmate" if self.inCheck else "Draw"
+		if self.parent.drawReason() is not None:
+			return "Draw"
+
+		book_move = self.book.choose(self.parent, self.availble_moves) if self.book is not None else None
+		# the tablebase is only probed once the book is out of moves, which it is long before the endgame
+		known = None
+		if book_move is None and self.tablebase is not None:
+			known = self.tablebase.bestMove(self.parent, self.availble_moves)
+		if book_move is not None:
+			move, score = book_move, 0
+		elif known is not None:
+			move, score = known
+		elif pondered is not None:
+			move, score = pondered
+		elif self.workers > 1:
+			move, score = self.parallelSearch(self.time_limit, self.node_limit)
+		else:
+			move, score = self.search(self.time_limit, self.node_limit)
+		return self.parent.playMove(move, self.availble_moves)
+
+	def search(self, time_limit=SEARCH_SECONDS, node_limit=None, max_depth=MAX_PLY - 1, start_depth=1,
+			   root_moves=None):
+		"""
+		Iterative deepening: searches one ply deeper each time until the time or node budget runs out, and answers
+		with the best move of the last iteration that completed. An unfinished iteration is thrown away, so stopping
+		early never costs more than the positions looked at since the last check of the clock
+		:param time_limit: seconds to search for, None for no limit
+		:param node_limit: positions to search, None for no limit
+		:param max_depth: deepest iteration to start
+		:param start_depth: first iteration, helper processes start deeper so they do not all search the same tree
+		:param root_moves: only search these moves at the root, None for all of them
+		:return: (best packed move, score in centipawns from the engine's point of view)
+		"""
+		match = self.parent
+		assert match.side == self.side
+
+		self.transpositionTable().newSearch()
+		self.nodes = 0
+		self.stopped = False
+		for killers in self.killers:
+			killers[0] = killers[1] = 0
+		for scores in self.history_scores:
+			for index in range(4096):
+				scores[index] >>= 1
+		self.completed_depth = 0
+		self.iterations = []
+		self.deadline = None if time_limit is None else time.monotonic() + time_limit
+		self.node_limit = node_limit
+		self.root_moves = root_moves
+
+		# something to answer with even if the first iteration cannot finish
+		if root_moves is None:
+			root_moves = match.generateLegalMoves(match.side, match.move_lists[0])
+		assert len(root_moves) > 0
+		best_move = root_moves[0]
+		best_score = 0
+
+		for depth in range(start_depth, max_depth + 1):
+			score = self.alphaBeta(depth, -INFINITE, INFINITE, 0)
+			if self.stopped:
+				break
+
+			best_move = self.root_move
+			best_score = score
+			self.completed_depth = depth
+			self.iterations.append((best_move, best_score))
+
+			# no point searching deeper once a forced mate is found
+			if abs(score) >= MATE_BOUND:
+				break
+
+		return best_move, best_score
+
+	def checkLimits(self):
+		"""
+		Stops the search once it has used up its time or nodes
+		"""
+		if (self.node_limit is not None and self.nodes >= self.node_limit) or \
+				(self.deadline is not None and time.monotonic() >= self.deadline) or \
+				(self.stop_event is not None and self.stop_event.is_set()):
+			self.stopped = True
+
+	def transpositionTable(self):
+		"""
+		The engine's transposition table, allocated the first time it is needed
+		:return: the table
+		"""
+		if self.table is None:
+			self.table = TranspositionTable(self.table_megabytes)
+		return self.table
+
+	def searchPool(self):
+		"""
+		The pool of helper processes, one fewer than the workers since this process searches too. It is started the
+		first time it is needed and kept between moves, along with a shared copy of the transposition table
+		:return: the multiprocessing pool
+		"""
+		if self.pool is not None and self.pool_workers == self.workers:
+			return self.pool
+		self.close()
+
+		buffer = None
+		if not self.split_root:
+			try:
+				table = TranspositionTable(self.table_megabytes, shared=True)
+			except OSError:
+				# no shared memory to be had, fall back on splitting the root moves
+				self.split_root = True
+			else:
+				table.age = self.table.age if self.table is not None else 0
+				self.table = table
+				buffer = table.buffer
+
+		import multiprocessing
+		self.stop_event = multiprocessing.Event()
+		directory = self.tablebase.directory if self.tablebase is not None else None
+		self.pool = multiprocessing.Pool(self.workers - 1, initSearchWorker,
+										 (buffer, self.table_megabytes, self.stop_event, directory))
+		self.pool_workers = self.workers
+		return self.pool
+
+	def startPondering(self):
+		"""
+		Starts searching in the background while the other player is to move. The reply the last search expected is
+		taken from the transposition table and the position after it is searched as if it were the engine's turn
+		already. With no expected reply the engine searches for the other player instead, which fills the shared table
+		with the engine's positions after every one of their replies. Does nothing if not enabled or already running
+		"""
+		match = self.parent
+		if not self.ponder or self.ponder_thread is not None or match.side == self.side:
+			return
+
+		table = self.transpositionTable()
+		if self.ponder_engines is None:
+			# a match of its own to search on, so the player's move can be taken in while the thread is running
+			ponder_match = ChessMatch()
+			self.ponder_engines = (ChessEngine(ponder_match, "WHITE", table=table),
+								   ChessEngine(ponder_match, "BLACK", table=table))
+			stop_event = threading.Event()
+			for engine in self.ponder_engines:
+				engine.stop_event = stop_event
+		ponder_match = self.ponder_engines[0].parent
+		ponder_match.unpackPosition(match.packPosition())
+		for engine in self.ponder_engines:
+			engine.table = table
+			engine.tablebase = self.tablebase
+		self.ponder_engines[0].stop_event.clear()
+
+		replies = ponder_match.generateLegalMoves(ponder_match.side, ponder_match.notation_moves)
+		if not replies:
+			return
+		entry = table.probe(ponder_match.hash)
+		if entry is not None and entry[0] in replies:
+			ponder_match.makeMove(entry[0])
+			if not ponder_match.generateLegalMoves(ponder_match.side, ponder_match.notation_moves):
+				return
+			self.ponder_key = ponder_match.hash
+		else:
+			self.ponder_key = None
+
+		engine = self.ponder_engines[ponder_match.side]
+		self.ponder_thread = threading.Thread(target=engine.search, args=(None, None), daemon=True)
+		self.ponder_thread.start()
+
+	def stopPondering(self):
+		"""
+		Stops the background search and sees whether it can stand in for a search of the position on the board: it has
+		to have been searching this very position (the other player made the expected move) at least as deep as the last
+		real search got
+		:return: (best packed move, score) of the ponder search if it can be used, otherwise None
+		"""
+		if self.ponder_thread is None:
+			return None
+		engine = self.ponder_engines[0]
+		engine.stop_event.set()
+		self.ponder_thread.join()
+		self.ponder_thread = None
+
+		match = self.parent
+		engine = self.ponder_engines[self.side]
+		if self.ponder_key != match.hash or not engine.iterations or len(engine.iterations) < max(self.completed_depth, 1):
+			return None
+		self.completed_depth = len(engine.iterations)
+		return engine.iterations[-1]
+
+	def close(self):
+		"""
+		Stops pondering, shuts down the helper processes, if there are any, and closes the opening book and tablebase
+		"""
+		self.stopPondering()
+		if self.pool is not None:
+			self.pool.terminate()
+			self.pool.join()
+		self.pool = None
+		self.pool_workers = 0
+		self.stop_event = None
+		# Jasper keeps running between games and every game opens the book and tablebase again
+		if self.book is not None:
+			self.book.close()
+			self.book = None
+		if self.tablebase is not None:
+			self.tablebase.close()
+			self.tablebase = None
+
+	def parallelSearch(self, time_limit=SEARCH_SECONDS, node_limit=None, max_depth=MAX_PLY - 1):
+		"""
+		Searches with several processes at once. By default this is Lazy SMP: every process runs the whole iterative
+		deepening search on the same position, sharing one transposition table, so each profits from what the others
+		have already found and helpers starting one ply deeper spread out over the tree. With split_root (or without
+		shared memory) the root moves are dealt out between the processes instead and the best result at the deepest
+		iteration they all completed wins. A summary of the work done is left in search_report
+		:param time_limit: seconds to search for, None for no limit
+		:param node_limit: positions each process may search, None for no limit
+		:param max_depth: deepest iteration to start
+		:return: (best packed move, score in centipawns from the engine's point of view)
+		"""
+		match = self.parent
+		started = time.monotonic()
+		pool = self.searchPool()
+		self.stop_event.clear()
+		position = match.packPosition()
+		age = self.transpositionTable().age
+
+		if self.split_root:
+			root_moves = list(match.generateLegalMoves(match.side, match.move_lists[0]))
+			groups = [root_moves[worker::self.workers] for worker in range(self.workers)]
+			groups = [group for group in groups if group]
+			tasks = [(position, time_limit, node_limit, max_depth, 1, group, age) for group in groups[1:]]
+		else:
+			groups = [None]
+			tasks = [(position, time_limit, node_limit, max_depth, 1 + worker % 2, None, age)
+					 for worker in range(1, self.workers)]
+		pending = pool.map_async(runSearchWorker, tasks)
 
-		# Next decode who's turn it is
-		fen_info = fen.split(' ')
-		if fen_info[1] == "w":
-			self.move = "WHITE"
-		elif fen_info[1] == "b":
-			assert False
-			self.move = "BLACK"
+		move, score = self.search(time_limit, node_limit, max_depth, root_moves=groups[0])
+		# a helper that started one ply deeper has one iteration fewer than its depth, so depths are compared and not
+		# the number of iterations
+		results = [(self.iterations, self.completed_depth, self.nodes)]
+		if not self.split_root:
+			# the helpers only have to keep going while the main search does
+			self.stop_event.set()
+		results += pending.get()
+		self.stop_event.clear()
 
-		# Also read in the castling privledges
-		if 'K' in fen_info[2]:
-			self.white.castle_short = True
+		if self.split_root:
+			# every process started at depth 1 here, so iteration depth - 1 is the one at that depth
+			completed = [(iterations, depth) for iterations, depth, nodes in results if iterations]
+			if completed:
+				depth = min(depth for iterations, depth in completed)
+				move, score = max((iterations[depth - 1] for iterations, last in completed),
+								  key=lambda result: result[1])
 		else:
-			self.white.castle_short = False
-		if 'Q' in fen_info[2]:
-			self.white.castle_long = True
-		else:
-			self.white.castle_long = False
-		if 'k' in fen_info[2]:
-			self.black.castle_short = True
-		else:
-			self.black.castle_short = True
-		if 'q' in fen_info[2]:
-			self.black.castle_long = True
-		else:
-			self.black.castle_long = True
+			# whichever process got deepest has the best informed answer, this one wins ties
+			for iterations, depth, nodes in results:
+				if depth > self.completed_depth:
+					self.completed_depth = depth
+					move, score = iterations[-1]
 
-		# Check if any piece is en passantable
-		if fen_info[3] != "-":
-			# make this piece en passantable, still needs to be included and tested
-			NotImplementedError()
+		seconds = time.monotonic() - started
+		nodes = sum(nodes for iterations, depth, nodes in results)
+		self.search_report = {"workers": self.workers, "mode": "split" if self.split_root else "smp",
+							  "depth": max(depth for iterations, depth, nodes in results), "nodes": nodes,
+							  "seconds": seconds, "nodes_per_second": nodes / seconds if seconds else 0.0}
+		return move, score
 
-		# insert the turn counters
-		self.half_move = int(fen_info[4],10)
-		self.full_move = int(fen_info[5],10)
+	def measureScaling(self, time_limit=SEARCH_SECONDS, worker_counts=(1, 2, 4)):
+		"""
+		Searches the position on the board with different numbers of processes for the same time, starting each from an
+		empty table, to see how the search scales on this machine
+		:param time_limit: seconds per search
+		:param worker_counts: numbers of processes to try
+		:return: one search report per worker count, with the speedup in nodes per second over the first one
+		"""
+		workers = self.workers
+		reports = []
+		for count in worker_counts:
+			self.workers = count
+			self.transpositionTable().clear()
+			if count > 1:
+				self.parallelSearch(time_limit)
+			else:
+				started = time.monotonic()
+				self.search(time_limit)
+				seconds = time.monotonic() - started
+				self.search_report = {"workers": 1, "mode": "single", "depth": self.completed_depth,
+									  "nodes": self.nodes, "seconds": seconds, "nodes_per_second": self.nodes / seconds}
+			report = dict(self.search_report)
+			report["speedup"] = report["nodes_per_second"] / reports[0]["nodes_per_second"] if reports else 1.0
+			reports.append(report)
+		self.workers = workers
+		return reports
 
-	def coordinate_to_notation(self, target_piece, target_location, gives_check):
+	def alphaBeta(self, depth, alpha, beta, ply):
 		"""
-		Decodes the move into algebraic notation. This will be used to create a lookup table (of all possible legal
-		moves) that will be compared to the move made by a player
-		:param target_piece: the piece thats being moved
-		:param target_location: the location to where the piece is moving in (rank, file) relative to bottom left corner
-		:param gives_check: whether or not the move puts the other play in check
-		:return: returns a string corresponding to the algebraic notation for the input
+		Negamax alpha-beta search of the position on the board, scores are from the point of view of the side to move
+		:param depth: plies left to search
+		:param alpha: score the side to move is already sure of
+		:param beta: score the opponent is already sure of, anything at or above it is cut off
+		:param ply: distance from the root
+		:return: score of the position
 		"""
-		assert isinstance(target_piece, ChessPiece)
-		assert isinstance(target_location, tuple)
-		assert isinstance(gives_check, bool)
+		self.nodes += 1
+		if not self.nodes & 255:
+			self.checkLimits()
+		if self.stopped:
+			return 0
 
-		# if piece with same name and you can both go to the same square you need to add the file letter to notation
-		# if also the same file, use the rank number. ie Ra-a8 or R8-a8
-		# with more than 2 pieces of the same type it may be necessary to have Ra1-a8, which is also accounted for
-		rank_specifier = None
-		file_specifier = None
-		for ranks in self.board:
-			for piece in ranks:
-				if piece is not None and \
-								piece.owner.color == target_piece.owner.color and \
-								piece.location is not target_piece.location and \
-								piece.__class__.__name__ == target_piece.__class__.__name__ and \
-								target_location in piece.mobility():
-					if piece.location['rank'] == target_piece.location['rank']:
-						file_specifier = chr(ord('a') + target_piece.location['file'])
-					elif piece.location['file'] == target_piece.location['file']:
-						rank_specifier = chr(target_piece.location['rank'] + 1)
-					else:
-						file_specifier = chr(ord('a') + target_piece.location['file'])
-
-		# special notation for the pawns, since we say "e4" not "Pe4"
-		name = ""
-		if target_piece.__class__.__name__ == "Pawn":
-			if self.board[target_location[0]][target_location[1]] is not None:
-				name = chr(ord('a') + target_piece.location['file']) + "x"
+		match = self.parent
+		# a position repeated since the root, or fifty moves without a capture or pawn move, is a draw. A repetition
+		# needs at least four plies since the last capture or pawn move, so most of the time this is one comparison
+		if ply > 0 and match.half_move >= 4 and (match.half_move >= 100 or match.repetitions()):
+			return 0
+		if depth <= 0 or ply >= MAX_PLY - 1:
+			return self.quiesce(alpha, beta, ply)
 
-		else:
-			# Knight denoted by N, because the king is K
-			if target_piece.__class__.__name__ == "Knight":
-				name = "N"
-			else:
-				name = target_piece.__class__.__name__[0]
+		# with few enough pieces left the tablebase knows the result, there is nothing left to search
+		if self.tablebase is not None and ply > 0 and popCount(match.occupied) <= self.tablebase.pieces:
+			wdl = self.tablebase.probeWdl(match)
+			if wdl is not None:
+				# the tables assume a fresh fifty move counter, a win that needs more plies than are left is a draw
+				if abs(wdl) == 2 and match.half_move:
+					dtz = self.tablebase.probeDtz(match)
+					if dtz is not None and match.half_move + abs(dtz) > 100:
+						wdl = 0
+				return tablebaseScore(wdl, ply)
+
+		hash_key = match.hash
+		hash_move = 0
+		entry = self.table.probe(hash_key)
+		if entry is not None:
+			hash_move, score, entry_depth, bound = entry
+			if ply > 0 and entry_depth >= depth:
+				score = scoreFromTable(score, ply)
+				if bound == BOUND_EXACT or (bound == BOUND_LOWER and score >= beta) or \
+						(bound == BOUND_UPPER and score <= alpha):
+					return score
 
-			if rank_specifier is not None:
-				name += rank_specifier
-			if file_specifier is not None:
-				name += file_specifier
+		original_alpha = alpha
+		best_score = -INFINITE
+		best_move = 0
+		for move in self.orderedMoves(ply, hash_move):
+			if ply == 0 and self.root_moves is not None and move not in self.root_moves:
+				continue
+			match.makeMove(move)
+			score = -self.alphaBeta(depth - 1, -beta, -alpha, ply + 1)
+			match.unmakeMove()
+			if self.stopped:
+				return 0
 
-			# operation (ie capture or not)
-			if self.board[target_location[0]][target_location[1]] is not None:
-				name += "x"
+			if score > best_score:
+				best_score = score
+				best_move = move
+				if score > alpha:
+					alpha = score
+					if alpha >= beta:
+						if not move & MOVE_CAPTURE and not (move >> 12) & 7:
+							self.rewardQuiet(move, depth, ply)
+						break
+
+		if best_move == 0:
+			king = match.bitboards[match.side * 6 + KING].bit_length() - 1
+			return -MATE + ply if match.isSquareAttacked(king, 1 - match.side) else 0
+		if ply == 0:
+			self.root_move = best_move
 
-		# target location
-		if gives_check is True:
-			notation = name + str(chr(ord('a') + target_location[1])) + str(target_location[0] + 1) + "+"
+		if best_score >= beta:
+			bound = BOUND_LOWER
+		elif best_score > original_alpha:
+			bound = BOUND_EXACT
 		else:
-			notation = name + str(chr(ord('a') + target_location[1])) + str(target_location[0] + 1)
-		
-		return notation
+			bound = BOUND_UPPER
+		self.table.store(hash_key, best_move, scoreToTable(best_score, ply), depth, bound)
+		return best_score
 
-	def nextMove(self, move):
+	def quiesce(self, alpha, beta, ply):
 		"""
-		Decides who it is that actually makes the next move
-		:param move: the move being played (if legal), or attempting to be played
-		:return: string containing the result of the move (ie. legal, illegal, checkmate, etc.)
+		Quiescence search at the horizon: only captures and promotions are searched until the position is quiet, so
+		the evaluation is never taken in the middle of an exchange. The side to move can always stand pat on the static
+		evaluation, captures that cannot lift the score to alpha even with a margin (delta pruning) and captures that
+		lose material in the exchange are skipped. In check every evasion is searched instead
+		:param alpha: score the side to move is already sure of
+		:param beta: score the opponent is already sure of
+		:param ply: distance from the root
+		:return: score of the position
 		"""
-		assert (self.move == self.white.color) or (self.move == self.black.color)
-		if self.move == self.white.color:
-			assert move is not None
-			result = self.white.makeMove(move)
-			if "Illegal Move" not in result:
-				self.move = self.black.color
-		else:
-			assert move is None
-			result = self.black.generateMove()
-			if "Illegal Move" not in result:
-				self.move = self.white.color
-		#assert isinstance(result, str)
-		return result
+		self.nodes += 1
+		if not self.nodes & 255:
+			self.checkLimits()
+		if self.stopped:
+			return 0
 
+		match = self.parent
+		side = match.side
+		if ply >= MAX_PLY - 1:
+			return match.evaluate()
 
-class ChessPlayer(object):
-	def __init__(self, parent, color, short_castle=True, long_castle=True):
-		"""
-		Initialization for chessplayer class
-		:param parent: the chess match the chess player is playing in
-		:param color: usually white or black
-		:param short_castle: whether kingside clastling priveldges exist, true by default
-		:param long_castle: whether queenside clastling priveldges exist, true by default
-		"""
-		assert isinstance(parent, ChessMatch)
-		assert isinstance(color, unicode)
-		assert isinstance(short_castle, bool)
-		assert isinstance(long_castle, bool)
+		king = match.bitboards[side * 6 + KING].bit_length() - 1
+		in_check = match.isSquareAttacked(king, 1 - side)
+		if in_check:
+			moves = sorted(match.generateLegalMoves(side, self.capture_lists[ply]), key=self.captureScore, reverse=True)
+			if not moves:
+				return -MATE + ply
+			best_score = -INFINITE
+			stand_pat = None
+		else:
+			stand_pat = match.evaluate()
+			if stand_pat >= beta:
+				return stand_pat
+			if stand_pat > alpha:
+				alpha = stand_pat
+			best_score = stand_pat
+			moves = sorted(match.generateLegalMoves(side, self.capture_lists[ply], quiet=False), key=self.captureScore,
+						   reverse=True)
 
-		self.castle_short = short_castle
-		self.castle_long = long_castle
-		self.prev_castle_short = None
-		self.prev_castle_long = None
-		self.color = color
-		self.parent = parent
+		for move in moves:
+			if stand_pat is not None:
+				promotion = (move >> 12) & 7
+				# underpromotions are never better than a queen here
+				if promotion and promotion != QUEEN:
+					continue
+				if not promotion:
+					victim = match.squares[(move >> 6) & 63]
+					gain = PIECE_VALUES[victim.kind] if victim is not None else PIECE_VALUES[PAWN]
+					if stand_pat + gain + DELTA_MARGIN <= alpha:
+						continue
+					if match.staticExchange(move) < 0:
+						continue
 
-		self.availble_moves = []
+			match.makeMove(move)
+			score = -self.quiesce(-beta, -alpha, ply + 1)
+			match.unmakeMove()
+			if self.stopped:
+				return 0
 
-	def get_availble_moves(self):
-		"""
-		Adds every availble move the the get_availble_moves list, ensuring that they are legal moves of course
-		"""
-		self.availble_moves = []
-		for ranks in self.parent.board:
-			for piece in ranks:
-				if piece is not None and piece.owner.color == self.color:
-					assert isinstance(piece, ChessPiece)
-					possible_moves = piece.mobility()
-					for move in possible_moves:
-						piece.makeMove(move)
-						if not self.inCheck:
-							if (self.color == "WHITE" and self.parent.black.inCheck) or (self.color == "BLACK" and self.parent.white.inCheck):
-								gives_check = True
-							else:
-								gives_check = False
-							piece.unmakeMove()
-							self.availble_moves.append({'piece': piece, 'move': move,
-														'notation': self.parent.coordinate_to_notation(piece, move, gives_check)})
-						else:
-							piece.unmakeMove()
+			if score > best_score:
+				best_score = score
+				if score > alpha:
+					alpha = score
+					if alpha >= beta:
+						break
+		return best_score
 
-	@property
-	def inCheck(self):
+	def orderedMoves(self, ply, hash_move):
 		"""
-		Evaluates whether the player is in check or not
-		:return: True if in check, false if not
+		Hands out the legal moves in the order most likely to cut off: the transposition table move, then captures and
+		promotions by most valuable victim / least valuable attacker, then the killer moves, then the other quiet moves
+		by history score. Each stage is only generated once the one before it is used up, so a cutoff early on saves
+		generating the rest
+		:param ply: distance from the root, picks the move buffers and killers
+		:param hash_move: best move stored for the position, 0 if none
+		:return: generator of packed moves
 		"""
-		opponent_moves = []
-		kings_position = None
+		match = self.parent
+		side = match.side
 
-		for player_ranks in self.parent.board:
-			for player_piece in player_ranks:
-				if player_piece is not None and player_piece.owner.color == self.color and player_piece.__class__.__name__ == "King":
-					kings_position = player_piece.location
-				elif player_piece is not None and player_piece.owner.color != self.color:
-					opponent_moves.append(player_piece.mobility())
+		# keys are stored whole, so a hash move comes from this very position and only needs a quick sanity check
+		if hash_move:
+			piece = match.squares[hash_move & 63]
+			if piece is not None and piece.side == side:
+				yield hash_move
+			else:
+				hash_move = 0
 
-		assert kings_position is not None
+		captures = match.generateLegalMoves(side, self.capture_lists[ply], quiet=False)
+		if captures.count:
+			for move in sorted(captures, key=self.captureScore, reverse=True):
+				if move != hash_move:
+					yield move
 
-		flat_opp_moves = []
-		for sublist in opponent_moves:
-			for item in sublist:
-				flat_opp_moves.append(item)
+		quiets = match.generateLegalMoves(side, self.quiet_lists[ply], noisy=False)
+		if not quiets.count:
+			return
+		killers = self.killers[ply]
+		played = [hash_move]
+		for killer in killers:
+			if killer and killer not in played and killer in quiets:
+				played.append(killer)
+				yield killer
 
-		return (kings_position['rank'], kings_position['file']) in flat_opp_moves
+		history_scores = self.history_scores[side]
+		for move in sorted(quiets, key=lambda quiet: history_scores[quiet & 0xFFF], reverse=True):
+			if move not in played:
+				yield move
 
-	def makeMove(self, move_input):
+	def captureScore(self, move):
 		"""
-		Specifies the move for a player to make, also checks if the move results in check or checkmate, and whether it
-		is a legal mobve or not
-		:param move_input: a string of algebraic notation. If its not algebratic notation or not a legal move, the 
-			function will handle it, no assertion as to the validity of the string shoule be made
-		:return: a string describing the outcome of the move
+		Most valuable victim / least valuable attacker ordering for captures, promotions count the piece they make
+		:param move: packed capture or promotion
+		:return: sort key, higher is tried first
 		"""
-		assert isinstance(move_input, str)
-
-		self.get_availble_moves()
-		
-		if not self.availble_moves and self.inCheck:
-			return "Checkmate"
-		elif not self.availble_moves:
-			return "Draw"
-		else:
-			for move_search in self.availble_moves:
-				if move_search['notation'] == move_input:
-					move_search['piece'].makeMove(move_search['move'])
-					return move_input
-
-			return "Illegal Move: " + move_input
+		victim = self.parent.squares[(move >> 6) & 63]
+		score = PIECE_VALUES[victim.kind] * 8 if victim is not None else 0
+		if move & MOVE_EN_PASSANT:
+			score = PIECE_VALUES[PAWN] * 8
+		if (move >> 12) & 7:
+			score += PIECE_VALUES[(move >> 12) & 7] * 8
+		return score - self.parent.squares[move & 63].kind
 
-
-class ChessEngine(ChessPlayer):
-	def generateMove(self):
+	def rewardQuiet(self, move, depth, ply):
 		"""
-		Will eventually use the power of the machine to determine what should be played in a particular position, for
-		now it just chooses any random, legal move
+		Remembers a quiet move that caused a cutoff, as a killer for its ply and in the history scores
+		:param move: the packed quiet move
+		:param depth: depth it was searched to, deeper cutoffs count for more
+		:param ply: distance from the root
 		"""
+		killers = self.killers[ply]
+		if killers[0] != move:
+			killers[1] = killers[0]
+			killers[0] = move
+
+		scores = self.history_scores[self.parent.side]
+		scores[move & 0xFFF] += depth * depth
+		if scores[move & 0xFFF] > HISTORY_LIMIT:
+			for index in range(4096):
+				scores[index] >>= 1
 
-		self.get_availble_moves()
-		selection = random.randint(0, len(self.availble_moves) - 1)
-		assert self.availble_moves[selection]['notation'] is not None
-		return self.makeMove(self.availble_moves[selection]['notation'])
 
-		
 class ChessPiece(object):
-	def __init__(self, parent, owner, rank, file):
+	# a piece is made for every piece set up and every promotion, so it has slots rather than a __dict__, and knows
+	# where it is by square index alone
+	__slots__ = ("parent", "owner", "side", "square", "possible_moves")
+
+	# which of the bitboards this type of piece lives on, set by each child
+	kind = None
+
+	def __init__(self, parent, owner, square):
 		"""
 		Chess piece class, this is the structure for all inhertited types of chess pieces (e.g. Rook, King, etc)
 		:param parent: the chess match that the piece is in
 		:param owner: the player that controls this piece
-		:param rank: the current rank (0-7 int) of the piece
-		:param file: the current file (0-7 int) of the piece
+		:param square: square index (0-63 int) the piece stands on
 		"""
 		assert isinstance(parent, ChessMatch)
 		assert isinstance(owner, ChessPlayer)
-		assert isinstance(rank, int) and (0 <= rank < 8)
-		assert isinstance(file, int) and (0 <= rank < 8)
+		assert isinstance(square, int) and (0 <= square < SIZE * SIZE)
 
 		# default chess piece stuff
-		self.active = True
 		self.parent = parent
 		self.owner = owner
-		self.location = {'rank': rank, 'file': file}
+		self.side = owner.side
+		self.square = square
+		# refilled by every call to mobility
 		self.possible_moves = []
-		self.legal_moves = []
-		self.color = None
 
-		self.taken_piece = None
-		self.prev_location =  None
+	@property
+	def rank(self):
+		"""
+		The rank (0-7 int) the piece stands on
+		"""
+		return self.square >> 3
+
+	@property
+	def file(self):
+		"""
+		The file (0-7 int) the piece stands on
+		"""
+		return self.square & 7
 
-	# probe_distance(RANK, FILE) is relative to own square
-	def probeSquare(self, probe_distances):
+	def attacks(self):
 		"""
-		Checks for all squares the piece can actually move to, this is a list of squares starting and ending along the
-		same path that car concurrently checked to see if a piece can move there. The reason for this is to ensure 
-		pieces dont move through one another
-		:param probe_distances: list of squares to be sequentially evaluated as to whether a piece can move there
+		A function all children need to specify which squares they attack, so raise an error if a child does not
+		properly implement this function
 		"""
-		assert isinstance(probe_distances, list)
+		raise NotImplementedError()
 
-		for probe_distance in probe_distances:
-			if 0 <= (self.location['rank'] + probe_distance[0]) < SIZE and 0 <= (self.location['file'] + probe_distance[1]) < SIZE:
-				probed_piece = self.parent.board[self.location['rank'] + probe_distance[0]][self.location['file'] + probe_distance[1]]
-				if probed_piece is not None and probed_piece.owner.color == self.owner.color:
-					assert isinstance(probed_piece, ChessPiece)
-					break
-				elif probed_piece is not None and probed_piece.owner.color != self.owner.color:
-					assert isinstance(probed_piece, ChessPiece)
-					self.possible_moves.append((self.location['rank'] + probe_distance[0], self.location['file'] + probe_distance[1]))
-					break
-				else:
-					self.possible_moves.append((self.location['rank'] + probe_distance[0], self.location['file'] + probe_distance[1]))
+	def moveTargets(self):
+		"""
+		Every square the piece attacks that is not taken by one of its own pieces, children only need to override this
+		when they move differently than they capture
+		:return: bitboard of the squares the piece could move to, checks aside
+		"""
+		return self.attacks() & ~self.parent.occupancy[self.side]
 
 	def mobility(self):
 		"""
-		A function all children need to specify how they move, so raise an error if a child does not properly implement
-		this function
+		The squares the piece could move to as coordinates, written into the same list every time
+		:return: all potential squares the piece can move, as (rank, file) tuples
 		"""
-		raise NotImplementedError()
+		return bitboardToCoordinates(self.moveTargets(), self.possible_moves)
 
-	def makeMove(self, square):
+	def makeMove(self, square, promotion=None):
 		"""
-		How a particular piece is moved through the board, we also need to save the last location of this piece, and
-		anything it captures by moving so that we may unmove if need by
-		:param square: 
+		How a particular piece is moved through the board, the match keeps everything needed to take it back on its
+		undo stack, so moves can be made and unmade to any depth
+		:param square: the (rank, file) the piece moves to
+		:param promotion: the type of piece a pawn promotes to, a queen if not given
+		:return: the captured piece, or None
 		"""
 		assert isinstance(square, tuple)
-		assert (0 <= self.location['rank'] < SIZE) and (0 <= self.location['file'] < SIZE)
+		assert self.parent.squares[self.square] is self
 
-		self.prev_location = copy.copy(self.location)
-		self.location['rank'] = square[0]
-		self.location['file'] = square[1]
-
-		self.taken_piece = self.parent.board[square[0]][square[1]]
-		self.parent.board[square[0]][square[1]] = self
-		self.parent.board[self.prev_location['rank']][self.prev_location['file']] = None
+		return self.parent.makeMove(self.parent.encodeMove(self.square, squareIndex(square[0], square[1]), promotion))
 
 	def unmakeMove(self):
 		"""
 		The unmake move revents the last move this piece made. Is supported and used so we can make a move and check the
 		status of the position. This is for check, checkmate, and stalemate evaluations
 		"""
-		assert (0 <= self.location['rank'] < SIZE) and (0 <= self.location['file'] < SIZE)
-		assert (0 <= self.prev_location['rank'] < SIZE) and (0 <= self.prev_location['file'] < SIZE)
-		assert self.prev_location is not None
-
-		self.parent.board[self.prev_location['rank']][self.prev_location['file']] = self
-		self.parent.board[self.location['rank']][self.location['file']] = self.taken_piece
+		match = self.parent
+		assert match.ply > 0 and match.undo_pieces[match.ply - 1] is self
 
-		# cover your tracks
-		self.location = copy.copy(self.prev_location)
-		self.prev_location = None
-		self.taken_piece = None
+		match.unmakeMove()
 
 	def __str__(self):
 		"""
@@ -507,304 +3745,718 @@ class ChessPiece(object):
 		"""
 		return str(self.owner.color[0]) + str(self.__class__.__name__[0])
 
-		
+
 class Pawn(ChessPiece):
+	__slots__ = ()
+	kind = PAWN
 
-	def __init__(self, parent, owner, rank, file):
+	@property
+	def en_passentable(self):
 		"""
-		The pawn class, a child of chess piece
-		:param parent: the chess match that the piece is in
-		:param owner: the player that controls this piece
-		:param rank: the current rank (0-7 int) of the piece
-		:param file: the current file (0-7 int) of the piece
+		Whether this pawn just moved two squares and may be taken en passant
 		"""
-		assert isinstance(parent, ChessMatch)
-		assert isinstance(owner, ChessPlayer)
-		assert isinstance(rank, int) and (0 <= rank < 8)
-		assert isinstance(file, int) and (0 <= rank < 8)
+		if self.parent.en_passant is None or self.parent.squares[self.square] is not self:
+			return False
+		return self.square == self.parent.en_passant + (SIZE if self.side == 0 else -SIZE)
 
-		super().__init__(parent, owner, rank, file)
-		self.en_passentable = False
-		
-	def probeSquare(self, probe_ahead=None, probe_diagonal=None, probe_adjacent=None):
+	def attacks(self):
 		"""
-		Probes squares for the pawn, since it caputes differenly than other pieces
-		:param probe_ahead: the forwards squares, up or down the board depending on color
-		:param probe_diagonal: diagonal squares avaolble for capture if enemy piece is there
-		:param probe_adjacent: these squares are only capturable in en passant situations
+		Pawns only attack the two squares diagonally in front of them
+		:return: bitboard of the attacked squares
 		"""
-		if probe_ahead is None:
-			probe_ahead = []
-		assert isinstance(probe_ahead, list)
-
-		if probe_diagonal is None:
-			probe_diagonal = []
-		assert isinstance(probe_diagonal, list)
-
-		if probe_adjacent is None:
-			probe_adjacent = []
-		assert isinstance(probe_adjacent, list)
-
-		for probe_distance in probe_ahead:
-			assert (self.location['rank'] + probe_distance[0]) < SIZE and (self.location['file'] + probe_distance[1]) < SIZE
-			probed_piece = self.parent.board[self.location['rank'] + probe_distance[0]][self.location['file'] + probe_distance[1]]
-			if probed_piece is not None:
-				break
-			else:
-				self.possible_moves.append((self.location['rank'] + probe_distance[0], self.location['file'] + probe_distance[1]))
-
-		for probe_distance in probe_diagonal:
-			assert (self.location['rank'] + probe_distance[0]) < SIZE and (self.location['file'] + probe_distance[1]) < SIZE
-			probed_piece = self.parent.board[self.location['rank'] + probe_distance[0]][self.location['file'] + probe_distance[1]]
-			if probed_piece is not None and probed_piece.owner.color != self.owner.color:
-				self.possible_moves.append((self.location['rank'] + probe_distance[0], self.location['file'] + probe_distance[1]))
-
-		for probe_distance in probe_adjacent:
-			assert (self.location['rank'] + probe_distance[0]) < SIZE and (self.location['file'] + probe_distance[1]) < SIZE
-			probed_piece = self.parent.board[self.location['rank'] + probe_distance[0]][self.location['file'] + probe_distance[1]]
-			if probed_piece is not None and probed_piece.owner.color != self.owner.color and \
-					probed_piece.__class__.__name__ == "Pawn" and probed_piece.en_passentable:
-				if self.owner.color == "WHITE":
-					self.possible_moves.append((self.location['rank'] + probe_distance[0] + 1, self.location['file'] + probe_distance[1]))
-				elif self.owner.color == "BLACK":
-					self.possible_moves.append((self.location['rank'] + probe_distance[0] - 1, self.location['file'] + probe_distance[1]))
-				else:
-					assert False
+		return PAWN_ATTACKS[self.side][self.square]
 
-	
-	def mobility(self):
+	def moveTargets(self):
 		"""
 		Specifies the way a pawn can move, ie. two squares up if on the second or seventh ranks and so on
-		:return: all potential squares the pawn can move, even if out of bounds or un-capturable
+		:return: bitboard of the squares the pawn could move to, checks aside
 		"""
-		assert self.owner.color == "WHITE" or self.owner.color == "BLACK"
-		self.possible_moves = []
-		if self.owner.color == "WHITE":
-			up_down = 1
-		else:
-			up_down = -1
+		assert self.parent.squares[self.square] is self
 
-		assert (0 <= self.location['rank'] < SIZE) and (0 <= self.location['file'] < SIZE)
+		if self.side == 0:
+			up_down = SIZE
+			start_rank, passant_rank = 1, 4
+		else:
+			up_down = -SIZE
+			start_rank, passant_rank = 6, 3
 
 		# 1 or 2 spaces from starting position
-		if self.location['rank'] == 1 or self.location['rank'] == 6:
-			if self.location['file'] == 0:
-				self.probeSquare([(up_down, 0), (2 * up_down, 0)], [(up_down, 1)], [])
-			elif self.location['file'] == 7:
-				self.probeSquare([(up_down, 0), (2 * up_down, 0)], [(up_down, -1)], [])
-			else:
-				self.probeSquare([(up_down, 0), (2 * up_down, 0)], [(up_down, 1),(up_down, -1)], [])
+		moves = 0
+		ahead = self.square + up_down
+		if 0 <= ahead < SIZE * SIZE and not (self.parent.occupied >> ahead) & 1:
+			moves |= 1 << ahead
+			if self.square >> 3 == start_rank and not (self.parent.occupied >> (ahead + up_down)) & 1:
+				moves |= 1 << (ahead + up_down)
 
-		# en passant availble
-		elif self.location['rank'] == 3 or self.location['rank'] == 4:
-			if self.location['file'] == 0:
-				self.probeSquare([(up_down, 0), (2 * up_down, 0)], [(up_down, 1)], [(0, 1)])
-			elif self.location['file'] == 7:
-				self.probeSquare([(up_down, 0), (2 * up_down, 0)], [(up_down, -1)], [(0, -1)])
-			else:
-				self.probeSquare([(up_down, 0), (2 * up_down, 0)], [(up_down, 1), (up_down, -1)], [(0, 1), (0, -1)])
-
-		# otherwise move normally
-		else:
-			if self.location['file'] == 0:
-				self.probeSquare([(up_down, 0)], [(up_down, 1)], [])
-			elif self.location['file'] == 7:
-				self.probeSquare([(up_down, 0)], [(up_down, -1)], [])
-			else:
-				self.probeSquare([(up_down, 0)], [(up_down, 1),(up_down, -1)], [])
+		moves |= self.attacks() & self.parent.occupancy[1 - self.side]
 
-		return self.possible_moves
+		# en passant availble
+		if self.square >> 3 == passant_rank and self.parent.en_passant is not None:
+			moves |= self.attacks() & (1 << self.parent.en_passant)
+		return moves
 
 
 class Rook(ChessPiece):
-	
-	def mobility(self):
+	__slots__ = ()
+	kind = ROOK
+
+	def attacks(self):
 		"""
-		Specifies the way a rook can move, ie. along ranks and files (castling is a king move, so no need to 
+		Specifies the way a rook can move, ie. along ranks and files (castling is a king move, so no need to
 		handle here)
-		:return: all potential squares the rook can move, even if out of bounds or un-capturable
+		:return: bitboard of the attacked squares
 		"""
-		self.possible_moves = []
+		return rookAttacks(self.square, self.parent.occupied)
 
-		north, south, east, west = ([],) * 4
 
-		for square in range(1, SIZE):
-			north.append((square, 0))
-			south.append((-square, 0))
-			east.append((0, square))
-			west.append((0, -square))
+class Knight(ChessPiece):
+	__slots__ = ()
+	kind = KNIGHT
 
-		super().probeSquare(north)
-		super().probeSquare(south)
-		super().probeSquare(east)
-		super().probeSquare(west)
+	def attacks(self):
+		"""
+		Specifies the way a knight can move, ie. two squares up and one accross in any orientation
+		:return: bitboard of the attacked squares
+		"""
+		return KNIGHT_ATTACKS[self.square]
 
-		return self.possible_moves
 
-		
-class Knight(ChessPiece):
-	
-	def mobility(self):
+class Bishop(ChessPiece):
+	__slots__ = ()
+	kind = BISHOP
+
+	def attacks(self):
 		"""
-		Specifies the way a knight can move, ie. two squares up and one accross in any orientation
-		:return: all potential squares the knight can move, even if out of bounds or un-capturable
+		Specifies the way a bishop can move, diagonally
+		:return: bitboard of the attacked squares
 		"""
-		self.possible_moves = []
+		return bishopAttacks(self.square, self.parent.occupied)
 
-		super().probeSquare([(1,2)])
-		super().probeSquare([(2,1)])
 
-		super().probeSquare([(1,-2)])
-		super().probeSquare([(2,-1)])
+class Queen(ChessPiece):
+	__slots__ = ()
+	kind = QUEEN
 
-		super().probeSquare([(-1,2)])
-		super().probeSquare([(-2,1)])
+	def attacks(self):
+		"""
+		Specifies the way a queen can move, so diagonally and across rank and files
+		:return: bitboard of the attacked squares
+		"""
+		return rookAttacks(self.square, self.parent.occupied) | bishopAttacks(self.square, self.parent.occupied)
 
-		super().probeSquare([(-1,-2)])
-		super().probeSquare([(-2,-1)])
 
-		return self.possible_moves
+class King(ChessPiece):
+	__slots__ = ()
+	kind = KING
 
+	def attacks(self):
+		"""
+		Specifies the way a king can move, so one square in any direction
+		:return: bitboard of the attacked squares
+		"""
+		return KING_ATTACKS[self.square]
 
-class Bishop(ChessPiece):
-	
-	def mobility(self):
+	def moveTargets(self):
 		"""
-		Specifies the way a bishop can move, diagonally
-		:return: all potential squares the bishop can move, even if out of bounds or un-capturable
+		Specifies the way a king can move, so one square in any direction or by castling
+		:return: bitboard of the squares the king could move to, checks aside
 		"""
-		self.possible_moves = []
+		moves = self.attacks() & ~self.parent.occupancy[self.side]
 
-		northeast, northwest, southeast, southwest = ([],) * 4
+		home = 0 if self.side == 0 else 7 * SIZE
+		rooks = self.parent.bitboards[self.side * 6 + ROOK]
+		if self.owner.castle_short:
+			assert self.square == home + 4
+			assert (rooks >> (home + 7)) & 1
+			if not (self.parent.occupied >> (home + 5)) & 3:
+				moves |= 1 << (home + 6)
+		if self.owner.castle_long:
+			assert self.square == home + 4
+			assert rooks & 1 << home
+			if not (self.parent.occupied >> (home + 1)) & 7:
+				moves |= 1 << (home + 2)
+		return moves
 
-		for square in range(1, SIZE):
-			northeast.append((square, square))
-			northwest.append((square, -square))
-			southeast.append((-square, square))
-			southwest.append((-square, -square))
 
-		super().probeSquare(northeast)
-		super().probeSquare(northwest)
-		super().probeSquare(southeast)
-		super().probeSquare(southwest)
+class TurnProfiler(object):
+	"""
+		Timings and counters for each turn of a game played through handle(), written out as a JSON line per turn, with
+		an optional cProfile of the whole game. Nothing is measured unless a profiler is started: the timed and counted
+		methods are swapped for wrappers on their classes by start and put back by stop, so with profiling off the
+		code runs exactly as it always does. Only calls on the thread that started the profiler count, the ponder
+		thread's work would otherwise land in the player's turn
+	"""
+	def __init__(self, path=PROFILE_PATH, whole_game=False):
+		"""
+		Opens the file the turn records are appended to
+		:param path: the JSON lines file
+		:param whole_game: also run cProfile over the game and dump its stats next to the records
+		"""
+		self.path = path
+		self.whole_game = whole_game
+		self.records = open(path, "a")
+		self.game = time.strftime("%Y%m%d-%H%M%S")
+		self.turn = 0
+		self.turn_started = None
+		self.seconds = {}
+		self.calls = {}
+		self.originals = []
+		self.profile = None
+		self.thread = threading.get_ident()
 
-		return self.possible_moves
+	def timer(self, label, function):
+		"""
+		Wraps a function so the time spent in it, and how often it is called, add up under a label
+		:param label: name of the phase in the turn records
+		:param function: the function to time
+		:return: the wrapped function
+		"""
+		seconds = self.seconds
+		calls = self.calls
+		thread = self.thread
 
+		def timed(*args, **kwargs):
+			if threading.get_ident() != thread:
+				return function(*args, **kwargs)
+			started = time.perf_counter()
+			try:
+				return function(*args, **kwargs)
+			finally:
+				seconds[label] = seconds.get(label, 0.0) + time.perf_counter() - started
+				calls[label] = calls.get(label, 0) + 1
+		return timed
 
-class Queen(ChessPiece):
-	
-	def mobility(self):
+	def counter(self, label, function):
 		"""
-		Specifies the way a queen can move, so diagonally and across rank and files
-		:return: all potential squares the queen can move, even if out of bounds or un-capturable
+		Wraps a function so calls to it are counted under a label, for the ones called too often to time
+		:param label: name of the counter in the turn records
+		:param function: the function to count
+		:return: the wrapped function
 		"""
-		self.possible_moves = []
+		calls = self.calls
+		thread = self.thread
 
-		north, south, east, west, northeast, northwest, southeast, southwest = ([],) * 8
-
-		for square in range(1, SIZE):
-			north.append((square, 0))
-			south.append((-square, 0))
-			east.append((0, square))
-			west.append((0, -square))
-			northeast.append((square, square))
-			northwest.append((square, -square))
-			southeast.append((-square, square))
-			southwest.append((-square, -square))
-
-		super().probeSquare(north)
-		super().probeSquare(south)
-		super().probeSquare(east)
-		super().probeSquare(west)
-		super().probeSquare(northeast)
-		super().probeSquare(northwest)
-		super().probeSquare(southeast)
-		super().probeSquare(southwest)
-
-		return self.possible_moves
-		
+		def counted(*args, **kwargs):
+			if threading.get_ident() != thread:
+				return function(*args, **kwargs)
+			calls[label] = calls.get(label, 0) + 1
+			return function(*args, **kwargs)
+		return counted
 
-class King(ChessPiece):
-			
-	def mobility(self):
+	def wrap(self, owner, name, wrapper):
 		"""
-		Specifies the way a king can move, so one square in any direction or by castling
-		:return: all potential squares the king can move, even if out of bounds or un-capturable
+		Swaps a method (or the getter of a property) of a class for a wrapped one, remembering it for stop
+		:param owner: the class the method is defined on
+		:param name: the method's name
+		:param wrapper: timer or counter
 		"""
-		self.possible_moves = []
+		original = owner.__dict__[name]
+		if isinstance(original, property):
+			setattr(owner, name, property(wrapper(name, original.fget), original.fset))
+		else:
+			setattr(owner, name, wrapper(name, original))
+		self.originals.append((owner, name, original))
 
-		super().probeSquare([(1,0)])
-		super().probeSquare([(-1,0)])
-		super().probeSquare([(0,1)])
-		super().probeSquare([(0,-1)])
-		super().probeSquare([(1,1)])
-		super().probeSquare([(1,-1)])
-		super().probeSquare([(-1,1)])
-		super().probeSquare([(-1,1)])
-
-		if self.owner.castle_short and self.owner.color is "WHITE":
-			assert self.location['rank'] == 0 and self.location['file'] == 4
-			assert isinstance(self.parent.board[0][7], Rook)
-			if self.owner.board[0][6] is None and self.owner.board[0][5] is None:
-				super().probeSquare([(0, 2)])
-		if self.owner.castle_short and self.owner.color is "BLACK":
-			assert self.location['rank'] == 7 and self.location['file'] == 4
-			assert isinstance(self.parent.board[7][7], Rook)
-			if self.owner.board[7][6] is None and self.owner.board[7][5] is None:
-				super().probeSquare([(0, 2)])
-		if self.owner.castle_long and self.owner.color is "WHITE":
-			assert self.location['rank'] == 0 and self.location['file'] == 4
-			assert isinstance(self.parent.board[0][0], Rook)
-			if self.parent.board[7][1] is None and self.parent.board[7][2] is None and self.parent.board[7][3] is None:
-				super().probeSquare([(0, -2)])
-		if self.owner.castle_long and self.owner.color is "BLACK":
-			assert self.location['rank'] == 7 and self.location['file'] == 4
-			assert isinstance(self.parent.board[7][0], Rook)
-			if self.parent.board[7][1] is None and self.parent.board[7][2] is None and self.parent.board[7][3] is None:
-				super().probeSquare([(0, -2)])
-
-		return self.possible_moves
-
-	def makeMove(self, square):
-		"""
-		Special function for the king to move, to ensure that he may castle should he please
-		:param square: the square the king is moving to, will be the ending location of his position when electing to
-			castle
+	def start(self):
 		"""
-		assert isinstance(square, tuple)
-		assert 0 <= self.location['file'] < SIZE
-
-		super().makeMove(square)
-		if square[1] - self.location['file'] == 2:
-			assert isinstance(self.parent.board[self.location['rank']][7], Rook)
-			assert self.owner.castle_short is True
-			self.parent.board[self.location['rank']][7].makeMove((self.location['rank'], 5))
-		elif self.location['file'] - square[1] == 3:
-			assert isinstance(self.parent.board[self.location['rank']][0], Rook)
-			assert self.owner.castle_long is True
-			self.parent.board[self.location['rank']][0].makeMove((self.location['rank'], 3))
-
-		self.owner.prev_castle_short = self.owner.castle_short
-		self.owner.prev_castle_long = self.owner.castle_long
-		self.owner.castle_short = False
-		self.owner.castle_long = False
+		Puts the wrappers in place, and starts cProfile if the whole game is being profiled
+		"""
+		for owner, name in ((ChessPlayer, "makeMove"), (ChessPlayer, "get_availble_moves"), (ChessPlayer, "inCheck"),
+							(ChessEngine, "generateMove"), (ChessMatch, "playMove"),
+							(ChessMatch, "parseNotation"), (ChessMatch, "moveNotation"),
+							(ChessMatch, "coordinate_to_notation")):
+			self.wrap(owner, name, self.timer)
+		for owner, name in ((ChessPiece, "mobility"), (ChessMatch, "isSquareAttacked"), (ChessMatch, "attackers")):
+			self.wrap(owner, name, self.counter)
 
-	def unmakeMove(self):
+		# the nodes of every search are added up as each one finishes. A parallel search counts the nodes of all its
+		# processes from its search_report, so the main process's search inside it is not counted a second time
+		search = ChessEngine.__dict__["search"]
+		parallel_search = ChessEngine.__dict__["parallelSearch"]
+		calls = self.calls
+		parallel = [0]
+
+		def counted(engine, *args, **kwargs):
+			try:
+				return search(engine, *args, **kwargs)
+			finally:
+				if threading.get_ident() == self.thread and not parallel[0]:
+					calls["nodes"] = calls.get("nodes", 0) + engine.nodes
+
+		def countedParallel(engine, *args, **kwargs):
+			if threading.get_ident() != self.thread:
+				return parallel_search(engine, *args, **kwargs)
+			parallel[0] += 1
+			try:
+				result = parallel_search(engine, *args, **kwargs)
+			finally:
+				parallel[0] -= 1
+			calls["nodes"] = calls.get("nodes", 0) + engine.search_report["nodes"]
+			return result
+		self.wrap(ChessEngine, "search", lambda name, original: self.timer(name, counted))
+		self.wrap(ChessEngine, "parallelSearch", lambda name, original: self.timer(name, countedParallel))
+
+		if self.whole_game:
+			import cProfile
+			self.profile = cProfile.Profile()
+			self.profile.enable()
+
+	def startTurn(self):
+		"""
+		Clears the timings and counters for a new turn
+		"""
+		self.turn_started = time.perf_counter()
+		self.seconds.clear()
+		self.calls.clear()
+
+	def endTurn(self, match, color, status):
+		"""
+		Appends the record of the turn just played
+		:param match: the match being played
+		:param color: who played the turn, "WHITE" or "BLACK"
+		:param status: what nextMove answered, the move or the result of the game
 		"""
-		Special function for the king to unmake his last move, to ensure that castling is supported
+		import json
+
+		assert self.turn_started is not None
+		self.turn += 1
+		record = {"game": self.game, "turn": self.turn, "color": color, "status": status, "ply": match.ply,
+				  "seconds": round(time.perf_counter() - self.turn_started, 6),
+				  "phases": dict((label, round(seconds, 6)) for label, seconds in self.seconds.items()),
+				  "calls": dict(self.calls)}
+		self.records.write(json.dumps(record, sort_keys=True) + "\n")
+		self.records.flush()
+		self.turn_started = None
+
+	def stop(self):
 		"""
-		assert (0 <= self.prev_location['file'] < SIZE) and (0 <= self.location['file'] < SIZE)
+		Puts the original methods back, dumps the cProfile stats (loadable with pstats) if there are any and closes
+		the records
+		"""
+		while self.originals:
+			owner, name, original = self.originals.pop()
+			setattr(owner, name, original)
+		if self.profile is not None:
+			self.profile.disable()
+			self.profile.dump_stats(os.path.join(os.path.dirname(self.path), "game-%s.prof" % self.game))
+			self.profile = None
+		self.records.close()
+
+
+# piece classes and letters by type, for promotions and notation
+PIECE_TYPES = (Pawn, Knight, Bishop, Rook, Queen, King)
+PIECE_LETTERS = ("P", "N", "B", "R", "Q", "K")
+
+
+def coordinateNotation(move):
+	"""
+	Long coordinate notation of a packed move as used by other engines (e2e4, e7e8q), so divide output can be compared
+	:param move: the packed move
+	:return: the notation string
+	"""
+	notation = SQUARE_NAMES[move & 63] + SQUARE_NAMES[(move >> 6) & 63]
+	if (move >> 12) & 7:
+		notation += PIECE_LETTERS[(move >> 12) & 7].lower()
+	return notation
+
+
+def runPerft(match, depth, divide=False):
+	"""
+	Runs perft on a match and prints the count and speed, and the count per root move when dividing
+	:param match: the chess match set up with the position
+	:param depth: plies to go down
+	:param divide: whether to print the count under each root move
+	:return: (leaf nodes, seconds taken)
+	"""
+	started = time.perf_counter()
+	if divide:
+		counts = match.divide(depth)
+		for move, count in counts:
+			print("%s: %d" % (coordinateNotation(move), count))
+		nodes = sum(count for move, count in counts)
+	else:
+		nodes = match.perft(depth)
+	seconds = time.perf_counter() - started
+	print("depth %d: %d nodes in %.3fs, %.0f nodes/s" % (depth, nodes, seconds, nodes / seconds if seconds else 0.0))
+	return nodes, seconds
+
+
+def runPerftSuite(max_nodes=PERFT_NODES, max_depth=None):
+	"""
+	Checks the move generator against every position in PERFT_POSITIONS, each to the deepest depth whose known count
+	stays within the node budget, and the incremental evaluation against computeEvaluation a couple of plies deep
+	:param max_nodes: largest leaf count to go for in any one position
+	:param max_depth: deepest depth to go for, None for no limit
+	:return: True if every count matched
+	"""
+	match = ChessMatch()
+	passed = True
+	total_nodes = 0
+	total_seconds = 0.0
+	for name, fen, counts in PERFT_POSITIONS:
+		depth = 1
+		while depth < len(counts) and counts[depth] <= max_nodes and (max_depth is None or depth < max_depth):
+			depth += 1
+		match.setupPosition(fen)
+		started = time.perf_counter()
+		nodes = match.perft(depth)
+		seconds = time.perf_counter() - started
+		total_nodes += nodes
+		total_seconds += seconds
+		mismatches = match.checkEvaluation(min(depth, EVALUATION_CHECK_DEPTH))
+		correct = nodes == counts[depth - 1] and not mismatches
+		passed = passed and correct
+		print("%-26s depth %d: %9d nodes, expected %9d %s %8.0f nodes/s" % (
+			name, depth, nodes, counts[depth - 1], "ok  " if correct else "FAIL", nodes / seconds if seconds else 0.0))
+		if mismatches:
+			print("%-26s %d positions with the running evaluation off" % ("", mismatches))
+	print("%d nodes in %.3fs, %.0f nodes/s, %s" % (total_nodes, total_seconds, total_nodes / total_seconds,
+												   "all passed" if passed else "FAILED"))
+	return passed
+
+
+def runTablebaseCheck(tablebase, max_plies=SELF_PLAY_PLIES):
+	"""
+	Plays every position in TABLEBASE_POSITIONS out with both sides picking their moves with Tablebase.bestMove, and
+	checks each game ends in the result the tables promise
+	:param tablebase: the tablebase, needing at least the KQvK and KRvK files
+	:param max_plies: plies a game may take before it counts as a failure
+	:return: True if every game ended as expected
+	"""
+	match = ChessMatch()
+	passed = True
+	for name, fen, expected in TABLEBASE_POSITIONS:
+		match.setupPosition(fen)
+		result = None
+		plies = 0
+		while plies < max_plies:
+			legal_moves = match.generateLegalMoves(match.side, match.notation_moves)
+			if not legal_moves or match.drawReason() is not None:
+				result = match.gameResult()
+				break
+			known = tablebase.bestMove(match, legal_moves)
+			if known is None:
+				result = "not in the tables"
+				break
+			match.makeMove(known[0])
+			plies += 1
+		correct = result == expected
+		passed = passed and correct
+		print("%-26s %3d plies: %-17s expected %-7s %s" % (name, plies, result, expected, "ok" if correct else "FAIL"))
+	print("all passed" if passed else "FAILED")
+	return passed
+
+
+def runBatchSuite(count=BATCH_POSITIONS, seed=BATCH_SEED):
+	"""
+	Checks the NumPy batch functions against the single position code they stand in for: batchMoveCounts against
+	generateLegalMoves, batchEvaluate against evaluate and batchAttacks against isSquareAttacked. The positions are
+	reached by random moves from the perft positions, so they take in castling, en passant and promotions
+	:param count: number of positions
+	:param seed: seed for the random moves
+	:return: True if every batch result matched
+	"""
+	import numpy
+
+	generator = random.Random(seed)
+	match = ChessMatch()
+	positions = []
+	while len(positions) < count:
+		for name, fen, counts in PERFT_POSITIONS:
+			match.setupPosition(fen)
+			for ply in range(generator.randint(0, 60)):
+				moves = match.generateLegalMoves(match.side, match.move_lists[0])
+				if not moves.count or len(positions) >= count:
+					break
+				positions.append(match.packPosition())
+				match.makeMove(moves.moves[generator.randrange(moves.count)])
+
+	bitboards, sides, castling, en_passant = stackPositions(positions)
+	started = time.perf_counter()
+	batch = (batchMoveCounts(bitboards, sides, castling, en_passant), batchEvaluate(bitboards, sides),
+			 batchAttacks(bitboards))
+	seconds = time.perf_counter() - started
+
+	wrong = [0, 0, 0]
+	for index, position in enumerate(positions):
+		match.unpackPosition(position)
+		attacks = [0, 0]
+		for side in range(2):
+			for square in range(SIZE * SIZE):
+				if match.isSquareAttacked(square, side):
+					attacks[side] |= 1 << square
+		wrong[0] += match.generateLegalMoves(match.side, match.move_lists[0]).count != batch[0][index]
+		wrong[1] += match.evaluate() != batch[1][index]
+		wrong[2] += not numpy.array_equal(batch[2][index], numpy.array(attacks, dtype=numpy.uint64))
+
+	for name, errors in zip(("batchMoveCounts", "batchEvaluate", "batchAttacks"), wrong):
+		print("%-26s %d positions, %d wrong %s" % (name, count, errors, "ok" if not errors else "FAIL"))
+	passed = not any(wrong)
+	print("%d positions in %.3fs, %.0f positions/s, %s" % (count, seconds, count / seconds,
+														   "all passed" if passed else "FAILED"))
+	return passed
+
+
+def perftMain(arguments):
+	"""
+	Command line entry point for perft, python Chess.py --help for the options
+	:param arguments: command line arguments, without the program name
+	:return: exit status
+	"""
+	import argparse
+	parser = argparse.ArgumentParser(description="Perft: count and time the legal move tree of a position")
+	parser.add_argument("--fen", default=FEN_STARTING, help="position to count from, the start position by default")
+	parser.add_argument("--depth", type=int, default=None, help="plies to count to")
+	parser.add_argument("--divide", action="store_true", help="print the count under every root move")
+	parser.add_argument("--suite", action="store_true", help="check the built-in positions against their known counts")
+	parser.add_argument("--nodes", type=int, default=PERFT_NODES, help="largest count to go for in the suite")
+	parser.add_argument("--batch", action="store_true", help="check the NumPy batch functions against the single "
+						"position code")
+	options = parser.parse_args(arguments)
+
+	if options.suite:
+		return 0 if runPerftSuite(options.nodes, options.depth) else 1
+	if options.batch:
+		return 0 if runBatchSuite() else 1
+
+	match = ChessMatch()
+	match.setupPosition(unicode(options.fen))
+	runPerft(match, options.depth or 4, options.divide)
+	return 0
+
+
+def playSelfPlayGame(task):
+	"""
+	Plays one engine against engine game, in a process of the self-play pool
+	:param task: (game number, opening number, opening moves or FEN, True if engine A has white, engine A's
+		(time limit, node limit), engine B's (time limit, node limit))
+	:return: (game number, opening number, True if A had white, result, reason, plies, seconds, seconds searched per
+		phase, moves per phase)
+	"""
+	game, opening_index, opening, a_white, limits_a, limits_b = task
+	started = time.monotonic()
+	match = ChessMatch()
+	engines = (ChessEngine(match, "WHITE", table_megabytes=SELF_PLAY_MEGABYTES),
+			   ChessEngine(match, "BLACK", table_megabytes=SELF_PLAY_MEGABYTES))
+	limits = (limits_a, limits_b) if a_white else (limits_b, limits_a)
+
+	if "/" in opening:
+		match.setupPosition(unicode(opening))
+	else:
+		for move in match.replay(opening.split()):
+			pass
 
-		if self.prev_location['file'] - self.location['file'] == 2:
-			assert isinstance(self.parent.board[self.location['rank']][5], Rook)
-			assert self.owner.prev_castle_short is True
-			self.parent.board[self.location['rank']][5].unmakeMove()
-		elif self.location['file'] - self.prev_location['file'] == 3:
-			assert isinstance(self.parent.board[self.location['rank']][3], Rook)
-			assert self.owner.prev_castle_long is True
-			self.parent.board[self.location['rank']][3].unmakeMove()
+	phase_seconds = [0.0] * len(GAME_PHASES)
+	phase_moves = [0] * len(GAME_PHASES)
+	plies = match.ply
+	result, reason = "1/2-1/2", "ply limit"
+	while plies < SELF_PLAY_PLIES:
+		legal_moves = match.generateLegalMoves(match.side, match.notation_moves)
+		if not legal_moves:
+			result = match.gameResult()
+			reason = "checkmate" if result != "1/2-1/2" else "stalemate"
+			break
+		if match.drawReason() is not None:
+			reason = match.drawReason()
+			break
+
+		if plies < OPENING_PLIES:
+			phase = 0
+		elif match.phase > ENDGAME_PHASE:
+			phase = 1
+		else:
+			phase = 2
+		engine = engines[match.side]
+		searched = time.monotonic()
+		move, score = engine.search(*limits[match.side])
+		phase_seconds[phase] += time.monotonic() - searched
+		phase_moves[phase] += 1
+
+		match.makeMove(move)
+		plies += 1
+
+	return (game, opening_index, a_white, result, reason, plies, time.monotonic() - started, phase_seconds,
+			phase_moves)
+
+
+def eloDifference(wins, draws, losses):
+	"""
+	Elo difference that a match score stands for, with a 95% error bar from the spread of the game results
+	:param wins: games won
+	:param draws: games drawn
+	:param losses: games lost
+	:return: (Elo difference, error bar), infinite when one side scored everything
+	"""
+	games = wins + draws + losses
+	if not games or wins == games or losses == games:
+		return (0.0 if not games else float("inf") if wins else float("-inf")), float("inf")
+	score = (wins + draws / 2.0) / games
+	deviation = math.sqrt((wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games)
+	margin = 1.96 * deviation / math.sqrt(games)
+
+	def elo(fraction):
+		if fraction <= 0.0:
+			return float("-inf")
+		if fraction >= 1.0:
+			return float("inf")
+		return 400.0 * math.log10(fraction / (1.0 - fraction))
+	return elo(score), (elo(score + margin) - elo(score - margin)) / 2.0
+
+
+def runSelfPlay(games, workers=SEARCH_WORKERS, openings=SELF_PLAY_OPENINGS, limits_a=(SELF_PLAY_MOVE_SECONDS, None),
+				limits_b=None, seed=0, output=None):
+	"""
+	Plays engine A against engine B over a process pool, each opening twice with the colors swapped, and prints how
+	it went. Results are appended to the output file a line per game as they come in, so a long run can be followed
+	and nothing is lost if it is stopped
+	:param games: number of games
+	:param workers: processes to play in
+	:param openings: opening move sequences (in algebraic notation) or FENs
+	:param limits_a: engine A's (seconds, nodes) per move, either can be None
+	:param limits_b: engine B's (seconds, nodes) per move, the same as A by default
+	:param seed: shuffles the order the openings are played in
+	:param output: file to append the results to, None for none
+	:return: (wins, draws, losses) for engine A
+	"""
+	limits_b = limits_b or limits_a
+	order = list(range(len(openings)))
+	random.Random(seed).shuffle(order)
+	tasks = []
+	for game in range(games):
+		opening_index = order[(game // 2) % len(order)]
+		tasks.append((game, opening_index, openings[opening_index], game % 2 == 0, limits_a, limits_b))
+
+	results = open(output, "a") if output is not None else None
+	if results is not None:
+		results.write("# game\topening\twhite\tresult\treason\tplies\tseconds\n")
+	score = [0, 0, 0]
+	phase_seconds = [0.0] * len(GAME_PHASES)
+	phase_moves = [0] * len(GAME_PHASES)
+	started = time.monotonic()
+	import multiprocessing
+	pool = multiprocessing.Pool(workers)
+	try:
+		for game, opening_index, a_white, result, reason, plies, seconds, seconds_by_phase, moves_by_phase in \
+				pool.imap_unordered(playSelfPlayGame, tasks):
+			if result == "1/2-1/2":
+				score[1] += 1
+			elif (result == "1-0") == a_white:
+				score[0] += 1
+			else:
+				score[2] += 1
+			for phase in range(len(GAME_PHASES)):
+				phase_seconds[phase] += seconds_by_phase[phase]
+				phase_moves[phase] += moves_by_phase[phase]
+			if results is not None:
+				results.write("%d\t%d\t%s\t%s\t%s\t%d\t%.2f\n" % (game, opening_index, "A" if a_white else "B", result,
+																	 reason, plies, seconds))
+				results.flush()
+	finally:
+		pool.terminate()
+		pool.join()
+		if results is not None:
+			results.close()
+
+	seconds = time.monotonic() - started
+	elo, margin = eloDifference(*score)
+	print("%d games in %.1fs, %.2f games/s" % (games, seconds, games / seconds))
+	print("engine A: +%d =%d -%d, Elo %+.1f +/- %.1f" % (score[0], score[1], score[2], elo, margin))
+	searched = sum(phase_seconds)
+	for phase, name in enumerate(GAME_PHASES):
+		if phase_moves[phase]:
+			print("%-10s %6d moves, %7.1f ms/move, %5.1f%% of search time" % (
+				name, phase_moves[phase], 1000.0 * phase_seconds[phase] / phase_moves[phase],
+				100.0 * phase_seconds[phase] / searched if searched else 0.0))
+	return tuple(score)
+
+
+def selfPlayMain(arguments):
+	"""
+	Command line entry point for self-play, python Chess.py selfplay --help for the options
+	:param arguments: command line arguments after "selfplay"
+	:return: exit status
+	"""
+	import argparse
+	parser = argparse.ArgumentParser(prog="Chess.py selfplay", description="Play the engine against itself")
+	parser.add_argument("--games", type=int, default=100, help="number of games")
+	parser.add_argument("--workers", type=int, default=SEARCH_WORKERS, help="processes to play in")
+	parser.add_argument("--openings", default=None, help="file with an opening per line, moves or a FEN")
+	parser.add_argument("--movetime", type=float, default=None, help="engine A seconds per move, %.1f by default "
+						"unless a node limit is given" % SELF_PLAY_MOVE_SECONDS)
+	parser.add_argument("--nodes", type=int, default=None, help="engine A nodes per move")
+	parser.add_argument("--movetime-b", type=float, default=None, help="engine B seconds per move")
+	parser.add_argument("--nodes-b", type=int, default=None, help="engine B nodes per move")
+	parser.add_argument("--seed", type=int, default=0, help="seed for the order of the openings")
+	parser.add_argument("--output", default=None, help="file to append a line per game to")
+	options = parser.parse_args(arguments)
+
+	openings = SELF_PLAY_OPENINGS
+	if options.openings is not None:
+		with open(options.openings) as openings_file:
+			openings = tuple(line.strip() for line in openings_file if line.strip() and not line.startswith("#"))
+	movetime = options.movetime
+	if movetime is None and options.nodes is None:
+		movetime = SELF_PLAY_MOVE_SECONDS
+	limits_a = (movetime, options.nodes)
+	limits_b = limits_a
+	if options.movetime_b is not None or options.nodes_b is not None:
+		limits_b = (options.movetime_b, options.nodes_b)
+	runSelfPlay(options.games, options.workers, openings, limits_a, limits_b, options.seed, options.output)
+	return 0
+
+
+def tablebaseMain(arguments):
+	"""
+	Command line entry point for the tablebase check, python Chess.py tablebase --help for the options
+	:param arguments: command line arguments after "tablebase"
+	:return: exit status
+	"""
+	import argparse
+	parser = argparse.ArgumentParser(prog="Chess.py tablebase",
+									 description="Play small endgames out from the Syzygy tables to check the probing")
+	parser.add_argument("--path", default=TABLEBASE_PATH, help="directory with at least the KQvK and KRvK files")
+	options = parser.parse_args(arguments)
+
+	tablebase = Tablebase(options.path)
+	try:
+		return 0 if runTablebaseCheck(tablebase) else 1
+	finally:
+		tablebase.close()
+
+
+def scalingMain(arguments):
+	"""
+	Command line entry point for the search scaling measurement, python Chess.py scaling --help for the options
+	:param arguments: command line arguments after "scaling"
+	:return: exit status
+	"""
+	import argparse
+	parser = argparse.ArgumentParser(prog="Chess.py scaling",
+									 description="Time the search with different numbers of processes")
+	parser.add_argument("--fen", default=FEN_STARTING, help="position to search, the start position by default")
+	parser.add_argument("--movetime", type=float, default=SEARCH_SECONDS, help="seconds per search")
+	parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="numbers of processes to try")
+	parser.add_argument("--split-root", action="store_true", help="deal the root moves out instead of Lazy SMP")
+	options = parser.parse_args(arguments)
+
+	match = ChessMatch()
+	match.setupPosition(unicode(options.fen))
+	engine = ChessEngine(match, "WHITE" if match.side == 0 else "BLACK", split_root=options.split_root)
+	try:
+		for report in engine.measureScaling(options.movetime, options.workers):
+			print("%2d workers (%s): depth %2d, %9d nodes in %.2fs, %8.0f nodes/s, %.2fx" % (
+				report["workers"], report["mode"], report["depth"], report["nodes"], report["seconds"],
+				report["nodes_per_second"], report["speedup"]))
+	finally:
+		engine.close()
+	return 0
 
-		self.owner.castle_short = self.owner.prev_castle_short
-		self.owner.castle_long = self.owner.prev_castle_long
 
-		super().unmakeMove()
+if __name__ == "__main__":
+	if sys.argv[1:2] == ["selfplay"]:
+		sys.exit(selfPlayMain(sys.argv[2:]))
+	if sys.argv[1:2] == ["scaling"]:
+		sys.exit(scalingMain(sys.argv[2:]))
+	if sys.argv[1:2] == ["tablebase"]:
+		sys.exit(tablebaseMain(sys.argv[2:]))
+	sys.exit(perftMain(sys.argv[1:]))